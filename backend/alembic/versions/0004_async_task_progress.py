@@ -0,0 +1,27 @@
+"""async task progress columns
+
+Revision ID: 0004_async_task_progress
+Revises: 0003_async_tasks
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004_async_task_progress'
+down_revision = '0003_async_tasks'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('async_tasks', sa.Column('progress_seconds', sa.Float(), nullable=True))
+    op.add_column('async_tasks', sa.Column('total_seconds', sa.Float(), nullable=True))
+    op.add_column('async_tasks', sa.Column('estimated_completion_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    op.drop_column('async_tasks', 'estimated_completion_at')
+    op.drop_column('async_tasks', 'total_seconds')
+    op.drop_column('async_tasks', 'progress_seconds')
@@ -0,0 +1,33 @@
+"""publish outbox table
+
+Revision ID: 0005_publish_outbox
+Revises: 0004_async_task_progress
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005_publish_outbox'
+down_revision = '0004_async_task_progress'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'publish_outbox',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('queue', sa.String(128), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('kid', sa.String(64), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index('ix_publish_outbox_created_at', 'publish_outbox', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_publish_outbox_created_at', table_name='publish_outbox')
+    op.drop_table('publish_outbox')
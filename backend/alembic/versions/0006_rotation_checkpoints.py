@@ -0,0 +1,32 @@
+"""encryption rotation checkpoints
+
+Revision ID: 0006_rotation_checkpoints
+Revises: 0005_publish_outbox
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006_rotation_checkpoints'
+down_revision = '0005_publish_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'encryption_rotation_checkpoints',
+        sa.Column('target_kid', sa.String(64), primary_key=True),
+        sa.Column('range_start', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('range_end', sa.Integer(), nullable=False),
+        sa.Column('high_water_mark', sa.Integer(), nullable=False),
+        sa.Column('rows_rotated', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('lease_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('encryption_rotation_checkpoints')
@@ -0,0 +1,41 @@
+"""blind search index tokens and build checkpoints
+
+Revision ID: 0007_search_index
+Revises: 0006_rotation_checkpoints
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007_search_index'
+down_revision = '0006_rotation_checkpoints'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'transcript_search_tokens',
+        sa.Column('token', sa.String(32), primary_key=True),
+        sa.Column('transcript_id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('key_id', sa.String(64), nullable=False),
+    )
+    op.create_index(
+        'ix_transcript_search_tokens_transcript_key', 'transcript_search_tokens', ['transcript_id', 'key_id']
+    )
+    op.create_table(
+        'search_index_builds',
+        sa.Column('key_id', sa.String(64), primary_key=True),
+        sa.Column('high_water_mark', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('lease_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('search_index_builds')
+    op.drop_index('ix_transcript_search_tokens_transcript_key', table_name='transcript_search_tokens')
+    op.drop_table('transcript_search_tokens')
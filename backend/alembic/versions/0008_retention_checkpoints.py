@@ -0,0 +1,32 @@
+"""retention purge checkpoints
+
+Revision ID: 0008_retention_checkpoints
+Revises: 0007_search_index
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0008_retention_checkpoints'
+down_revision = '0007_search_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'retention_purge_checkpoints',
+        sa.Column('name', sa.String(32), primary_key=True),
+        sa.Column('cutoff', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('range_end', sa.Integer(), nullable=False),
+        sa.Column('high_water_mark', sa.Integer(), nullable=False),
+        sa.Column('rows_purged', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('lease_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('retention_purge_checkpoints')
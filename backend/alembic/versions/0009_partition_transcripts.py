@@ -0,0 +1,42 @@
+"""monthly range partitions on transcripts.created_at (MySQL only)
+
+Revision ID: 0009_partition_transcripts
+Revises: 0008_retention_checkpoints
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from datetime import datetime, UTC
+
+from alembic import op
+import sqlalchemy as sa
+
+from partitions import add_months, month_start, partition_definitions
+
+revision = '0009_partition_transcripts'
+down_revision = '0008_retention_checkpoints'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'mysql':
+        return  # SQLite keeps the unpartitioned table
+    now = datetime.now(UTC)
+    first = bind.execute(sa.text('SELECT MIN(created_at) FROM transcripts')).scalar() or now
+    # every unique key must contain the partitioning column
+    op.execute('ALTER TABLE transcripts DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)')
+    op.execute(
+        'ALTER TABLE transcripts PARTITION BY RANGE COLUMNS(created_at) '
+        f'({partition_definitions(first, add_months(month_start(now), MONTHS_AHEAD))})'
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.execute('ALTER TABLE transcripts REMOVE PARTITIONING')
+    op.execute('ALTER TABLE transcripts DROP PRIMARY KEY, ADD PRIMARY KEY (id)')
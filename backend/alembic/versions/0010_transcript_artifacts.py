@@ -0,0 +1,31 @@
+"""nextcloud artifact paths per transcript
+
+Revision ID: 0010_transcript_artifacts
+Revises: 0009_partition_transcripts
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0010_transcript_artifacts'
+down_revision = '0009_partition_transcripts'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'transcript_artifacts',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('transcript_id', sa.Integer(), nullable=False),
+        sa.Column('base_path', sa.String(512), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index('ix_transcript_artifacts_transcript_id', 'transcript_artifacts', ['transcript_id'])
+
+
+def downgrade():
+    op.drop_index('ix_transcript_artifacts_transcript_id', table_name='transcript_artifacts')
+    op.drop_table('transcript_artifacts')
@@ -34,6 +34,8 @@ class AuditEvent:
     SMART_CALLBACK = "smart_callback"
     PUBLISH_FAILED = "publish_failed"
     TRANSCRIPT_STORE = "transcript_store"
+    TRANSCRIPT_STORE_BATCH = "transcript_store_batch"
+    TRANSCRIPT_EXPORT = "transcript_export"
     RETENTION_PURGE = "retention_purge"
 
 
@@ -81,21 +83,21 @@ def _mask_patterns(text: str) -> str:
     return text
 
 
-def mask_phi(text: str | None) -> str | None:
-    if text is None:
+def _presidio_analyzer():
+    if not _settings.advanced_phi_masking:
         return None
-    if _settings.store_phi:
-        return text
-    masked = _mask_patterns(text)
-    try:
-        phi_redactions_total.labels(scope="persist").inc()
+    try:  # pragma: no cover
+        from presidio_analyzer import AnalyzerEngine  # type: ignore
+        return AnalyzerEngine()
     except Exception:
-        pass
+        return None
+
+
+def _mask_one(text: str, analyzer) -> str:
+    masked = _mask_patterns(text)
     # Optional advanced masking using Presidio if enabled and installed
-    if _settings.advanced_phi_masking:
+    if analyzer is not None:
         try:  # pragma: no cover
-            from presidio_analyzer import AnalyzerEngine  # type: ignore
-            analyzer = AnalyzerEngine()
             results = analyzer.analyze(text=text, language="en")
             # Replace detected spans (reverse order to keep indices valid)
             for r in sorted(results, key=lambda r: r.start, reverse=True):
@@ -107,6 +109,31 @@ def mask_phi(text: str | None) -> str | None:
     return masked
 
 
+def mask_phi(text: str | None) -> str | None:
+    if text is None:
+        return None
+    if _settings.store_phi:
+        return text
+    try:
+        phi_redactions_total.labels(scope="persist").inc()
+    except Exception:
+        pass
+    return _mask_one(text, _presidio_analyzer())
+
+
+def mask_phi_many(texts: list[str | None]) -> list[str | None]:
+    """``mask_phi`` over a batch: one settings check, one analyzer, one metric update."""
+    if _settings.store_phi:
+        return list(texts)
+    analyzer = _presidio_analyzer()
+    out = [None if t is None else _mask_one(t, analyzer) for t in texts]
+    try:
+        phi_redactions_total.labels(scope="persist").inc(sum(1 for t in texts if t is not None))
+    except Exception:
+        pass
+    return out
+
+
 def mask_phi_for_response(text: str | None) -> str | None:
     """Mask PHI for outbound API responses when response masking flag enabled.
 
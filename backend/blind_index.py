@@ -0,0 +1,125 @@
+"""Blind keyword index for searching encrypted transcripts.
+
+Each stored transcript is reduced to a set of normalized terms: words of the
+(PHI-masked) text and summary, plus ``<field>:<value>`` terms for extracted
+entities such as ``medications:metformin``. Only ``HMAC-SHA256(key, term)``
+tokens are persisted, so the database can answer "which transcripts contain
+this word" without holding readable text. Query terms go through the same
+normalization and are hashed with every configured index key, which keeps
+search complete while a rebuild under a new key is still running.
+
+Keys use the ``ENCRYPTION_KEYS`` format (``SEARCH_INDEX_KEYS=kid:base64,...``)
+with ``PRIMARY_SEARCH_INDEX_KEY_ID`` selecting the key for new tokens.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import re
+import unicodedata
+from base64 import b64decode
+from typing import Any, Dict, Iterable
+
+TOKEN_HEX_CHARS = 32  # 128-bit truncated HMAC
+MAX_TERMS_PER_TRANSCRIPT = 5000
+MAX_QUERY_TERMS = 8
+MIN_TERM_LENGTH = 2
+
+_WORD = re.compile(r"[^\W_]+(?:['-][^\W_]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from had has have he her his i if in is it its me my no not of on or our "
+    "she so that the their them then there they this to um uh was we were what when which who will with you your".split()
+)
+
+
+def _normalize(value: str) -> str:
+    return unicodedata.normalize("NFKC", value).casefold().strip()
+
+
+def text_terms(text: str | None) -> list[str]:
+    """Distinct normalized words of ``text`` in order of first appearance."""
+    if not text:
+        return []
+    seen: dict[str, None] = {}
+    for word in _WORD.findall(_normalize(text)):
+        if len(word) >= MIN_TERM_LENGTH and word not in STOPWORDS:
+            seen.setdefault(word, None)
+    return list(seen)
+
+
+def entity_terms(enrichment: Dict[str, Any] | None) -> list[str]:
+    """``field:value`` terms for string (or list-of-string) enrichment values."""
+    out: list[str] = []
+    for field, value in (enrichment or {}).items():
+        values = value if isinstance(value, list) else [value]
+        for v in values:
+            if isinstance(v, str) and v.strip():
+                out.append(f"{_normalize(field)}:{_normalize(v)}")
+    return out
+
+
+def transcript_terms(text: str | None, summary: str | None, enrichment: Dict[str, Any] | None) -> set[str]:
+    terms = dict.fromkeys(entity_terms(enrichment))
+    for word in text_terms(text) + text_terms(summary):
+        if len(terms) >= MAX_TERMS_PER_TRANSCRIPT:
+            break
+        terms.setdefault(word, None)
+    return set(terms)
+
+
+def query_terms(query: str) -> list[str]:
+    """Terms of a search query; ``field:value`` parts match entity terms.
+
+    Raises ValueError for an empty query or more than ``MAX_QUERY_TERMS`` terms.
+    """
+    terms: dict[str, None] = {}
+    for part in (query or "").split():
+        if ":" in part.strip(":"):
+            field, value = part.split(":", 1)
+            terms.setdefault(f"{_normalize(field)}:{_normalize(value)}", None)
+        else:
+            for word in text_terms(part):
+                terms.setdefault(word, None)
+    if not terms:
+        raise ValueError("query has no searchable terms")
+    if len(terms) > MAX_QUERY_TERMS:
+        raise ValueError(f"query has more than {MAX_QUERY_TERMS} terms")
+    return list(terms)
+
+
+class BlindIndex:
+    """HMAC keys for index tokens; ``primary`` writes, every key is queried."""
+
+    def __init__(self, keys: Dict[str, bytes], primary: str):
+        if primary not in keys:
+            raise ValueError(f"primary search index key {primary!r} is not configured")
+        self.keys = dict(keys)
+        self.primary = primary
+
+    @classmethod
+    def from_settings(cls, settings) -> "BlindIndex | None":
+        if not (settings.enable_search_index and settings.search_index_keys and settings.primary_search_index_key_id):
+            return None
+        keys: Dict[str, bytes] = {}
+        for pair in settings.search_index_keys.split(","):
+            pair = pair.strip()
+            if not pair or ":" not in pair:
+                continue
+            kid, key_b64 = pair.split(":", 1)
+            key = b64decode(key_b64)
+            if len(key) < 32:
+                raise ValueError(f"search index key {kid!r} must be at least 32 bytes")
+            keys[kid] = key
+        return cls(keys, settings.primary_search_index_key_id)
+
+    def token(self, term: str, kid: str | None = None) -> str:
+        key = self.keys[kid or self.primary]
+        return hmac.new(key, term.encode(), hashlib.sha256).hexdigest()[:TOKEN_HEX_CHARS]
+
+    def tokens(self, terms: Iterable[str]) -> list[str]:
+        """Primary-key tokens for ``terms`` (write path)."""
+        return [self.token(t) for t in terms]
+
+    def query_tokens(self, term: str) -> list[str]:
+        """Tokens of ``term`` under every configured key (read path)."""
+        return [self.token(term, kid) for kid in self.keys]
@@ -0,0 +1,262 @@
+"""Publish circuit breaker with pluggable state.
+
+State lives in a store so every API worker can share it: ``MemoryBreakerStore``
+keeps it per process, ``RedisBreakerStore`` shares it across workers and pods
+(falling back to process-local state while Redis is unreachable).
+
+closed -> open after ``threshold`` failures within ``reset_seconds`` (counted
+across all sharers). Once ``reset_seconds`` have passed the breaker is
+half-open: exactly one caller wins the probe lease and is let through; its
+success closes the breaker for everyone, its failure re-opens it for another
+``reset_seconds``.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Optional
+
+import structlog
+
+from metrics import breaker_open_total, breaker_state, breaker_state_transitions_total
+
+try:  # optional dependency
+    import redis  # type: ignore
+except ImportError:  # pragma: no cover - depends on environment
+    redis = None  # type: ignore
+
+_log = structlog.get_logger(__name__)
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+_STATE_VALUE = {BreakerState.CLOSED: 0, BreakerState.OPEN: 1, BreakerState.HALF_OPEN: 2}
+
+
+class MemoryBreakerStore:
+    """Process-local breaker state.
+
+    Failures are timestamped and only those within the last ``window_seconds``
+    count, matching the expiring counter of ``RedisBreakerStore``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._failures: deque[float] = deque()
+        self._window = 0.0
+        self._open_until = 0.0
+        self._probe_until = 0.0
+
+    def _prune(self, now: float) -> None:
+        while self._failures and self._failures[0] <= now - self._window:
+            self._failures.popleft()
+
+    def get(self) -> tuple[int, float]:
+        with self._lock:
+            self._prune(time.time())
+            return len(self._failures), self._open_until
+
+    def incr_failure(self, window_seconds: float) -> int:
+        with self._lock:
+            now = time.time()
+            self._window = window_seconds
+            self._prune(now)
+            self._failures.append(now)
+            return len(self._failures)
+
+    def open_if_closed(self, until: float) -> bool:
+        with self._lock:
+            if self._open_until:
+                return False
+            self._open_until = until
+            return True
+
+    def force_open(self, until: float) -> None:
+        with self._lock:
+            self._open_until = until
+            self._probe_until = 0.0
+
+    def try_acquire_probe(self, lease_seconds: float) -> bool:
+        with self._lock:
+            now = time.time()
+            if now < self._probe_until:
+                return False
+            self._probe_until = now + lease_seconds
+            return True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures.clear()
+            self._open_until = 0.0
+            self._probe_until = 0.0
+
+
+class RedisBreakerStore:
+    """Breaker state shared through Redis keys ``breaker:<name>:*``.
+
+    Every operation is a single atomic command (INCR, SET NX, DEL), so no
+    cross-key transaction is needed. Errors fall back to a local store so a
+    Redis outage never blocks publishing on its own.
+    """
+
+    def __init__(self, client, name: str):
+        self._r = client
+        self._failures_key = f"breaker:{name}:failures"
+        self._open_key = f"breaker:{name}:open_until"
+        self._probe_key = f"breaker:{name}:probe"
+        self._local = MemoryBreakerStore()
+
+    def get(self) -> tuple[int, float]:
+        try:
+            failures, open_until = self._r.mget(self._failures_key, self._open_key)
+            return int(failures or 0), float(open_until or 0.0)
+        except Exception as e:  # noqa: BLE001
+            _log.warning("breaker/redis-unavailable", error=str(e))
+            return self._local.get()
+
+    def incr_failure(self, window_seconds: float) -> int:
+        try:
+            pipe = self._r.pipeline()
+            pipe.incr(self._failures_key)
+            # failures older than the window no longer count towards the threshold
+            pipe.expire(self._failures_key, max(1, int(window_seconds)))
+            return int(pipe.execute()[0])
+        except Exception:  # noqa: BLE001
+            return self._local.incr_failure(window_seconds)
+
+    def _keep_seconds(self, until: float) -> int:
+        # keep open_until well past its deadline so the half-open state survives
+        return max(60, int((until - time.time()) * 10))
+
+    def open_if_closed(self, until: float) -> bool:
+        try:
+            return bool(self._r.set(self._open_key, repr(until), nx=True, ex=self._keep_seconds(until)))
+        except Exception:  # noqa: BLE001
+            return self._local.open_if_closed(until)
+
+    def force_open(self, until: float) -> None:
+        try:
+            pipe = self._r.pipeline()
+            pipe.set(self._open_key, repr(until), ex=self._keep_seconds(until))
+            pipe.delete(self._probe_key)
+            pipe.execute()
+        except Exception:  # noqa: BLE001
+            self._local.force_open(until)
+
+    def try_acquire_probe(self, lease_seconds: float) -> bool:
+        try:
+            return bool(self._r.set(self._probe_key, "1", nx=True, ex=max(1, int(lease_seconds))))
+        except Exception:  # noqa: BLE001
+            return self._local.try_acquire_probe(lease_seconds)
+
+    def reset(self) -> None:
+        try:
+            self._r.delete(self._failures_key, self._open_key, self._probe_key)
+        except Exception:  # noqa: BLE001
+            pass
+        self._local.reset()
+
+
+class CircuitBreaker:
+    """Circuit breaker over a shared state store; see module docstring."""
+
+    def __init__(
+        self,
+        name: str,
+        store=None,
+        threshold: int = 5,
+        reset_seconds: float = 60.0,
+        probe_lease_seconds: float = 30.0,
+    ):
+        self.name = name
+        self.store = store or MemoryBreakerStore()
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.probe_lease_seconds = probe_lease_seconds
+        self._observed: Optional[BreakerState] = None
+
+    def _state_from(self, open_until: float) -> BreakerState:
+        if not open_until:
+            return BreakerState.CLOSED
+        if time.time() < open_until:
+            return BreakerState.OPEN
+        return BreakerState.HALF_OPEN
+
+    def _observe(self, state: BreakerState) -> BreakerState:
+        if state is not self._observed:
+            self._observed = state
+            breaker_state.labels(self.name).set(_STATE_VALUE[state])
+        return state
+
+    def _transition(self, state: BreakerState) -> None:
+        breaker_state_transitions_total.labels(self.name, state.value).inc()
+        if state is BreakerState.OPEN:
+            breaker_open_total.inc()
+        _log.info("breaker/transition", breaker=self.name, state=state.value)
+        self._observe(state)
+
+    @property
+    def state(self) -> BreakerState:
+        return self._observe(self._state_from(self.store.get()[1]))
+
+    def allow_request(self) -> bool:
+        """True when a call may go to the broker (closed, or this caller is the half-open prober)."""
+        state = self.state
+        if state is BreakerState.CLOSED:
+            return True
+        if state is BreakerState.OPEN:
+            return False
+        if self.store.try_acquire_probe(self.probe_lease_seconds):
+            self._transition(BreakerState.HALF_OPEN)
+            return True
+        return False
+
+    def record_success(self) -> None:
+        failures, open_until = self.store.get()
+        if not failures and not open_until:
+            return
+        self.store.reset()
+        if open_until:
+            self._transition(BreakerState.CLOSED)
+
+    def record_failure(self) -> bool:
+        """Count a failed call; returns True when this failure opened the breaker."""
+        _, open_until = self.store.get()
+        if self._state_from(open_until) is BreakerState.HALF_OPEN:
+            self.store.force_open(time.time() + self.reset_seconds)
+            self._transition(BreakerState.OPEN)
+            return True
+        failures = self.store.incr_failure(self.reset_seconds)
+        if failures >= self.threshold and self.store.open_if_closed(time.time() + self.reset_seconds):
+            self._transition(BreakerState.OPEN)
+            return True
+        return False
+
+    def trip(self, seconds: float | None = None) -> None:
+        """Force the breaker open (operator action / tests)."""
+        self.store.force_open(time.time() + (self.reset_seconds if seconds is None else seconds))
+        self._transition(BreakerState.OPEN)
+
+    def snapshot(self) -> dict:
+        failures, open_until = self.store.get()
+        return {
+            "state": self._observe(self._state_from(open_until)).value,
+            "failures": failures,
+            "open_until": open_until,
+        }
+
+
+def build_breaker(name: str, backend: str, redis_url: str | None, threshold: int, reset_seconds: float) -> CircuitBreaker:
+    store = None
+    if backend == "redis":
+        if redis is None or not redis_url:
+            _log.warning("breaker/redis-backend-unavailable", breaker=name)
+        else:
+            store = RedisBreakerStore(redis.from_url(redis_url, decode_responses=True), name)
+    return CircuitBreaker(name, store=store, threshold=threshold, reset_seconds=reset_seconds)
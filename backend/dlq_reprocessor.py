@@ -1,8 +1,28 @@
 """Dead-letter queue (DLQ) reprocessor service.
 
-Consumes messages from the DLQ (``transcriptions_dlq``) and attempts to
-re-publish them to the primary queue after optional backoff. Implements a
-bounded retry counter embedded in the message payload (``_dlq_attempts``).
+Consumes messages from the DLQ (``transcriptions_dlq``) and schedules them
+back onto the primary queue after a backoff. Implements a bounded retry
+counter embedded in the message payload (``_dlq_attempts``).
+
+Backoff never blocks the consumer: a retry is published to a per-tier delay
+queue (``<dlq>.delay.<ms>ms``) declared with ``x-message-ttl`` and a
+dead-letter route to the main queue, so the broker moves it back once the
+TTL expires. Tiers are fixed per attempt number (one queue per attempt), so
+messages in a delay queue always expire in FIFO order.
+
+Handling depends on the message ``reason``:
+ * reasons in ``DLQ_PARK_REASONS`` (bad JSON, missing fields) cannot succeed
+   on retry and are moved to ``<dlq>.parked`` at once, as are messages that
+   exhausted their attempts;
+ * ``persistence_failed`` is replayed straight to the main queue while the
+   database answers, and otherwise held in ``<dlq>.hold`` (TTL, dead-lettered
+   back to the DLQ) without spending an attempt;
+ * anything else goes through the backoff tiers above.
+
+CLI (stop the service, or point it at the parked queue, while replaying)::
+
+    python -m dlq_reprocessor stats [--queue Q] [--limit N]
+    python -m dlq_reprocessor replay --reason persistence_failed [--queue Q] [--rate 50] [--limit N]
 
 Exit codes:
  0 normal shutdown
@@ -14,31 +34,45 @@ Environment variables:
  MAIN_QUEUE    Name of main queue (default: transcriptions)
  MAX_REPROCESS_ATTEMPTS  Maximum retry attempts (default: 5)
  BACKOFF_BASE_SECONDS    Base backoff seconds (default: 5)
+ MAX_BACKOFF_SECONDS     Cap for a single backoff tier (default: 600)
+ DLQ_PREFETCH            Unacked DLQ deliveries in flight (default: 100)
+ DLQ_PARK_REASONS        Comma-separated reasons parked without retry (default: invalid_json,missing_fields)
+ DLQ_HOLD_SECONDS        Hold time for persistence_failed while the DB is down (default: 30)
+ TRANSCRIPTS_DB_*        Transcript DB checked before replaying persistence_failed (unset => treated as down)
+ DLQ_DB_HEALTH_URL       SQLAlchemy URL to check instead (e.g. sqlite:///transcripts.db in dev)
+ DLQ_METRICS_PORT        Port for /metrics and /health (default: 9102, 0 disables)
 
 Metrics (Prometheus counters):
  reprocessor_attempt_total
- reprocessor_success_total
+ reprocessor_success_total      republished to the main queue (replays)
+ reprocessor_scheduled_total    retries parked on a delay queue until their TTL expires
  reprocessor_failure_total
  reprocessor_permanent_failure_total
+ reprocessor_parked_total{reason}
 """
 from __future__ import annotations
 
+import argparse
 import json
 import os
-import time
 import math
 import pika
 import threading
 import signal
 import structlog
-from typing import Any, Dict
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable
 from metrics import (
 	reprocessor_attempt_total,
 	reprocessor_success_total,
+	reprocessor_scheduled_total,
 	reprocessor_failure_total,
 	reprocessor_permanent_failure_total,
+	reprocessor_parked_total,
 )
-from rabbitmq_utils import send_to_rabbitmq
+from rabbitmq_utils import decode_body, send_to_rabbitmq
+from worker_http import start_worker_server
 from opentelemetry import trace  # type: ignore
 
 logger = structlog.get_logger().bind(component="dlq_reprocessor")
@@ -48,11 +82,93 @@ DLQ_QUEUE = os.environ.get("DLQ_QUEUE", "transcriptions_dlq")
 MAIN_QUEUE = os.environ.get("MAIN_QUEUE", "transcriptions")
 MAX_REPROCESS_ATTEMPTS = int(os.environ.get("MAX_REPROCESS_ATTEMPTS", "5"))
 BACKOFF_BASE_SECONDS = float(os.environ.get("BACKOFF_BASE_SECONDS", "5"))
+MAX_BACKOFF_SECONDS = float(os.environ.get("MAX_BACKOFF_SECONDS", "600"))
+DLQ_PREFETCH = int(os.environ.get("DLQ_PREFETCH", "100"))
+METRICS_PORT = int(os.environ.get("DLQ_METRICS_PORT", "9102"))
+PARK_REASONS = {r.strip() for r in os.environ.get("DLQ_PARK_REASONS", "invalid_json,missing_fields").split(",") if r.strip()}
+HOLD_SECONDS = float(os.environ.get("DLQ_HOLD_SECONDS", "30"))
+PARKED_QUEUE = f"{DLQ_QUEUE}.parked"
+HOLD_QUEUE = f"{DLQ_QUEUE}.hold"
+_DB_HEALTH_TTL = 5.0
+_db_health: tuple[float, bool] = (0.0, False)
+_db_engine = None
+
+
+def _delay_tier_ms(attempt: int) -> int:
+	# Exponential per attempt; no jitter so each attempt maps to one delay queue
+	return int(min(BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)), MAX_BACKOFF_SECONDS) * 1000)
+
+
+def _delay_queue(attempt: int) -> tuple[str, Dict[str, Any]]:
+	"""Name and declare-arguments of the delay queue for ``attempt``."""
+	ttl_ms = _delay_tier_ms(attempt)
+	return f"{DLQ_QUEUE}.delay.{ttl_ms}ms", {
+		"x-message-ttl": ttl_ms,
+		"x-dead-letter-exchange": "",
+		"x-dead-letter-routing-key": MAIN_QUEUE,
+	}
+
 
+def _db_health_url() -> str | None:
+	"""``DLQ_DB_HEALTH_URL``, else the MySQL URL from ``TRANSCRIPTS_DB_*``; None if neither is set."""
+	url = os.environ.get("DLQ_DB_HEALTH_URL")
+	if url:
+		return url
+	if os.environ.get("TRANSCRIPTS_DB_HOST"):
+		from persistence import _database_url
 
-def _calc_backoff(attempt: int) -> float:
-	# Exponential with jitter
-	return BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)) * (0.5 + os.urandom(1)[0] / 255)
+		return _database_url()
+	return None
+
+
+def _db_healthy() -> bool:
+	"""Cheap ``SELECT 1`` against the transcript DB, cached for a few seconds.
+
+	An unconfigured DB counts as unhealthy: falling back to a local SQLite file
+	would always answer and replay into a database that is still down.
+	"""
+	global _db_health, _db_engine
+	checked_at, healthy = _db_health
+	if time.monotonic() - checked_at < _DB_HEALTH_TTL:
+		return healthy
+	try:
+		from sqlalchemy import create_engine, text
+
+		if _db_engine is None:
+			url = _db_health_url()
+			if url is None:
+				raise RuntimeError("no database configured (set TRANSCRIPTS_DB_* or DLQ_DB_HEALTH_URL)")
+			_db_engine = create_engine(url, pool_pre_ping=True, future=True)
+		with _db_engine.connect() as conn:
+			conn.execute(text("SELECT 1"))
+		healthy = True
+	except Exception as e:  # noqa: BLE001
+		logger.warning("db_unhealthy", error=str(e))
+		healthy = False
+	_db_health = (time.monotonic(), healthy)
+	return healthy
+
+
+def _park(msg: Dict[str, Any], why: str) -> None:
+	reprocessor_parked_total.labels(reason=str(msg.get("reason") or "unknown")).inc()
+	send_to_rabbitmq(queue=PARKED_QUEUE, message={**msg, "_parked": why}, rabbitmq_url=RABBITMQ_URL)
+
+
+def _route(msg: Dict[str, Any]) -> tuple[str, str, Dict[str, Any] | None, bool]:
+	"""Decide where a DLQ message goes: (action, queue, declare-arguments, counts-as-attempt)."""
+	if msg.get("reason") in PARK_REASONS:
+		return "park", PARKED_QUEUE, None, False
+	if msg.get("reason") == "persistence_failed":
+		if _db_healthy():
+			return "replay", MAIN_QUEUE, None, True
+		return "hold", HOLD_QUEUE, {
+			"x-message-ttl": int(HOLD_SECONDS * 1000),
+			"x-dead-letter-exchange": "",
+			"x-dead-letter-routing-key": DLQ_QUEUE,
+		}, False
+	attempts = int(msg.get("_dlq_attempts", 0)) + 1
+	delay_queue, delay_args = _delay_queue(attempts)
+	return "retry", delay_queue, delay_args, True
 
 
 def _handle_message(ch, method, properties, body):  # noqa: ANN001
@@ -61,28 +177,41 @@ def _handle_message(ch, method, properties, body):  # noqa: ANN001
 		span.set_attribute("dlq_queue", DLQ_QUEUE)
 		span.set_attribute("main_queue", MAIN_QUEUE)
 		try:
-			msg = json.loads(body)
+			msg = json.loads(decode_body(body, getattr(properties, "content_encoding", None)))
+			if not isinstance(msg, dict):
+				raise ValueError("DLQ message is not a JSON object")
 		except (json.JSONDecodeError, ValueError) as e:
 			reprocessor_permanent_failure_total.inc()
 			ch.basic_ack(delivery_tag=method.delivery_tag)
 			logger.warning("drop_malformed", size=len(body), error=str(e))
 			return
+		span.set_attribute("reason", str(msg.get("reason")))
 		attempts = int(msg.get("_dlq_attempts", 0)) + 1
-		span.set_attribute("attempt", attempts)
-		reprocessor_attempt_total.inc()
-		if attempts > MAX_REPROCESS_ATTEMPTS:
-			reprocessor_permanent_failure_total.inc()
-			ch.basic_ack(delivery_tag=method.delivery_tag)
-			logger.error("permanent_failure", attempts=attempts, filename=msg.get("filename"))
-			return
-		delay = _calc_backoff(attempts)
-		time.sleep(min(delay, 60))
-		msg["_dlq_attempts"] = attempts
+		action, queue, queue_args, counts = _route(msg)
+		span.set_attribute("action", action)
 		try:
-			send_to_rabbitmq(queue=MAIN_QUEUE, message=msg, rabbitmq_url=RABBITMQ_URL)
-			reprocessor_success_total.inc()
+			if action == "park":
+				_park(msg, "unfixable")
+				ch.basic_ack(delivery_tag=method.delivery_tag)
+				logger.info("parked", reason=msg.get("reason"), filename=msg.get("filename"))
+				return
+			if counts:
+				span.set_attribute("attempt", attempts)
+				reprocessor_attempt_total.inc()
+				if attempts > MAX_REPROCESS_ATTEMPTS:
+					reprocessor_permanent_failure_total.inc()
+					_park(msg, "exhausted")
+					ch.basic_ack(delivery_tag=method.delivery_tag)
+					logger.error("permanent_failure", attempts=attempts, filename=msg.get("filename"))
+					return
+				msg["_dlq_attempts"] = attempts
+			send_to_rabbitmq(queue=queue, message=msg, rabbitmq_url=RABBITMQ_URL, queue_arguments=queue_args)
+			if action == "replay":
+				reprocessor_success_total.inc()
+			elif action == "retry":
+				reprocessor_scheduled_total.inc()
 			ch.basic_ack(delivery_tag=method.delivery_tag)
-			logger.info("reprocessed", attempts=attempts, filename=msg.get("filename"))
+			logger.info(f"{action}_scheduled", queue=queue, attempts=attempts, filename=msg.get("filename"))
 		except Exception as e:  # noqa: BLE001
 			span.record_exception(e)
 			reprocessor_failure_total.inc()
@@ -94,6 +223,64 @@ def _handle_message(ch, method, properties, body):  # noqa: ANN001
 			logger.warning("reprocess_failed", error=str(e), attempts=attempts)
 
 
+def _get_messages(channel, queue: str, limit: int) -> Iterable[tuple[Any, Any, Dict[str, Any] | None]]:
+	"""Yield up to ``limit`` unacked deliveries as (method, properties, decoded message or None)."""
+	for _ in range(limit):
+		method, properties, body = channel.basic_get(queue=queue, auto_ack=False)
+		if method is None:
+			return
+		try:
+			msg = json.loads(decode_body(body, getattr(properties, "content_encoding", None)))
+		except ValueError:
+			msg = None
+		yield method, properties, msg if isinstance(msg, dict) else None
+
+
+def dlq_composition(channel, queue: str = DLQ_QUEUE, limit: int = 10000) -> Counter:
+	"""Count messages per reason without consuming them (everything is requeued)."""
+	counts: Counter = Counter()
+	try:
+		for _method, _props, msg in _get_messages(channel, queue, limit):
+			counts[(msg or {}).get("reason") or ("malformed" if msg is None else "unknown")] += 1
+	finally:
+		channel.basic_nack(delivery_tag=0, multiple=True, requeue=True)
+	return counts
+
+
+def replay(
+	channel,
+	reasons: set[str],
+	queue: str = DLQ_QUEUE,
+	rate: float = 50.0,
+	limit: int = 10000,
+	publish: Callable[..., None] | None = None,
+	sleep: Callable[[float], None] = time.sleep,
+) -> int:
+	"""Republish messages whose reason is in ``reasons`` to the main queue at ``rate`` msg/s.
+
+	Replayed messages start over (attempt counter and reason cleared); other
+	messages are left in ``queue``. Returns how many were replayed.
+	"""
+	publish = publish or send_to_rabbitmq
+	replayed = 0
+	try:
+		for method, _props, msg in _get_messages(channel, queue, limit):
+			if msg is None or (reasons and msg.get("reason") not in reasons):
+				continue
+			clean = {k: v for k, v in msg.items() if k not in ("reason", "_dlq_attempts", "_parked")}
+			clean["_replayed"] = True  # the consumer claims replays by exact key, past any Bloom filter
+			publish(queue=MAIN_QUEUE, message=clean, rabbitmq_url=RABBITMQ_URL)
+			channel.basic_ack(delivery_tag=method.delivery_tag)
+			reprocessor_success_total.inc()
+			replayed += 1
+			if rate > 0:
+				sleep(1.0 / rate)
+	finally:
+		channel.basic_nack(delivery_tag=0, multiple=True, requeue=True)
+	logger.info("replayed", count=replayed, queue=queue, reasons=sorted(reasons))
+	return replayed
+
+
 _stop_event = threading.Event()
 
 
@@ -105,8 +292,13 @@ def run():
 		connection = pika.BlockingConnection(pika.URLParameters(RABBITMQ_URL))
 		channel = connection.channel()
 		channel.queue_declare(queue=DLQ_QUEUE, durable=True)
-		channel.basic_qos(prefetch_count=1)
+		channel.basic_qos(prefetch_count=max(1, DLQ_PREFETCH))
 		channel.basic_consume(queue=DLQ_QUEUE, on_message_callback=_handle_message)
+		start_worker_server(
+			METRICS_PORT,
+			"dlq_reprocessor",
+			ready=lambda: {"connection_open": connection.is_open, "consuming": not _stop_event.is_set()},
+		)
 
 		def _graceful(*_a):  # noqa: D401
 			logger.info("signal_received_shutdown")
@@ -136,6 +328,37 @@ def run():
 				pass
 
 
+def main(argv: list[str] | None = None) -> None:
+	parser = argparse.ArgumentParser(prog="dlq_reprocessor", description="DLQ reprocessor service and tools")
+	sub = parser.add_subparsers(dest="command")
+	sub.add_parser("run", help="consume the DLQ (default)")
+	stats = sub.add_parser("stats", help="show DLQ composition by reason")
+	stats.add_argument("--queue", default=DLQ_QUEUE)
+	stats.add_argument("--limit", type=int, default=10000)
+	rp = sub.add_parser("replay", help="republish a filtered subset to the main queue")
+	rp.add_argument("--queue", default=DLQ_QUEUE)
+	rp.add_argument("--reason", action="append", default=[], help="repeatable; omit to replay everything")
+	rp.add_argument("--rate", type=float, default=50.0, help="messages per second (0 = unthrottled)")
+	rp.add_argument("--limit", type=int, default=10000, help="maximum messages to inspect")
+	args = parser.parse_args(argv)
+	if args.command in (None, "run"):
+		run()
+		return
+	connection = pika.BlockingConnection(pika.URLParameters(RABBITMQ_URL))
+	try:
+		channel = connection.channel()
+		if args.command == "stats":
+			counts = dlq_composition(channel, args.queue, args.limit)
+			for reason, count in counts.most_common():
+				print(f"{count:8d}  {reason}")
+			print(f"{sum(counts.values()):8d}  total (inspected, limit {args.limit})")
+		else:
+			count = replay(channel, set(args.reason), args.queue, args.rate, args.limit)
+			print(f"replayed {count} message(s) from {args.queue} to {MAIN_QUEUE}")
+	finally:
+		connection.close()
+
+
 if __name__ == "__main__":  # pragma: no cover
-	run()
+	main()
 
@@ -0,0 +1,175 @@
+"""Compress-then-encrypt support for transcript text and summary fields.
+
+AES-GCM output does not compress and is stored base64 encoded, so long
+transcripts are compressed *before* encryption. The codec is recorded in the
+field envelope (``{"enc": true, "kid": ..., "z": "zstd", "v": ...}``); rows
+without ``"z"`` are read exactly as before.
+
+``FIELD_COMPRESSION`` selects ``none`` (default), ``zlib`` or ``zstd``; zstd
+needs the optional ``zstandard`` package and falls back to zlib without it.
+``FIELD_COMPRESSION_DICTIONARIES`` lists zstd dictionaries trained on clinical
+text (first one compresses new rows, all of them stay readable, matched by the
+dictionary id in each frame). Train one with::
+
+    python -m field_compression train clinical.dict --limit 5000
+
+The dictionary holds fragments of the sample transcripts, so protect it like
+the data itself.
+"""
+from __future__ import annotations
+
+import argparse
+import threading
+import zlib
+from typing import Iterable, Sequence
+
+import structlog
+
+try:  # optional; zlib is used when zstd is requested but unavailable
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+_log = structlog.get_logger(__name__)
+
+CODECS = ("zlib", "zstd")
+DEFAULT_LEVELS = {"zlib": 6, "zstd": 3}
+DEFAULT_DICTIONARY_SIZE = 112_640
+MAX_FIELD_BYTES = 64 * 1024 * 1024
+
+
+class FieldCompressor:
+    """Compress field plaintext for one codec; decompress any supported codec.
+
+    zstd contexts are not thread-safe, so each thread gets its own; the
+    dictionaries are shared.
+    """
+
+    def __init__(
+        self,
+        codec: str | None = None,
+        level: int | None = None,
+        dictionaries: Sequence[bytes] = (),
+        min_bytes: int = 256,
+    ):
+        codec = (codec or "none").lower()
+        if codec == "zstd" and zstandard is None:
+            _log.warning("field_compression/zstd-unavailable", fallback="zlib")
+            codec = "zlib"
+        self.codec = codec if codec in CODECS else None
+        self.level = level or DEFAULT_LEVELS.get(self.codec or "", 0)
+        self.min_bytes = min_bytes
+        loaded = [zstandard.ZstdCompressionDict(raw) for raw in dictionaries] if zstandard is not None else []
+        self._dicts = {d.dict_id(): d for d in loaded}
+        self._compress_dict = loaded[0] if loaded and self.codec == "zstd" else None
+        if self._compress_dict is not None:
+            self._compress_dict.precompute_compress(level=self.level)
+        self._local = threading.local()
+
+    @classmethod
+    def from_settings(cls, settings) -> "FieldCompressor":
+        dictionaries = []
+        for path in (settings.field_compression_dictionaries or "").split(","):
+            path = path.strip()
+            if path:
+                with open(path, "rb") as fh:
+                    dictionaries.append(fh.read())
+        return cls(
+            settings.field_compression,
+            level=settings.field_compression_level or None,
+            dictionaries=dictionaries,
+            min_bytes=settings.field_compression_min_bytes,
+        )
+
+    def _zstd_compressor(self):
+        cctx = getattr(self._local, "cctx", None)
+        if cctx is None:
+            cctx = zstandard.ZstdCompressor(level=self.level, dict_data=self._compress_dict)
+            self._local.cctx = cctx
+        return cctx
+
+    def _zstd_decompressor(self, dict_id: int):
+        cache = getattr(self._local, "dctx", None)
+        if cache is None:
+            cache = self._local.dctx = {}
+        dctx = cache.get(dict_id)
+        if dctx is None:
+            if dict_id and dict_id not in self._dicts:
+                raise ValueError(f"zstd dictionary {dict_id} is not configured")
+            dctx = cache[dict_id] = zstandard.ZstdDecompressor(dict_data=self._dicts.get(dict_id))
+        return dctx
+
+    def compress(self, data: bytes) -> tuple[bytes, str | None]:
+        """Return ``(payload, codec)``; ``codec`` is None when left uncompressed.
+
+        Data below ``min_bytes``, or that does not get smaller, stays as is.
+        """
+        if self.codec is None or len(data) < self.min_bytes:
+            return data, None
+        if self.codec == "zstd":
+            out = self._zstd_compressor().compress(data)
+        else:
+            out = zlib.compress(data, self.level)
+        if len(out) >= len(data):
+            return data, None
+        return out, self.codec
+
+    def decompress(self, data: bytes, codec: str) -> bytes:
+        if codec == "zlib":
+            # bounded like zstd: stop at MAX_FIELD_BYTES instead of inflating a bomb
+            d = zlib.decompressobj()
+            out = d.decompress(data, MAX_FIELD_BYTES)
+            if d.unconsumed_tail:
+                raise ValueError(f"decompressed field exceeds {MAX_FIELD_BYTES} bytes")
+            if not d.eof:
+                raise ValueError("truncated zlib field")
+            return out
+        if codec == "zstd":
+            if zstandard is None:
+                raise ValueError("zstd-compressed field but zstandard is not installed")
+            dict_id = zstandard.get_frame_parameters(data).dict_id
+            return self._zstd_decompressor(dict_id).decompress(data, max_output_size=MAX_FIELD_BYTES)
+        raise ValueError(f"unsupported field codec {codec!r}")
+
+
+def train_dictionary(samples: Iterable[str], size: int = DEFAULT_DICTIONARY_SIZE) -> bytes:
+    """Train a zstd dictionary from sample transcripts."""
+    if zstandard is None:
+        raise RuntimeError("training a dictionary requires the zstandard package")
+    data = [s.encode() for s in samples if s]
+    return zstandard.train_dictionary(size, data).as_bytes()
+
+
+def _stored_texts(limit: int) -> list[str]:
+    """Decrypted text of the most recent transcripts (PHI-masked as stored)."""
+    import persistence
+
+    with persistence.SessionLocal() as session:
+        rows = session.execute(
+            persistence.transcripts.select().order_by(persistence.transcripts.c.id.desc()).limit(limit)
+        ).mappings().all()
+    out = []
+    for row in rows:
+        d = persistence._decrypt_row(dict(row))
+        out.extend(v for v in (d.get("text"), d.get("summary")) if isinstance(v, str))
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="field_compression", description="zstd dictionary tooling")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="train a dictionary from stored transcripts")
+    train.add_argument("output")
+    train.add_argument("--limit", type=int, default=5000, help="most recent transcripts to sample")
+    train.add_argument("--size", type=int, default=DEFAULT_DICTIONARY_SIZE, help="dictionary size in bytes")
+    args = parser.parse_args(argv)
+    samples = _stored_texts(args.limit)
+    raw = train_dictionary(samples, args.size)
+    with open(args.output, "wb") as fh:
+        fh.write(raw)
+    print(f"wrote {len(raw)} byte dictionary (id {zstandard.ZstdCompressionDict(raw).dict_id()}) from {len(samples)} samples")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+"""In-process idempotency structures for the consumer.
+
+``SeenCache`` replaces the old list of recent message hashes: O(1) membership,
+FIFO eviction at ``max_size`` and per-entry TTL. ``BloomFilter`` is a small
+in-process filter that can sit in front of it when Bloom idempotency is
+requested but RedisBloom is not available.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable
+
+
+class SeenCache:
+    """Bounded set of recently seen hashes with FIFO eviction and TTL expiry.
+
+    Entries are kept in insertion order, so expiry and eviction only ever pop
+    from the front. All operations take an internal lock and
+    ``check_and_add`` is atomic, which concurrent consumer workers rely on.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max(1, max_size)
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, float] = OrderedDict()  # hash -> expires_at
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        entries = self._entries
+        while entries:
+            _, expires_at = next(iter(entries.items()))
+            if expires_at > now:
+                break
+            entries.popitem(last=False)
+
+    def _contains(self, key: str, now: float) -> bool:
+        expires_at = self._entries.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= now:
+            del self._entries[key]
+            return False
+        return True
+
+    def _add(self, key: str, now: float) -> None:
+        self._entries.pop(key, None)  # re-adding refreshes position and TTL
+        self._entries[key] = now + self.ttl_seconds if self.ttl_seconds > 0 else math.inf
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return self._contains(key, self._clock())
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            self._add(key, now)
+
+    def check_and_add(self, key: str) -> bool:
+        """Record ``key``; True if it was already present (a duplicate)."""
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            if self._contains(key, now):
+                return True
+            self._add(key, now)
+            return False
+
+    def keys(self) -> list[str]:
+        """Snapshot of the live (unexpired) keys, oldest first."""
+        with self._lock:
+            self._expire(self._clock())
+            return list(self._entries)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over hex digests (no false negatives).
+
+    Sized from ``capacity`` / ``error_rate``; once more than ``capacity`` items
+    were added the false-positive rate degrades, so the filter resets itself
+    and starts a new generation. ``reseed`` returns the keys the new
+    generation must still contain (e.g. a ``SeenCache``'s keys), so a negative
+    answer stays a true "never seen" across resets.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, reseed: Callable[[], Iterable[str]] | None = None):
+        self.capacity = max(1, capacity)
+        error_rate = min(max(error_rate, 1e-9), 0.5)
+        self._bits_count = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self._hashes = max(1, round(self._bits_count / self.capacity * math.log(2)))
+        self._bits = bytearray((self._bits_count + 7) // 8)
+        self._added = 0
+        self._reseed = reseed
+        self._lock = threading.Lock()
+
+    def _positions(self, key: str):
+        # double hashing over two 64-bit slices of the (sha256 hex) key
+        try:
+            h1, h2 = int(key[:16], 16), int(key[16:32], 16) | 1
+        except ValueError:
+            digest = hash(key) & 0xFFFFFFFFFFFFFFFF
+            h1, h2 = digest, (digest >> 17) | 1
+        m = self._bits_count
+        return [(h1 + i * h2) % m for i in range(self._hashes)]
+
+    def _set(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos // 8] |= 1 << (pos % 8)
+        self._added += 1
+
+    def add(self, key: str) -> bool:
+        """Insert ``key``; True if it may already have been present."""
+        with self._lock:
+            if self._added >= self.capacity:
+                self._bits = bytearray(len(self._bits))
+                self._added = 0
+                for seed in self._reseed() if self._reseed else ():
+                    self._set(seed)
+            present = True
+            for pos in self._positions(key):
+                byte, bit = divmod(pos, 8)
+                if not self._bits[byte] & (1 << bit):
+                    present = False
+                    self._bits[byte] |= 1 << bit
+            if not present:
+                self._added += 1
+            return present
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return all(self._bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bits = bytearray(len(self._bits))
+            self._added = 0
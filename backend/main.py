@@ -13,8 +13,8 @@ from typing import Optional
 from urllib.parse import urlencode, urljoin
 import sys
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Depends, WebSocket, WebSocketDisconnect, Response
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Depends, Query, WebSocket, WebSocketDisconnect, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 import hashlib
@@ -32,7 +32,9 @@ from logging_setup import configure_logging  # noqa: F401 side-effect import
 from middleware import CorrelationIdMiddleware
 from rate_limit import RateLimitMiddleware
 from persistence import get_transcript
-from persistence import rotate_encryption_keys
+from persistence import encryption_rotation_progress, rotate_encryption_keys, rotation_in_progress
+from persistence import rebuild_search_index, search_index_complete, search_transcripts
+from persistence import iter_transcripts, list_transcripts
 from metrics import (
     transcripts_published_total,
     websocket_partial_sent_total,
@@ -46,11 +48,11 @@ from metrics import (
     api_in_flight_requests,
     decryption_warnings_total,
     publish_failures_total,
-    breaker_open_total,
     breaker_fallback_persist_total,
     async_tasks_started_total,
     async_tasks_completed_total,
     async_tasks_failed_total,
+    async_tasks_cancelled_total,
     async_task_duration_seconds,
     async_task_queue_size,
     drain_start_total,
@@ -63,13 +65,18 @@ from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 import structlog
 from audit import _request_id_var, _user_role_var  # type: ignore
 import os as _os
-from rabbitmq_utils import send_to_rabbitmq
+from rabbitmq_utils import send_to_rabbitmq, get_publisher, close_publishers
+import rabbitmq_async
+from circuit_breaker import build_breaker
 from opentelemetry import trace
 from transcription_services import transcribe_cloud, transcribe_local, ALLOWED_MIME_TYPES, preload_models_if_configured
+from transcription_services import transcription_progress, TranscriptionCancelled
 from starlette.middleware.cors import CORSMiddleware
 from starlette.types import ASGIApp, Scope, Receive, Send
+import asyncio
 import base64
 import json
+from datetime import datetime
 import time
 from postprocess import normalize_text
 import threading
@@ -214,11 +221,13 @@ def _start_rotation_thread():
         if not s.enable_field_encryption or s.encryption_rotate_hours <= 0:
             return
         interval = max(1, s.encryption_rotate_hours) * 3600
+        # A bounded slice per tick; checkpoints carry the rest over to the next one
+        max_batches = s.encryption_rotate_periodic_max_batches or None
         def _loop():
             import time as _t
             while True:
                 try:
-                    rotate_encryption_keys()
+                    rotate_encryption_keys(max_batches=max_batches)
                 except Exception:
                     pass
                 _t.sleep(interval)
@@ -263,17 +272,41 @@ import queue as _queue
 _shutdown_flag = False
 _executor_max_workers = getattr(settings, 'async_max_workers', int(os.environ.get('LOCAL_TX_WORKERS','2')))
 _executor_queue_maxsize = getattr(settings, 'async_queue_maxsize', 50)
-_submission_queue: "_queue.Queue[tuple[callable, tuple, dict]]" = _queue.Queue(maxsize=_executor_queue_maxsize)
 _tx_executor = ThreadPoolExecutor(max_workers=_executor_max_workers)
 
+
+class _AsyncJob:
+    """In-process handle for a queued/running async transcription task."""
+
+    def __init__(self, task_id: str, fn):
+        self.task_id = task_id
+        self.fn = fn
+        self.cancel_event = threading.Event()
+        self.future = None  # set once handed to the executor
+
+
+_submission_queue: "_queue.Queue[_AsyncJob]" = _queue.Queue(maxsize=_executor_queue_maxsize)
+_async_jobs: dict[str, _AsyncJob] = {}
+_async_jobs_lock = threading.Lock()
+
+
+def _forget_async_job(task_id: str) -> None:
+    with _async_jobs_lock:
+        _async_jobs.pop(task_id, None)
+
+
 def _executor_dispatch_loop():
     while not _shutdown_flag:
         try:
-            fn, a, kw = _submission_queue.get(timeout=0.5)
+            job = _submission_queue.get(timeout=0.5)
         except _queue.Empty:
             continue
         try:
-            _tx_executor.submit(fn, *a, **kw)
+            if job.cancel_event.is_set():
+                _forget_async_job(job.task_id)
+            else:
+                job.future = _tx_executor.submit(job.fn)
+                job.future.add_done_callback(lambda _f, tid=job.task_id: _forget_async_job(tid))
         except Exception:
             pass
         finally:
@@ -291,11 +324,19 @@ async def lifespan(app: FastAPI):  # type: ignore
         preload_models_if_configured()
     _start_migration_revision_check()
     _start_retention_thread()
+    _start_partition_maintenance()
+    _start_search_index_rebuild()
+    _start_outbox_relay()
+    await _start_async_publisher()
+    _start_publish_batcher()
     yield
     global _draining, _shutdown_flag
     _draining = True
     _shutdown_flag = True
     _tx_executor.shutdown(wait=True, cancel_futures=False)
+    await _stop_publish_batcher()
+    await _stop_async_publisher()
+    close_publishers()
 
 app = FastAPI(title="MMT Transcription API", version="0.3.0", docs_url="/docs" if docs_enabled else None, redoc_url=None if not docs_enabled else "/redoc", lifespan=lifespan)
 
@@ -408,10 +449,14 @@ async def _metrics_middleware(request, call_next):  # noqa: D401
     api_request_duration_seconds.observe(duration)
 logger = structlog.get_logger().bind(component="api")
 _draining: bool = False
-_cb_fail_count = 0
-_cb_open_until = 0.0
-_CB_THRESHOLD = 5
-_CB_RESET_SECONDS = 60
+# Publish circuit breaker; BREAKER_BACKEND=redis shares trips and recovery across workers/pods
+_breaker = build_breaker(
+    "publish",
+    backend=settings.breaker_backend,
+    redis_url=settings.redis_url,
+    threshold=settings.breaker_failure_threshold,
+    reset_seconds=settings.breaker_reset_seconds,
+)
 
 # --- Startup configuration sanity warnings (non-fatal) ---
 try:  # pragma: no cover
@@ -977,65 +1022,196 @@ def demo_status():
     }
 
 # ---------------------- Utility ---------------------- #
+_PUBLISH_ATTEMPTS = 3
+_async_publisher = None  # AsyncRabbitPublisher owned by the app lifespan when aio-pika is available
+_publish_batcher = None  # TranscriptBatcher for ambient snippets when AMQP_BATCH_LINGER_MS > 0
+
+
+async def _start_async_publisher() -> None:
+    global _async_publisher
+    if not settings.amqp_async_publisher or settings.demo_mode or not rabbitmq_async.is_available():
+        return
+    publisher = rabbitmq_async.AsyncRabbitPublisher(settings.rabbitmq_url)
+    try:
+        await publisher.start()
+    except Exception as e:  # noqa: BLE001
+        # Broker down at boot: request handlers fall back to the pooled sync publisher in a thread
+        structlog.get_logger(__name__).warning("rabbitmq/async-publisher-unavailable", error=str(e))
+        await publisher.close()
+        return
+    _async_publisher = publisher
+
+
+async def _stop_async_publisher() -> None:
+    global _async_publisher
+    publisher, _async_publisher = _async_publisher, None
+    if publisher is not None:
+        await publisher.close()
+
+
+def _start_publish_batcher() -> None:
+    global _publish_batcher
+    if settings.amqp_batch_linger_ms <= 0 or settings.demo_mode:
+        return
+    _publish_batcher = rabbitmq_async.TranscriptBatcher(
+        _send_transcription_async,
+        max_messages=settings.amqp_batch_max_messages,
+        linger_seconds=settings.amqp_batch_linger_ms / 1000.0,
+        on_failure=_record_batch_failure,
+    )
+
+
+async def _stop_publish_batcher() -> None:
+    global _publish_batcher
+    batcher, _publish_batcher = _publish_batcher, None
+    if batcher is not None:
+        await batcher.close()
+
+
+def _publish_payload(filename: str, text: str, correlation_id: str | None) -> dict:
+    payload = {"filename": filename, "text": text, "source": "api", "publish_time": time.time()}
+    if correlation_id:
+        payload["correlation_id"] = correlation_id
+    return payload
+
+
+def _circuit_open() -> bool:
+    # False for the single half-open prober, which must report back via success/exhausted
+    return not _breaker.allow_request()
+
+
+def _record_publish_success() -> None:
+    transcripts_published_total.inc()
+    _breaker.record_success()
+
+
+def _record_publish_exhausted(filename: str, last_err: Exception | None, count_failure: bool = True) -> None:
+    audit(AuditEvent.PUBLISH_FAILED, filename=filename, error=str(last_err))
+    if count_failure and _breaker.record_failure():
+        audit(AuditEvent.PUBLISH_FAILED, filename=filename, error="circuit_open")
+
+
+def _record_batch_failure_sync(size: int) -> None:
+    if _breaker.record_failure():
+        audit(AuditEvent.PUBLISH_FAILED, filename=f"<batch of {size}>", error="circuit_open")
+
+
+async def _record_batch_failure(exc: Exception, size: int) -> None:
+    # One breaker failure per failed envelope; its callers skip their own
+    await asyncio.to_thread(_record_batch_failure_sync, size)
+
+
+def _journal_to_outbox(payload: dict) -> None:
+    # Journal for the outbox relay instead of writing the transcript directly, so the
+    # message still goes through the consumer (idempotency, enrichment, Nextcloud).
+    from persistence import outbox_append
+    if outbox_append(settings.transcription_queue, payload) <= 0:
+        raise HTTPException(status_code=503, detail="Queue unavailable")
+    breaker_fallback_persist_total.inc()
+
+
+def _fallback_circuit_open(payload: dict) -> None:
+    _journal_to_outbox(payload)
+    audit(AuditEvent.PUBLISH_FAILED, filename=payload["filename"], error="circuit_open_fallback", correlation_id=payload.get("correlation_id"))
+
+
+def _store_demo_transcript(filename: str, text: str) -> None:
+    from persistence import store_transcript
+    store_transcript(filename, text, None, None, source="api-demo")
+    transcripts_published_total.inc()
+
+
 def _publish_transcription(filename: str, text: str, correlation_id: str | None = None):
+    """Blocking publish for worker threads (async task executor).
+
+    Request handlers on the event loop must use ``_publish_transcription_async``.
+    """
     if _draining:
         raise HTTPException(status_code=503, detail="Service draining - no new publishes accepted")
     # Demo mode: skip queue publishing and persist locally only
     if settings.demo_mode:
-        from persistence import store_transcript
-        store_transcript(filename, text, None, None, source="api-demo")
-        transcripts_published_total.inc()
+        _store_demo_transcript(filename, text)
         return
-    payload = {"filename": filename, "text": text, "source": "api", "publish_time": time.time()}
-    if correlation_id:
-        payload["correlation_id"] = correlation_id
+    payload = _publish_payload(filename, text, correlation_id)
     tracer = trace.get_tracer("publish")
     with tracer.start_as_current_span("publish_transcription") as span:
         span.set_attribute("filename", filename)
-        attempt = 0
-        last_err: Exception | None = None
-        global _cb_fail_count, _cb_open_until
-        now = time.time()
-        if now < _cb_open_until:
-            # fallback: store locally since circuit open
-            from persistence import store_transcript
-            store_transcript(filename, text, None, None, source="api-fallback")
-            audit(AuditEvent.PUBLISH_FAILED, filename=filename, error="circuit_open_fallback", correlation_id=correlation_id)
-            breaker_fallback_persist_total.inc()
+        if _circuit_open():
+            _fallback_circuit_open(payload)
             return
-        while attempt < 3:
+        last_err: Exception | None = None
+        for attempt in range(1, _PUBLISH_ATTEMPTS + 1):
             try:
                 send_to_rabbitmq(
                     queue=settings.transcription_queue,
                     message=payload,
                     rabbitmq_url=settings.rabbitmq_url,
                 )
-                transcripts_published_total.inc()
-                _cb_fail_count = 0
-                break
+                _record_publish_success()
+                return
             except Exception as e:  # noqa: BLE001
                 last_err = e
                 publish_failures_total.inc()
                 span.record_exception(e)
-                attempt += 1
-                if attempt < 3:
-                    import time as _t
-                    _t.sleep(0.5 * attempt)
-        else:
-            audit(AuditEvent.PUBLISH_FAILED, filename=filename, error=str(last_err))
-            _cb_fail_count += 1
-            if _cb_fail_count >= _CB_THRESHOLD:
-                _cb_open_until = time.time() + _CB_RESET_SECONDS
-                breaker_open_total.inc()
-                audit(AuditEvent.PUBLISH_FAILED, filename=filename, error="circuit_open")
-            # Instead of surfacing 503, persist locally for durability
+                if attempt < _PUBLISH_ATTEMPTS:
+                    time.sleep(0.5 * attempt)
+        _record_publish_exhausted(filename, last_err)
+        _journal_to_outbox(payload)
+
+
+async def _send_transcription_async(payload: dict) -> None:
+    if _async_publisher is not None:
+        await _async_publisher.publish(settings.transcription_queue, payload)
+        return
+    # No aio-pika connection: run the pooled sync publisher off the event loop
+    await asyncio.to_thread(
+        send_to_rabbitmq,
+        queue=settings.transcription_queue,
+        message=payload,
+        rabbitmq_url=settings.rabbitmq_url,
+    )
+
+
+async def _publish_transcription_async(
+    filename: str, text: str, correlation_id: str | None = None, batchable: bool = False
+):
+    """Event-loop friendly publish with the same retry + circuit-breaker semantics.
+
+    ``batchable`` messages go through the linger-window batcher when enabled.
+    """
+    if _draining:
+        raise HTTPException(status_code=503, detail="Service draining - no new publishes accepted")
+    if settings.demo_mode:
+        await asyncio.to_thread(_store_demo_transcript, filename, text)
+        return
+    payload = _publish_payload(filename, text, correlation_id)
+    tracer = trace.get_tracer("publish")
+    with tracer.start_as_current_span("publish_transcription") as span:
+        span.set_attribute("filename", filename)
+        # Breaker state lives in Redis and the audit log is a sync write: keep both off the loop
+        if await asyncio.to_thread(_circuit_open):
+            await asyncio.to_thread(_fallback_circuit_open, payload)
+            return
+        last_err: Exception | None = None
+        batched = False
+        for attempt in range(1, _PUBLISH_ATTEMPTS + 1):
             try:
-                from persistence import store_transcript
-                store_transcript(filename, text, None, None, source="api-fallback-error")
-                breaker_fallback_persist_total.inc()
+                batched = batchable and _publish_batcher is not None
+                if batched:
+                    await _publish_batcher.submit(payload)
+                else:
+                    await _send_transcription_async(payload)
+                await asyncio.to_thread(_record_publish_success)
                 return
-            except Exception:
-                raise HTTPException(status_code=503, detail="Queue unavailable")
+            except Exception as e:  # noqa: BLE001
+                last_err = e
+                publish_failures_total.inc()
+                span.record_exception(e)
+                if attempt < _PUBLISH_ATTEMPTS:
+                    await asyncio.sleep(0.5 * attempt)
+        # a failed batch flush was already counted once by the batcher
+        await asyncio.to_thread(_record_publish_exhausted, filename, last_err, not batched)
+        await asyncio.to_thread(_journal_to_outbox, payload)
 
 def _require_scope(user: dict, required: str):
     if user.get('role') == 'guest':
@@ -1049,6 +1225,69 @@ def _require_scope(user: dict, required: str):
     if not (_has_scope(scope_str, required) or _role_allows(user.get('role'), required)):
         raise HTTPException(status_code=403, detail=f"Missing scope or role disallows: {required}")
 
+def _split_fields(fields: Optional[str]) -> Optional[list[str]]:
+    return [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+@app.get("/transcripts")
+def list_transcripts_endpoint(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    source: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user),
+):
+    """Newest-first listing; ``fields`` is a comma separated projection, ``cursor`` the previous ``next_cursor``."""
+    _require_scope(current_user, 'user/DocumentReference.read')
+    try:
+        items, next_cursor = list_transcripts(
+            limit=limit, cursor=cursor, fields=_split_fields(fields), source=source, since=since, until=until,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@app.get("/transcripts/export")
+def export_transcripts(
+    fields: Optional[str] = None,
+    source: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user),
+):
+    """Stream every matching transcript as NDJSON, oldest first."""
+    _require_scope(current_user, 'user/DocumentReference.read')
+    try:
+        rows = iter_transcripts(fields=_split_fields(fields), source=source, since=since, until=until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    audit(AuditEvent.TRANSCRIPT_EXPORT, source=source, since=since and since.isoformat(),
+          until=until and until.isoformat(), fields=fields)
+
+    def _lines():
+        for row in rows:
+            yield json.dumps(row, default=str) + "\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+@app.get("/transcripts/search")
+def search_transcripts_endpoint(
+    q: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[int] = None,
+    current_user: dict = Depends(get_current_user),
+):
+    """Keyword search over the blind index; all terms must match, newest first."""
+    _require_scope(current_user, 'user/DocumentReference.read')
+    try:
+        items, next_cursor = search_transcripts(q, limit=limit, cursor=cursor)
+    except RuntimeError:
+        raise HTTPException(status_code=503, detail="Search index not enabled")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
 @app.get("/transcripts/{transcript_id}")
 def fetch_transcript(transcript_id: int, current_user: dict = Depends(get_current_user)):
     # RBAC: require read scope
@@ -1096,7 +1335,7 @@ async def transcribe_cloud_endpoint(
         except Exception as e:  # noqa: BLE001
             raise HTTPException(status_code=500, detail=f"Cloud transcription failed: {e}")
         text = normalize_text(text)
-        _publish_transcription(file.filename, text, getattr(request.state, 'correlation_id', None) if request else None)
+        await _publish_transcription_async(file.filename, text, getattr(request.state, 'correlation_id', None) if request else None)
         logger.info("cloud_transcribe_success", filename=sanitize_log_input(file.filename), chars=len(text))
         if settings.mask_phi_in_responses:
             return {"text": mask_phi_for_response(text)}
@@ -1115,7 +1354,7 @@ async def transcribe_cloud_endpoint(
         # If raw text provided, treat as already-transcribed ambient snippet.
         if raw_text:
             text = normalize_text(raw_text)
-            _publish_transcription("ambient", text, getattr(request.state, 'correlation_id', None) if request else None)
+            await _publish_transcription_async("ambient", text, getattr(request.state, 'correlation_id', None) if request else None, batchable=True)
             logger.info("ambient_text_ingested", chars=len(text))
             if settings.mask_phi_in_responses:
                 return {"text": mask_phi_for_response(text)}
@@ -1139,13 +1378,13 @@ async def transcribe_cloud_endpoint(
             except Exception as e:  # noqa: BLE001
                 raise HTTPException(status_code=500, detail=f"Cloud transcription failed: {e}")
             text = normalize_text(text)
-            _publish_transcription("inline", text, getattr(request.state, 'correlation_id', None))
+            await _publish_transcription_async("inline", text, getattr(request.state, 'correlation_id', None))
             logger.info("cloud_transcribe_success_inline", chars=len(text), language=sanitize_log_input(language), temperature=temperature)
             if settings.mask_phi_in_responses:
                 return {"text": mask_phi_for_response(text)}
             return {"text": text}
         raise HTTPException(status_code=400, detail="No text or audio provided.")
-        _publish_transcription("ambient", text, getattr(request.state, 'correlation_id', None) if request else None)
+        await _publish_transcription_async("ambient", text, getattr(request.state, 'correlation_id', None) if request else None)
         logger.info("ambient_text_ingested", chars=len(text))
         if settings.mask_phi_in_responses:
             return {"text": mask_phi_for_response(text)}
@@ -1195,11 +1434,69 @@ async def upload_chunk(
 
 
 from persistence import async_task_create, async_task_update, async_task_get
+from persistence import async_task_start, async_task_progress, async_task_cancel
 
 def _run_local_transcription(data: bytes, filename: str, mime_type: str | None) -> str:
     with transcription_duration_seconds.time():
         return transcribe_local(data, filename, mime_type)
 
+
+def _submit_local_task(data: bytes, filename: str, mime_type: str | None, correlation_id: str | None) -> JSONResponse:
+    """Queue a local transcription on the bounded executor and return 202 with its task id."""
+    from datetime import datetime, UTC, timedelta
+    task_id = hashlib.sha256(os.urandom(16)).hexdigest()[:16]
+
+    def _task():
+        if not async_task_start(task_id):  # cancelled before a worker picked it up
+            return
+        start = time.time()
+        job = _async_jobs.get(task_id)
+        cancel_event = job.cancel_event if job else threading.Event()
+
+        def _on_progress(processed: float, total: float | None) -> bool:
+            eta_at = None
+            if total and processed > 0:
+                elapsed = time.time() - start
+                eta_at = datetime.now(UTC) + timedelta(seconds=elapsed / processed * max(0.0, total - processed))
+            return async_task_progress(task_id, processed, total, eta_at)
+
+        try:
+            with transcription_progress(_on_progress, cancel_event):
+                text = _run_local_transcription(data, filename, mime_type)
+            if cancel_event.is_set():
+                raise TranscriptionCancelled("transcription cancelled")
+            text_n = normalize_text(text)
+            _publish_transcription(filename, text_n, correlation_id)
+            audit(AuditEvent.TRANSCRIPT_STORE, filename=filename, task_id=task_id, async_mode=True)
+            if async_task_update(task_id, 'done', result_text=text_n, expected_status='processing'):
+                async_tasks_completed_total.inc()
+            else:  # cancelled after the last segment; keep the cancel
+                logger.info("async_task_cancelled", task_id=task_id, stage="finished")
+        except TranscriptionCancelled:
+            async_task_cancel(task_id)
+            async_tasks_cancelled_total.labels(stage="running").inc()
+            logger.info("async_task_cancelled", task_id=task_id)
+        except Exception as e:  # noqa: BLE001
+            if async_task_update(task_id, 'error', error=str(e), expected_status='processing'):
+                async_tasks_failed_total.inc()
+        finally:
+            async_task_duration_seconds.observe(time.time() - start)
+
+    async_task_create(task_id, filename)
+    async_tasks_started_total.inc()
+    job = _AsyncJob(task_id, _task)
+    with _async_jobs_lock:
+        _async_jobs[task_id] = job
+    try:
+        _submission_queue.put_nowait(job)
+        async_task_queue_size.set(_submission_queue.qsize())
+    except _queue.Full:
+        _forget_async_job(task_id)
+        async_task_update(task_id, 'error', error='queue_full')
+        async_tasks_failed_total.inc()
+        raise HTTPException(status_code=503, detail="Async processing capacity exhausted")
+    return JSONResponse(status_code=202, content={"task_id": task_id, "status": "queued"})
+
 @app.post("/transcribe/local/")
 async def transcribe_local_endpoint(
     file: UploadFile = File(...),
@@ -1220,31 +1517,7 @@ async def transcribe_local_endpoint(
     data = await file.read()
     if async_mode:
         # Offload to thread executor and return 202 with task id
-        task_id = hashlib.sha256(os.urandom(16)).hexdigest()[:16]
-        def _task():
-            start = time.time()
-            try:
-                text = _run_local_transcription(data, file.filename, mime_type)
-                text_n = normalize_text(text)
-                _publish_transcription(file.filename, text_n, getattr(request.state,'correlation_id',None) if request else None)
-                audit(AuditEvent.TRANSCRIPT_STORE, filename=file.filename, task_id=task_id, async_mode=True)
-                async_task_update(task_id, 'done', result_text=text_n)
-                async_tasks_completed_total.inc()
-            except Exception as e:  # noqa: BLE001
-                async_task_update(task_id, 'error', error=str(e))
-                async_tasks_failed_total.inc()
-            finally:
-                async_task_duration_seconds.observe(time.time() - start)
-        async_task_create(task_id, file.filename)
-        async_tasks_started_total.inc()
-        try:
-            _submission_queue.put_nowait((_task, tuple(), {}))
-            async_task_queue_size.set(_submission_queue.qsize())
-        except _queue.Full:
-            async_task_update(task_id, 'error', error='queue_full')
-            async_tasks_failed_total.inc()
-            raise HTTPException(status_code=503, detail="Async processing capacity exhausted")
-        return JSONResponse(status_code=202, content={"task_id": task_id, "status": "processing"})
+        return _submit_local_task(data, file.filename, mime_type, getattr(request.state, 'correlation_id', None) if request else None)
     # synchronous path
     try:
         text = _run_local_transcription(data, file.filename, mime_type)
@@ -1253,7 +1526,7 @@ async def transcribe_local_endpoint(
     except Exception as e:  # noqa: BLE001
         raise HTTPException(status_code=500, detail=f"Local transcription failed: {e}")
     text = normalize_text(text)
-    _publish_transcription(file.filename, text, getattr(request.state, 'correlation_id', None) if request else None)
+    await _publish_transcription_async(file.filename, text, getattr(request.state, 'correlation_id', None) if request else None)
     logger.info("local_transcribe_success", filename=sanitize_log_input(file.filename), chars=len(text))
     if settings.mask_phi_in_responses:
         return {"text": mask_phi_for_response(text)}
@@ -1287,40 +1560,14 @@ async def transcribe_unified(
         if target_local:
             # Reuse existing logic by constructing a pseudo UploadFile call path
             if async_mode:
-                # minimal duplication: call existing local endpoint logic
-                # Inline subset to avoid extra roundtrip
-                task_id = hashlib.sha256(os.urandom(16)).hexdigest()[:16]
-                def _task():
-                    start = time.time()
-                    try:
-                        text_loc = _run_local_transcription(data, file.filename, mime_type)
-                        text_norm = normalize_text(text_loc)
-                        _publish_transcription(file.filename, text_norm, getattr(request.state,'correlation_id',None))
-                        audit(AuditEvent.TRANSCRIPT_STORE, filename=file.filename, task_id=task_id, async_mode=True)
-                        async_task_update(task_id, 'done', result_text=text_norm)
-                        async_tasks_completed_total.inc()
-                    except Exception as e:  # noqa: BLE001
-                        async_task_update(task_id, 'error', error=str(e))
-                        async_tasks_failed_total.inc()
-                    finally:
-                        async_task_duration_seconds.observe(time.time() - start)
-                async_task_create(task_id, file.filename)
-                async_tasks_started_total.inc()
-                try:
-                    _submission_queue.put_nowait((_task, tuple(), {}))
-                    async_task_queue_size.set(_submission_queue.qsize())
-                except _queue.Full:
-                    async_task_update(task_id, 'error', error='queue_full')
-                    async_tasks_failed_total.inc()
-                    raise HTTPException(status_code=503, detail="Async processing capacity exhausted")
-                return JSONResponse(status_code=202, content={"task_id": task_id, "status": "processing"})
+                return _submit_local_task(data, file.filename, mime_type, getattr(request.state, 'correlation_id', None))
             # synchronous local
             try:
                 text_loc = _run_local_transcription(data, file.filename, mime_type)
             except Exception as e:  # noqa: BLE001
                 raise HTTPException(status_code=500, detail=f"Local transcription failed: {e}")
             text_norm = normalize_text(text_loc)
-            _publish_transcription(file.filename, text_norm, getattr(request.state,'correlation_id',None))
+            await _publish_transcription_async(file.filename, text_norm, getattr(request.state,'correlation_id',None))
             if settings.mask_phi_in_responses:
                 return {"text": mask_phi_for_response(text_norm)}
             return {"text": text_norm}
@@ -1332,7 +1579,7 @@ async def transcribe_unified(
         except Exception as e:  # noqa: BLE001
             raise HTTPException(status_code=500, detail=f"Cloud transcription failed: {e}")
         text_norm = normalize_text(raw_text)
-        _publish_transcription(file.filename, text_norm, getattr(request.state,'correlation_id',None))
+        await _publish_transcription_async(file.filename, text_norm, getattr(request.state,'correlation_id',None))
         if settings.mask_phi_in_responses:
             return {"text": mask_phi_for_response(text_norm), "cloud": True}
         return {"text": text_norm, "cloud": True}
@@ -1348,7 +1595,7 @@ async def transcribe_unified(
     filename = body.get('filename') or f"ambient_{int(time.time())}.txt"
     ambient_norm = normalize_text(ambient_text)
     # Publish without running model
-    _publish_transcription(filename, ambient_norm, getattr(request.state,'correlation_id',None))
+    await _publish_transcription_async(filename, ambient_norm, getattr(request.state,'correlation_id',None), batchable=True)
     audit(AuditEvent.TRANSCRIPT_STORE, filename=filename, ambient=True)
     if settings.mask_phi_in_responses:
         ambient_norm = mask_phi_for_response(ambient_norm)
@@ -1360,7 +1607,46 @@ def local_transcribe_task_status(task_id: str, current_user: dict = Depends(get_
     info = async_task_get(task_id)
     if not info:
         raise HTTPException(status_code=404, detail="Task not found")
-    return {"task_id": info['task_id'], "status": info['status'], "text": info.get('result_text'), "error": info.get('error')}
+    processed = info.get('progress_seconds')
+    total = info.get('total_seconds')
+    eta_at = info.get('estimated_completion_at')
+    return {
+        "task_id": info['task_id'],
+        "status": info['status'],
+        "text": info.get('result_text'),
+        "error": info.get('error'),
+        "progress_seconds": processed,
+        "total_seconds": total,
+        "progress": round(min(1.0, processed / total), 4) if processed is not None and total else None,
+        "estimated_completion_at": eta_at.isoformat() if eta_at else None,
+    }
+
+
+@app.delete("/transcribe/local/task/{task_id}")
+def local_transcribe_task_cancel(task_id: str, current_user: dict = Depends(get_current_user)):
+    """Cancel an async task.
+
+    Queued jobs are dropped before they reach a worker; running jobs stop
+    cooperatively at the next segment boundary (202 until the worker notices).
+    """
+    _require_scope(current_user, 'user/DocumentReference.write')
+    info = async_task_get(task_id)
+    if not info:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if info['status'] not in ('queued', 'processing'):
+        raise HTTPException(status_code=409, detail=f"Task already {info['status']}")
+    job = _async_jobs.get(task_id)
+    if job is not None:
+        job.cancel_event.set()
+    # Still in the submission queue: the dispatcher skips it. Queued inside the
+    # executor: future.cancel() removes it before a worker picks it up.
+    removed = job is not None and job.future is not None and job.future.cancel()
+    async_task_cancel(task_id)
+    if info['status'] == 'processing' and not removed:
+        # Persisted status also stops workers on other replicas at their next progress update
+        return JSONResponse(status_code=202, content={"task_id": task_id, "status": "cancelling"})
+    async_tasks_cancelled_total.labels(stage="queued").inc()
+    return {"task_id": task_id, "status": "cancelled"}
 
 
 @app.get("/")
@@ -1378,7 +1664,7 @@ def health_ready():
     try:
         if _draining:
             raise RuntimeError("draining")
-        send_to_rabbitmq(queue="health_check", message={"ok": True}, rabbitmq_url=settings.rabbitmq_url)
+        get_publisher(settings.rabbitmq_url).ping()
         return {"status": "ready"}
     except Exception as e:  # noqa: BLE001
         raise HTTPException(status_code=503, detail=f"Not ready: {e}")
@@ -1439,7 +1725,27 @@ def initiate_drain(request: Request):
 @app.get("/admin/drain/status")
 def drain_status(request: Request):
     _require_admin(request)
-    return {"draining": _draining, "circuit_open_until": _cb_open_until, "cb_fail_count": _cb_fail_count}
+    breaker = _breaker.snapshot()
+    return {
+        "draining": _draining,
+        "circuit_state": breaker["state"],
+        "circuit_open_until": breaker["open_until"],
+        "cb_fail_count": breaker["failures"],
+    }
+
+@app.get("/admin/encryption/rotation")
+def encryption_rotation_status(request: Request, exact: bool = False):
+    _require_admin(request)
+    # exact=true adds per-key row counts, which scan the transcripts table
+    return encryption_rotation_progress(exact=exact)
+
+@app.post("/admin/encryption/rotation", status_code=202)
+def start_encryption_rotation(request: Request):
+    _require_admin(request)
+    if rotation_in_progress():
+        return {"status": "running"}
+    threading.Thread(target=rotate_encryption_keys, name="encryption-rotate-admin", daemon=True).start()
+    return {"status": "started"}
 
 @app.get("/network_advice/")
 def network_advice(bandwidth_kbps: float = 0):
@@ -1580,7 +1886,7 @@ async def websocket_transcribe(ws: WebSocket):
                 try:
                     text = transcribe_local(bytes(session.buffer), msg.get("filename", "stream.wav"), "audio/wav")
                     text = normalize_text(text)
-                    _publish_transcription(msg.get("filename", "stream.wav"), text)
+                    await _publish_transcription_async(msg.get("filename", "stream.wav"), text)
                     await ws.send_json({"type": "final", "text": text})
                 except Exception as e:  # noqa: BLE001
                     await ws.send_json({"type": "error", "error": f"transcription_failed: {e}"})
@@ -1757,6 +2063,26 @@ def _start_migration_revision_check():
     if not _db_revision_matches():
         raise RuntimeError("Database migration revision mismatch – run alembic upgrade head")
 
+def _start_outbox_relay():
+    from outbox import start_relay_thread
+    start_relay_thread(
+        # allow_request (not state) so the relay can take the half-open probe on a quiet API
+        can_publish=lambda: not settings.demo_mode and _breaker.allow_request(),
+        stop=lambda: _shutdown_flag,
+        on_success=_breaker.record_success,
+        on_failure=_breaker.record_failure,
+    )
+
+def _start_search_index_rebuild():
+    """Index existing transcripts in the background when the primary index key has no completed build."""
+    try:
+        if search_index_complete():
+            return
+    except Exception as e:  # noqa: BLE001
+        structlog.get_logger(__name__).warning("search_index/state-check-failed", error=str(e))
+        return
+    threading.Thread(target=rebuild_search_index, daemon=True, name="search-index-rebuild").start()
+
 def _start_retention_thread():
     if settings.retention_days and settings.retention_days > 0:
         import threading, time as _t
@@ -1770,6 +2096,25 @@ def _start_retention_thread():
                 _t.sleep(3600)  # hourly
         threading.Thread(target=_loop, daemon=True, name="retention-purge").start()
 
+def _start_partition_maintenance():
+    """Keep upcoming monthly partitions split off ``pmax`` when transcripts is partitioned (MySQL)."""
+    from partitions import is_partitioned, maintain_partitions
+    try:
+        if not is_partitioned():
+            return
+    except Exception as e:  # noqa: BLE001
+        structlog.get_logger(__name__).warning("partitions/state-check-failed", error=str(e))
+        return
+
+    def _loop():
+        while not _shutdown_flag:
+            try:
+                maintain_partitions()
+            except Exception as e:  # noqa: BLE001
+                structlog.get_logger(__name__).warning("partitions/maintenance-failed", error=str(e))
+            time.sleep(6 * 3600)
+    threading.Thread(target=_loop, daemon=True, name="partition-maintenance").start()
+
 def cleanup_async_tasks_once() -> int:
     from datetime import datetime, UTC, timedelta
     from sqlalchemy import delete
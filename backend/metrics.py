@@ -40,11 +40,17 @@ nextcloud_upload_success_total = Counter(
 nextcloud_upload_failure_total = Counter(
 	"nextcloud_upload_failure_total", "Transcripts that failed uploading to Nextcloud", ["reason"]
 )
+nextcloud_upload_retries_total = Counter(
+	"nextcloud_upload_retries_total", "Nextcloud upload attempts retried by the uploader"
+)
 reprocessor_attempt_total = Counter(
 	"reprocessor_attempt_total", "DLQ reprocessor attempts"
 )
 reprocessor_success_total = Counter(
-	"reprocessor_success_total", "DLQ reprocessor successful republishes"
+	"reprocessor_success_total", "DLQ messages republished to the main queue"
+)
+reprocessor_scheduled_total = Counter(
+	"reprocessor_scheduled_total", "DLQ retries scheduled on a TTL delay queue"
 )
 reprocessor_failure_total = Counter(
 	"reprocessor_failure_total", "DLQ reprocessor transient failures"
@@ -52,13 +58,58 @@ reprocessor_failure_total = Counter(
 reprocessor_permanent_failure_total = Counter(
 	"reprocessor_permanent_failure_total", "DLQ messages exhausted retries"
 )
+reprocessor_parked_total = Counter(
+	"reprocessor_parked_total", "DLQ messages moved to the parked queue", ["reason"]
+)
 transcripts_purged_total = Counter(
 	"transcripts_purged_total", "Transcripts purged by retention job"
 )
+retention_purge_rows_per_second = Gauge(
+	"retention_purge_rows_per_second", "Transcript rows deleted per second by the last retention purge run"
+)
+retention_artifact_deletions_total = Counter(
+	"retention_artifact_deletions_total", "Nextcloud artifact deletions journaled for purged transcripts"
+)
+nextcloud_artifacts_deleted_total = Counter(
+	"nextcloud_artifacts_deleted_total", "Transcript artifact files deleted from Nextcloud"
+)
+transcript_partitions = Gauge(
+	"transcript_partitions", "Monthly partitions of the transcripts table (MySQL)"
+)
+transcript_partitions_dropped_total = Counter(
+	"transcript_partitions_dropped_total", "Expired monthly transcript partitions dropped by retention"
+)
 
 publish_failures_total = Counter(
 	"publish_failures_total", "Failures attempting to publish to queue"
 )
+rabbitmq_publisher_reconnects_total = Counter(
+	"rabbitmq_publisher_reconnects_total", "Pooled publisher channels re-established after a connection error"
+)
+rabbitmq_publisher_open_channels = Gauge(
+	"rabbitmq_publisher_open_channels", "Open pooled publisher channels in this process"
+)
+rabbitmq_compressed_messages_total = Counter(
+	"rabbitmq_compressed_messages_total", "Published messages compressed above the size threshold", ["encoding"]
+)
+rabbitmq_compression_saved_bytes_total = Counter(
+	"rabbitmq_compression_saved_bytes_total", "Bytes saved on the wire by payload compression", ["encoding"]
+)
+consumer_inflight_messages = Gauge(
+	"consumer_inflight_messages", "Deliveries currently being processed by consumer workers"
+)
+consumer_stage_seconds = Histogram(
+	"consumer_stage_seconds",
+	"Time spent per consumer stage (parse, idempotency, enrichment, persist, nextcloud, ack)",
+	["stage"],
+	buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+consumer_batch_size = Histogram(
+	"consumer_batch_size", "Transcripts persisted per consumer batch flush", buckets=(0,1,2,5,10,25,50,100,250)
+)
+amqp_batch_size = Histogram(
+	"amqp_batch_size", "Transcripts per batched AMQP envelope", buckets=(1,2,5,10,25,50,100,250)
+)
 
 transcripts_persist_failures_total = Counter(
 	"transcripts_persist_failures_total", "Failed transcript persistence attempts"
@@ -96,20 +147,53 @@ idempotency_memory_hits_total = Counter(
 	"idempotency_memory_hits_total",
 	"Messages recognized as duplicates via in-memory idempotency layer",
 )
+idempotency_bloom_only_duplicates_total = Counter(
+	"idempotency_bloom_only_duplicates_total",
+	"Messages dropped on the RedisBloom answer alone (IDEMPOTENCY_BLOOM_ONLY); includes false positives",
+)
+idempotency_keys_expired_total = Counter(
+	"idempotency_keys_expired_total",
+	"Expired DB idempotency keys removed by the background sweeper",
+)
 
 # Operational gauges
 transcription_queue_depth = Gauge(
 	"transcription_queue_depth",
-	"vault_refresh_failures_total",
 	"Current depth of the transcription publish queue (approximate)",
 )
+consumer_processing_rate = Gauge(
+	"consumer_processing_rate",
+	"Smoothed deliveries acked per second by this consumer",
+)
+transcription_queue_drain_seconds = Gauge(
+	"transcription_queue_drain_seconds",
+	"Estimated seconds to drain the transcription queue at the current processing rate",
+)
 
 # Circuit breaker metrics
 breaker_open_total = Counter(
 	"breaker_open_total", "Times the publish circuit breaker opened"
 )
 breaker_fallback_persist_total = Counter(
-	"breaker_fallback_persist_total", "Transcripts persisted locally due to open circuit"
+	"breaker_fallback_persist_total", "Transcripts written to the local publish outbox due to open circuit or publish failure"
+)
+breaker_state = Gauge(
+	"breaker_state", "Circuit breaker state as last observed by this process (0=closed, 1=open, 2=half_open)", ["breaker"]
+)
+breaker_state_transitions_total = Counter(
+	"breaker_state_transitions_total", "Circuit breaker state transitions performed by this process", ["breaker", "state"]
+)
+outbox_depth = Gauge(
+	"outbox_depth", "Messages waiting in the local publish outbox"
+)
+outbox_oldest_age_seconds = Gauge(
+	"outbox_oldest_age_seconds", "Age of the oldest message waiting in the local publish outbox"
+)
+outbox_parked = Gauge(
+	"outbox_parked", "Undecodable outbox rows parked with last_error set (never relayed)"
+)
+outbox_relayed_total = Counter(
+	"outbox_relayed_total", "Outbox messages relayed to the broker"
 )
 
 # JWKS / external auth metrics
@@ -138,6 +222,9 @@ async_tasks_failed_total = Counter(
 async_task_duration_seconds = Histogram(
 	"async_task_duration_seconds", "Async transcription task processing duration seconds", buckets=(0.5,1,2,3,5,8,13,21,34,55)
 )
+async_tasks_cancelled_total = Counter(
+	"async_tasks_cancelled_total", "Async transcription tasks cancelled by the caller", ["stage"]  # stage=queued|running
+)
 async_task_queue_size = Gauge(
 	"async_task_queue_size", "Current size of the async transcription submission queue"
 )
@@ -199,6 +286,28 @@ encryption_rotate_failures_total = Counter(
 	'Number of rotation batch attempts that failed'
 )
 
+encryption_rotation_rows_remaining = _Gauge(
+	'encryption_rotation_rows_remaining',
+	'Transcript rows not yet rotated off a non-primary encryption key',
+	['kid']
+)
+
+transcript_compression_saved_bytes_total = Counter(
+	'transcript_compression_saved_bytes_total',
+	'Plaintext bytes saved by compressing transcript fields before encryption',
+	['codec']
+)
+
+search_index_rebuild_rows_total = Counter(
+	'search_index_rebuild_rows_total',
+	'Transcripts (re)indexed by blind search index rebuilds'
+)
+
+transcript_search_seconds = Histogram(
+	'transcript_search_seconds',
+	'Latency of blind-index transcript searches'
+)
+
 __all__ = [
 	# counters
 	"transcripts_published_total",
@@ -209,12 +318,24 @@ __all__ = [
 	"transcripts_persisted_total",
 	"nextcloud_upload_success_total",
 	"nextcloud_upload_failure_total",
+	"nextcloud_upload_retries_total",
 	"reprocessor_attempt_total",
 	"reprocessor_success_total",
+	"reprocessor_scheduled_total",
 	"reprocessor_failure_total",
 	"reprocessor_permanent_failure_total",
+	"reprocessor_parked_total",
 	"transcripts_purged_total",
+	"retention_purge_rows_per_second",
+	"retention_artifact_deletions_total",
+	"nextcloud_artifacts_deleted_total",
+	"transcript_partitions",
+	"transcript_partitions_dropped_total",
 	"publish_failures_total",
+	"rabbitmq_publisher_reconnects_total",
+	"rabbitmq_publisher_open_channels",
+	"rabbitmq_compressed_messages_total",
+	"rabbitmq_compression_saved_bytes_total",
 	"transcripts_persist_failures_total",
 	"audit_events_total",
 	"decryption_warnings_total",
@@ -222,7 +343,11 @@ __all__ = [
 	"idempotency_db_hits_total",
 	"idempotency_redis_hits_total",
 	"idempotency_memory_hits_total",
+	"idempotency_bloom_only_duplicates_total",
+	"idempotency_keys_expired_total",
 	"transcription_queue_depth",
+	"consumer_processing_rate",
+	"transcription_queue_drain_seconds",
 	"vault_token_renew_success_total",
 	"vault_token_renew_failures_total",
 	"encryption_rotate_updated_total",
@@ -232,8 +357,15 @@ __all__ = [
 	"encryption_active_keys",
 	"encryption_rotate_attempt_total",
 	"encryption_rotate_failures_total",
+	"encryption_rotation_rows_remaining",
+	"transcript_compression_saved_bytes_total",
+	"search_index_rebuild_rows_total",
+	"transcript_search_seconds",
 	"breaker_open_total",
 	"breaker_fallback_persist_total",
+	"outbox_relayed_total",
+	"breaker_state_transitions_total",
+	"breaker_state",
 	"jwks_refresh_total",
 	"jwks_keys_active",
 	"phi_redactions_total",
@@ -241,6 +373,7 @@ __all__ = [
 	"async_tasks_completed_total",
 	"async_tasks_failed_total",
 	"async_tasks_purged_total",
+	"async_tasks_cancelled_total",
 	"drain_start_total",
 	# histograms
 	"transcription_duration_seconds",
@@ -250,4 +383,11 @@ __all__ = [
 	"e2e_transcription_latency_seconds",
 	"async_task_duration_seconds",
 	"async_task_queue_size",
+	"amqp_batch_size",
+	"consumer_inflight_messages",
+	"consumer_stage_seconds",
+	"consumer_batch_size",
+	"outbox_depth",
+	"outbox_oldest_age_seconds",
+	"outbox_parked",
 ]
\ No newline at end of file
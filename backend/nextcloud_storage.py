@@ -9,22 +9,25 @@ from __future__ import annotations
 
 import json
 import re
+import xml.etree.ElementTree as ET
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import PurePosixPath
 from threading import RLock
 from typing import Any, Dict, Optional
-from urllib.parse import quote
+from urllib.parse import quote, unquote
 
 import requests
 from requests.auth import HTTPBasicAuth
 import structlog
 
 from config import get_settings
-from metrics import nextcloud_upload_success_total, nextcloud_upload_failure_total
+from metrics import nextcloud_artifacts_deleted_total, nextcloud_upload_success_total, nextcloud_upload_failure_total
 
 _log = structlog.get_logger(__name__)
 
+ARTIFACT_LOOKUP_DAYS = 1  # upload lag tolerated when locating artifacts without a recorded path
+
 
 class NextcloudStorageError(RuntimeError):
     """Raised when interactions with Nextcloud fail."""
@@ -124,6 +127,43 @@ class NextcloudClient:
                 f"Upload failed for '{rel_path}': {resp.status_code} {resp.text}"
             )
 
+    def list_collection(self, rel_dir: str) -> list[str]:
+        """Names of the entries directly inside ``rel_dir``; empty if it does not exist."""
+        url = self._full_path(rel_dir)
+        resp = requests.request(
+            "PROPFIND",
+            url,
+            headers={"Depth": "1", "OCS-APIREQUEST": "true"},
+            auth=self._auth,
+            timeout=self._config.timeout,
+            verify=self._config.verify_tls,
+        )
+        if resp.status_code == 404:
+            return []
+        if resp.status_code != 207:
+            raise NextcloudStorageError(f"Listing failed for '{rel_dir}': {resp.status_code} {resp.text}")
+        names = []
+        for href in ET.fromstring(resp.content).iter("{DAV:}href"):
+            name = unquote((href.text or "").rstrip("/").rsplit("/", 1)[-1])
+            if name and not (href.text or "").endswith("/"):
+                names.append(name)
+        return names
+
+    def delete_document(self, rel_path: str) -> bool:
+        """Delete one document; False if it was already gone."""
+        resp = requests.delete(
+            self._full_path(rel_path),
+            headers={"OCS-APIREQUEST": "true"},
+            auth=self._auth,
+            timeout=self._config.timeout,
+            verify=self._config.verify_tls,
+        )
+        if resp.status_code == 404:
+            return False
+        if resp.status_code not in (200, 204):
+            raise NextcloudStorageError(f"Delete failed for '{rel_path}': {resp.status_code} {resp.text}")
+        return True
+
 
 _client: Optional[NextcloudClient] = None
 _client_lock = RLock()
@@ -161,6 +201,107 @@ def _select_client() -> NextcloudClient:
         return _client
 
 
+def upload_transcript_payload(
+    record_id: int,
+    filename: str,
+    text: str,
+    summary: Optional[str],
+    enrichment: Optional[Dict[str, Any]],
+    metadata: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Upload the JSON and text artifacts for one transcript.
+
+    Unlike :func:`store_transcript_payload` errors propagate
+    (``NextcloudStorageError`` or ``requests.RequestException``) so callers
+    such as the upload worker can retry.
+    """
+    client = _select_client()
+    now = datetime.now(timezone.utc)
+    date_path = now.strftime("%Y/%m/%d")
+    safe_name = _slugify(PurePosixPath(filename).stem or "transcript")
+    base_name = f"{now.strftime('%H%M%S')}-{record_id}-{safe_name}"
+    json_payload: Dict[str, Any] = {
+        "record_id": record_id,
+        "filename": filename,
+        "text": text,
+        "summary": summary,
+        "enrichment": enrichment or {},
+        "metadata": metadata or {},
+        "stored_at": now.isoformat(),
+    }
+    json_rel_path = f"{date_path}/{base_name}.json"
+    text_rel_path = f"{date_path}/{base_name}.txt"
+    # recorded before the writes so a partial upload is still found by the retention purge
+    _record_artifacts(record_id, f"{date_path}/{base_name}")
+
+    client.upload_document(
+        json_rel_path,
+        json.dumps(json_payload, ensure_ascii=False, indent=2).encode("utf-8"),
+        "application/json; charset=utf-8",
+    )
+    client.upload_document(
+        text_rel_path,
+        text.encode("utf-8"),
+        "text/plain; charset=utf-8",
+    )
+    _log.info(
+        "nextcloud/uploaded",
+        json_path=json_rel_path,
+        text_path=text_rel_path,
+        record_id=record_id,
+    )
+    nextcloud_upload_success_total.inc()
+
+
+def _record_artifacts(record_id: int, base_path: str) -> None:
+    try:
+        from persistence import record_transcript_artifacts
+        record_transcript_artifacts(record_id, base_path)
+    except Exception as exc:  # noqa: BLE001 - deletion falls back to the dated lookup
+        _log.warning("nextcloud/artifact-record-failed", record_id=record_id, error=str(exc))
+
+
+def _artifact_pattern(record_id: int, filename: str) -> re.Pattern:
+    safe_name = _slugify(PurePosixPath(filename or "").stem or "transcript")
+    return re.compile(rf"\d{{6}}-{int(record_id)}-{re.escape(safe_name)}\.(?:json|txt)")
+
+
+def delete_transcript_artifacts(
+    record_id: int, filename: str, created_at: Optional[str] = None, paths: Optional[list[str]] = None
+) -> int:
+    """Delete the JSON and text artifacts uploaded for one transcript; returns files deleted.
+
+    ``paths`` are the base paths recorded at upload time (see
+    ``persistence.record_transcript_artifacts``). Transcripts uploaded before
+    paths were recorded are located instead by searching the day they were
+    stored and the following ``ARTIFACT_LOOKUP_DAYS`` for
+    ``HHMMSS-<record_id>-<name>.*``. Errors propagate like
+    :func:`upload_transcript_payload` so callers can retry.
+    """
+    client = _select_client()
+    deleted = 0
+    if paths:
+        for base_path in paths:
+            for suffix in (".json", ".txt"):
+                if client.delete_document(f"{base_path}{suffix}"):
+                    deleted += 1
+    else:
+        stored = datetime.fromisoformat(created_at) if created_at else datetime.now(timezone.utc)
+        if stored.tzinfo is None:
+            stored = stored.replace(tzinfo=timezone.utc)
+        stored = stored.astimezone(timezone.utc)
+        pattern = _artifact_pattern(record_id, filename)
+        for offset in range(ARTIFACT_LOOKUP_DAYS + 1):
+            date_path = (stored + timedelta(days=offset)).strftime("%Y/%m/%d")
+            for name in client.list_collection(date_path):
+                if pattern.fullmatch(name) and client.delete_document(f"{date_path}/{name}"):
+                    deleted += 1
+    if deleted:
+        nextcloud_artifacts_deleted_total.inc(deleted)
+    _log.info("nextcloud/deleted", record_id=record_id, files=deleted)
+    return deleted
+
+
 def store_transcript_payload(
     record_id: int,
     filename: str,
@@ -190,45 +331,13 @@ def store_transcript_payload(
     if settings.storage_provider.lower() != "nextcloud":
         return
     try:
-        client = _select_client()
+        _select_client()
     except NextcloudStorageError as exc:  # pragma: no cover - configuration errors
         _log.error("nextcloud/config-error", error=str(exc))
         return
 
-    now = datetime.now(timezone.utc)
-    date_path = now.strftime("%Y/%m/%d")
-    safe_name = _slugify(PurePosixPath(filename).stem or "transcript")
-    base_name = f"{now.strftime('%H%M%S')}-{record_id}-{safe_name}"
-    json_payload: Dict[str, Any] = {
-        "record_id": record_id,
-        "filename": filename,
-        "text": text,
-        "summary": summary,
-        "enrichment": enrichment or {},
-        "metadata": metadata or {},
-        "stored_at": now.isoformat(),
-    }
-    json_rel_path = f"{date_path}/{base_name}.json"
-    text_rel_path = f"{date_path}/{base_name}.txt"
-
     try:
-        client.upload_document(
-            json_rel_path,
-            json.dumps(json_payload, ensure_ascii=False, indent=2).encode("utf-8"),
-            "application/json; charset=utf-8",
-        )
-        client.upload_document(
-            text_rel_path,
-            text.encode("utf-8"),
-            "text/plain; charset=utf-8",
-        )
-        _log.info(
-            "nextcloud/uploaded",
-            json_path=json_rel_path,
-            text_path=text_rel_path,
-            record_id=record_id,
-        )
-        nextcloud_upload_success_total.inc()
+        upload_transcript_payload(record_id, filename, text, summary, enrichment, metadata)
     except NextcloudStorageError as exc:
         nextcloud_upload_failure_total.labels(reason="client_error").inc()
         _log.error(
@@ -244,4 +353,4 @@ def store_transcript_payload(
             error=str(exc),
             record_id=record_id,
             filename=filename,
-        )
\ No newline at end of file
+        )
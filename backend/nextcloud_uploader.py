@@ -0,0 +1,189 @@
+"""Nextcloud upload worker.
+
+The transcription consumer acks a message once the transcript is in the
+database and hands the WebDAV write to this stage by publishing an upload job
+to ``NEXTCLOUD_UPLOAD_QUEUE`` (default ``transcript_uploads``). This process
+drains that queue on a pool of uploader threads, so slow or unavailable
+Nextcloud only backs up this queue instead of throttling ingestion.
+
+In this mode the retention purge journals ``{"op": "delete", ...}`` jobs on
+the same queue for the artifacts of purged transcripts; they share the
+retry/park handling.
+
+Each job is retried in place with exponential backoff (the delivery stays
+unacked, so a crash redelivers it); after ``NEXTCLOUD_UPLOAD_MAX_ATTEMPTS`` it
+is parked on ``<queue>_dlq``.
+
+Run with::
+
+    python -m nextcloud_uploader
+"""
+from __future__ import annotations
+
+import functools
+import json
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+import pika
+import requests
+import structlog
+
+from config import get_settings
+from metrics import nextcloud_upload_failure_total, nextcloud_upload_retries_total
+from nextcloud_storage import NextcloudStorageError, delete_transcript_artifacts, upload_transcript_payload
+from rabbitmq_utils import decode_body, send_to_rabbitmq, unpack_envelope
+from worker_http import start_worker_server
+
+logger = structlog.get_logger(__name__).bind(component="nextcloud_uploader")
+
+settings = get_settings()
+RABBITMQ_URL = settings.rabbitmq_url
+UPLOAD_QUEUE = settings.nextcloud_upload_queue
+UPLOAD_DLQ = f"{UPLOAD_QUEUE}_dlq"
+
+_UPLOAD_FIELDS = ("record_id", "filename", "text", "summary", "enrichment", "metadata")
+
+
+def upload_job(record_id: int, filename: str, text: str, summary, enrichment, metadata) -> Dict[str, Any]:
+    """Build the queue message for one transcript upload."""
+    return {
+        "record_id": record_id,
+        "filename": filename,
+        "text": text,
+        "summary": summary,
+        "enrichment": enrichment,
+        "metadata": metadata,
+    }
+
+
+def delete_job(
+    record_id: int, filename: str, created_at: str | None, paths: list[str] | None = None
+) -> Dict[str, Any]:
+    """Build the queue message removing one purged transcript's artifacts."""
+    return {"op": "delete", "record_id": record_id, "filename": filename, "created_at": created_at, "paths": paths}
+
+
+def _run_job(job: Dict[str, Any]) -> None:
+    if job.get("op") == "delete":
+        delete_transcript_artifacts(
+            job.get("record_id"), job.get("filename") or "", job.get("created_at"), job.get("paths")
+        )
+    else:
+        upload_transcript_payload(**{k: job.get(k) for k in _UPLOAD_FIELDS})
+
+
+def _backoff(attempt: int) -> float:
+    return min(settings.nextcloud_upload_backoff_seconds * (2 ** (attempt - 1)), 60.0)
+
+
+def process_job(job: Dict[str, Any], sleep=time.sleep) -> bool:
+    """Run one upload or delete job, retrying transient failures; False once it has been parked."""
+    max_attempts = max(1, settings.nextcloud_upload_max_attempts)
+    for attempt in range(1, max_attempts + 1):
+        try:
+            _run_job(job)
+            return True
+        except (NextcloudStorageError, requests.RequestException) as exc:
+            reason = "client_error" if isinstance(exc, NextcloudStorageError) else "network_error"
+            nextcloud_upload_failure_total.labels(reason=reason).inc()
+            logger.warning(
+                "upload_failed", record_id=job.get("record_id"), op=job.get("op", "upload"), attempt=attempt, error=str(exc)
+            )
+            if attempt < max_attempts:
+                nextcloud_upload_retries_total.inc()
+                sleep(_backoff(attempt))
+    nextcloud_upload_failure_total.labels(reason="parked").inc()
+    try:
+        send_to_rabbitmq(
+            queue=UPLOAD_DLQ, message={**job, "reason": "upload_failed", "_upload_attempts": max_attempts},
+            rabbitmq_url=RABBITMQ_URL,
+        )
+    except Exception as exc:  # noqa: BLE001
+        logger.error("upload_park_failed", record_id=job.get("record_id"), error=str(exc))
+    logger.error("upload_parked", record_id=job.get("record_id"), attempts=max_attempts)
+    return False
+
+
+class UploaderPool:
+    """Run upload jobs on worker threads; acks go back through the connection thread."""
+
+    def __init__(self, connection, channel, workers: int):
+        self._connection = connection
+        self._channel = channel
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nextcloud-uploader")
+
+    def on_message(self, ch, method, properties, body) -> None:
+        self._pool.submit(self._work, method.delivery_tag, properties, body)
+
+    def _work(self, delivery_tag, properties, body) -> None:
+        try:
+            # jobs relayed from the publish outbox may arrive as a batch envelope
+            jobs = unpack_envelope(json.loads(decode_body(body, getattr(properties, "content_encoding", None))))
+        except ValueError as exc:
+            nextcloud_upload_failure_total.labels(reason="malformed").inc()
+            logger.warning("drop_malformed", size=len(body), error=str(exc))
+            jobs = []
+        for job in jobs:
+            if not isinstance(job, dict):
+                nextcloud_upload_failure_total.labels(reason="malformed").inc()
+                continue
+            try:
+                process_job(job)
+            except Exception as exc:  # noqa: BLE001
+                logger.exception("upload_job_error", error=str(exc))
+        self._connection.add_callback_threadsafe(functools.partial(self._ack, delivery_tag))
+
+    def _ack(self, delivery_tag) -> None:
+        if getattr(self._channel, "is_open", True):
+            self._channel.basic_ack(delivery_tag=delivery_tag)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+_stop_event = threading.Event()
+
+
+def run() -> None:
+    workers = max(1, settings.nextcloud_uploader_workers)
+    logger.info("starting_uploader", queue=UPLOAD_QUEUE, workers=workers)
+    connection = pika.BlockingConnection(pika.URLParameters(RABBITMQ_URL))
+    channel = connection.channel()
+    channel.queue_declare(queue=UPLOAD_QUEUE, durable=True)
+    channel.queue_declare(queue=UPLOAD_DLQ, durable=True)
+    channel.basic_qos(prefetch_count=workers)
+    pool = UploaderPool(connection, channel, workers)
+    channel.basic_consume(queue=UPLOAD_QUEUE, on_message_callback=pool.on_message)
+    start_worker_server(
+        settings.nextcloud_uploader_metrics_port,
+        "nextcloud_uploader",
+        ready=lambda: {"connection_open": connection.is_open, "consuming": not _stop_event.is_set()},
+    )
+
+    def _graceful(*_a):
+        logger.info("signal_received_shutdown")
+        _stop_event.set()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):  # pragma: no cover
+        try:
+            signal.signal(sig, _graceful)
+        except Exception:  # noqa: BLE001
+            pass
+
+    try:
+        while not _stop_event.is_set():
+            connection.process_data_events(time_limit=1)
+    finally:
+        pool.shutdown()
+        if not connection.is_closed:
+            # deliver acks queued by workers before closing
+            connection.process_data_events(time_limit=1)
+            connection.close()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    run()
@@ -1,10 +1,13 @@
+import functools
 import hashlib
 import json
 import os
 import threading
 import time
-from datetime import datetime, timezone, timedelta
-from typing import Any, Dict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
 
 import pika
 import redis
@@ -13,24 +16,37 @@ from dotenv import load_dotenv
 from opentelemetry import trace  # type: ignore
 from opentelemetry.instrumentation.requests import RequestsInstrumentor  # type: ignore
 from opentelemetry.propagate import extract
-from sqlalchemy import text
 
 from config import get_settings
 from entity_extraction import extract_entities, summarize_text
 from metrics import (
     consumer_dlq_total,
+    consumer_batch_size,
     consumer_failure_total,
+    consumer_inflight_messages,
+    consumer_stage_seconds,
     duplicates_skipped_total,
     e2e_transcription_latency_seconds,
+    idempotency_bloom_only_duplicates_total,
     idempotency_db_hits_total,
     idempotency_memory_hits_total,
     idempotency_redis_hits_total,
-    transcription_queue_depth,
     transcripts_persisted_total,
 )
 from nextcloud_storage import store_transcript_payload
-from persistence import SESSION_MAKER, store_transcript
-from rabbitmq_utils import send_to_rabbitmq
+from nextcloud_uploader import upload_job
+from idempotency_cache import BloomFilter, SeenCache
+from persistence import (
+    claim_idempotency_key,
+    outbox_append,
+    purge_expired_idempotency_keys,
+    release_idempotency_key,
+    store_transcript,
+    store_transcripts,
+)
+from queue_monitor import AmqpDepthSampler, QueueMonitor
+from rabbitmq_utils import decode_body, send_to_rabbitmq, unpack_envelope
+from worker_http import start_worker_server
 try:  # optional instrumentation
     RequestsInstrumentor().instrument()
 except Exception:  # noqa: BLE001
@@ -45,22 +61,48 @@ DLQ_QUEUE = f"{TRANSCRIPTION_QUEUE}_dlq"
 
 _log = structlog.get_logger(__name__).bind(component="transcription_consumer")
 
-_SEEN_HASHES: list[str] = []  # preserve order for simple FIFO pruning (fallback)
+# In-process fallback when Redis is not configured (or errors): O(1) lookups, FIFO eviction, TTL
+_SEEN_HASHES = SeenCache(settings.idempotency_cache_size, settings.idempotency_ttl_seconds)
+_seen_lock = threading.Lock()
+# Hashes this process claimed in Redis moments ago: burst redeliveries are answered without a round-trip
+_RECENT_CLAIMS = SeenCache(settings.idempotency_recent_cache_size, settings.idempotency_recent_ttl_seconds)
+_local_bloom: BloomFilter | None = None
+_redis_has_bloom = False
 _redis_client = None
+_claim_script = None  # (client, registered script)
+
+# One round-trip for Bloom + claim. ARGV: ttl, hash, bloom_only. Returns 1 if claimed, 0 for a
+# duplicate, 2 for a duplicate decided by the filter alone (bloom-only; may be a false positive).
+_CLAIM_LUA = """
+local maybe_seen = redis.call('BF.ADD', KEYS[2], ARGV[2]) == 0
+if ARGV[3] == '1' then
+  if maybe_seen then return 2 end
+  return 1
+end
+if redis.call('SET', KEYS[1], '1', 'NX', 'EX', tonumber(ARGV[1])) then return 1 end
+return 0
+"""
+
+
+def _redis_module_names(client) -> set[str]:
+    names = set()
+    for module in client.module_list():
+        if isinstance(module, dict):
+            name = module.get("name", module.get(b"name", ""))
+        else:  # flat [b"name", b"bf", b"ver", ...] replies
+            name = module[1] if len(module) > 1 else ""
+        names.add(name.decode() if isinstance(name, bytes) else str(name))
+    return {n.lower() for n in names}
+
+
 if settings.redis_url:
     try:  # noqa: SIM105
         _redis_client = redis.StrictRedis.from_url(settings.redis_url, decode_responses=True)
         # Optionally initialize Bloom filter (requires RedisBloom module loaded)
         if settings.use_bloom_idempotency:
             try:
-                # Check if filter already exists by reserving only if absent.
-                # For BF: BF.RESERVE key error_rate capacity (NX not universally supported; emulate)
-                # We'll attempt an INFO command to see if module present.
-                modules = _redis_client.execute_command("MODULE", "LIST")  # type: ignore[arg-type]
-                has_bloom = any(b"bf" in (m[1] if isinstance(m, list) and len(m) > 1 else b"") for m in modules) or any(
-                    b"redisbloom" in (m[1] if isinstance(m, list) and len(m) > 1 else b"") for m in modules
-                )
-                if has_bloom:
+                _redis_has_bloom = bool(_redis_module_names(_redis_client) & {"bf", "redisbloom"})
+                if _redis_has_bloom:
                     # Try creating filter if not yet created; ignore errors if exists.
                     try:
                         _redis_client.execute_command(
@@ -71,13 +113,17 @@ if settings.redis_url:
                         )
                     except Exception:  # filter likely exists
                         pass
-                else:
-                    # If RedisBloom not present, we silently fall back to normal set logic.
-                    pass
             except Exception:
                 pass
     except Exception:  # noqa: BLE001
         _redis_client = None
+if settings.use_bloom_idempotency and not _redis_has_bloom:
+    # No RedisBloom: keep an in-process filter in front of the seen-cache instead
+    # reseeded from the seen-cache on reset, so its negatives stay exact; the capacity must leave room for them
+    _local_bloom = BloomFilter(
+        max(settings.bloom_capacity, 2 * settings.idempotency_cache_size), settings.bloom_error_rate,
+        reseed=_SEEN_HASHES.keys,
+    )
 
 
 def _message_hash(data: Dict[str, Any]) -> str:
@@ -86,53 +132,140 @@ def _message_hash(data: Dict[str, Any]) -> str:
     return digest.hexdigest()
 
 
-def _check_duplicate(message_hash: str) -> bool:
+def _seen_locally(message_hash: str) -> bool:
+    """Check-and-record ``message_hash`` in the in-process cache; True for a duplicate."""
+    with _seen_lock:
+        if _local_bloom is not None and not _local_bloom.add(message_hash):
+            # definitely new: skip the lookup, just remember it
+            _SEEN_HASHES.add(message_hash)
+            return False
+        return _SEEN_HASHES.check_and_add(message_hash)
+
+
+def _redis_claim(message_hash: str, exact: bool = False) -> bool:
+    """Claim ``message_hash`` in Redis in one round-trip; True if it was new.
+
+    With RedisBloom the Bloom add and the ``SET NX EX`` run in one Lua script.
+    ``IDEMPOTENCY_BLOOM_ONLY`` lets the filter decide alone (no key writes;
+    Bloom false positives are then dropped as duplicates, so those decisions
+    are logged and counted in ``idempotency_bloom_only_duplicates_total``).
+    ``exact`` always uses the key, for DLQ retries the filter has already seen.
+    """
+    global _claim_script
+    key = f"idemp:{message_hash}"
+    if exact or not (settings.use_bloom_idempotency and _redis_has_bloom):
+        return bool(_redis_client.set(name=key, value="1", nx=True, ex=settings.idempotency_ttl_seconds))
+    if _claim_script is None or _claim_script[0] is not _redis_client:
+        _claim_script = (_redis_client, _redis_client.register_script(_CLAIM_LUA))
+    bloom_only = "1" if settings.idempotency_bloom_only else "0"
+    claimed = int(_claim_script[1](
+        keys=[key, "idemp_filter"], args=[settings.idempotency_ttl_seconds, message_hash, bloom_only]
+    ))
+    if claimed == 2:
+        idempotency_bloom_only_duplicates_total.inc()
+        _log.warning("idempotency_bloom_only_duplicate", message_hash=message_hash)
+    return claimed == 1
+
+
+def _check_duplicate(message_hash: str, retry: bool = False) -> bool:
     duplicate = False
     if settings.enable_idempotency:
         if _redis_client:
             try:
-                bloom_maybe_exists = False
-                if settings.use_bloom_idempotency:
-                    try:
-                        bloom_ret = _redis_client.execute_command("BF.ADD", "idemp_filter", message_hash)  # type: ignore[arg-type]
-                        bloom_maybe_exists = bloom_ret in (0, b"0")
-                    except Exception:
-                        bloom_maybe_exists = False
-                key = f"idemp:{message_hash}"
-                added = _redis_client.set(name=key, value="1", nx=True, ex=settings.idempotency_ttl_seconds)
-                if not added:
+                if message_hash in _RECENT_CLAIMS:
+                    duplicate = True
+                    idempotency_memory_hits_total.inc()
+                elif not _redis_claim(message_hash, exact=retry):
                     duplicate = True
                     idempotency_redis_hits_total.inc()
-                elif settings.use_bloom_idempotency and bloom_maybe_exists:
-                    pass
+                else:
+                    _RECENT_CLAIMS.add(message_hash)
             except Exception:
-                if message_hash in _SEEN_HASHES:
-                    duplicate = True
+                duplicate = _seen_locally(message_hash)
         else:
-            if message_hash in _SEEN_HASHES:
+            if _seen_locally(message_hash):
                 duplicate = True
                 idempotency_memory_hits_total.inc()
     if settings.enable_db_idempotency:
         try:
-            with SESSION_MAKER() as session:
-                now_dt = datetime.now(timezone.utc)
-                session.execute(text("DELETE FROM idempotency_keys WHERE expires_at < :now"), {"now": now_dt})
-                existed = session.execute(text("SELECT 1 FROM idempotency_keys WHERE key=:k"), {"k": message_hash}).first()
-                if existed:
-                    duplicate = True
-                    idempotency_db_hits_total.inc()
-                else:
-                    exp = now_dt + timedelta(seconds=settings.idempotency_db_ttl_seconds)
-                    session.execute(
-                        text("INSERT INTO idempotency_keys (key, created_at, expires_at) VALUES (:k, :c, :e)"),
-                        {"k": message_hash, "c": now_dt, "e": exp},
-                    )
-                session.commit()
-        except Exception:
-            pass
+            if not claim_idempotency_key(message_hash, settings.idempotency_db_ttl_seconds):
+                duplicate = True
+                idempotency_db_hits_total.inc()
+        except Exception as e:  # noqa: BLE001
+            _log.warning("idempotency_db_claim_failed", error=str(e))
     return duplicate
 
 
+def _release_claim(message_hash: str) -> None:
+    """Forget the idempotency claim of a message that was not persisted.
+
+    The claim is taken before the transcript is stored, so without this a DLQ
+    retry of a failed message would be skipped as a duplicate. Bloom filters
+    cannot forget an entry; with ``IDEMPOTENCY_BLOOM_ONLY`` retries are claimed
+    with an exact key instead (see ``_check_duplicate``).
+    """
+    _RECENT_CLAIMS.discard(message_hash)
+    _SEEN_HASHES.discard(message_hash)
+    if settings.enable_idempotency and _redis_client:
+        try:
+            _redis_client.delete(f"idemp:{message_hash}")
+        except Exception as e:  # noqa: BLE001
+            _log.warning("idempotency_release_failed", store="redis", error=str(e))
+    if settings.enable_db_idempotency:
+        try:
+            release_idempotency_key(message_hash)
+        except Exception as e:  # noqa: BLE001
+            _log.warning("idempotency_release_failed", store="db", error=str(e))
+
+
+def start_idempotency_sweeper(stop: Callable[[], bool] | None = None) -> threading.Thread:
+    """Periodically delete expired DB idempotency keys in batches (off the message path)."""
+    def _loop():
+        while not (stop and stop()):
+            try:
+                purge_expired_idempotency_keys(batch_size=settings.idempotency_sweep_batch_size)
+            except Exception as e:  # noqa: BLE001
+                _log.warning("idempotency_sweep_error", error=str(e))
+            time.sleep(settings.idempotency_sweep_interval_seconds)
+
+    thread = threading.Thread(target=_loop, daemon=True, name="idempotency-sweeper")
+    thread.start()
+    return thread
+
+
+_queue_monitor = QueueMonitor(AmqpDepthSampler(RABBITMQ_URL, TRANSCRIPTION_QUEUE))
+
+
+_stage_limits: Dict[str, threading.BoundedSemaphore] = {}
+
+
+def configure_stage_limits(limits: Dict[str, int]) -> None:
+    """Cap concurrent workers per stage (enrichment, persist, nextcloud); 0 = unbounded."""
+    _stage_limits.clear()
+    for stage, limit in limits.items():
+        if limit and limit > 0:
+            _stage_limits[stage] = threading.BoundedSemaphore(limit)
+
+
+@contextmanager
+def _stage(name: str):
+    """Run one pipeline stage under its concurrency cap and record its latency.
+
+    Time spent waiting for the cap is excluded, so ``consumer_stage_seconds``
+    shows the work itself and ``consumer_inflight_messages`` the queueing.
+    """
+    limit = _stage_limits.get(name)
+    if limit is not None:
+        limit.acquire()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        consumer_stage_seconds.labels(name).observe(time.perf_counter() - start)
+        if limit is not None:
+            limit.release()
+
+
 def _send_to_dlq(message: Dict[str, Any]) -> None:
     try:
         send_to_rabbitmq(queue=DLQ_QUEUE, message=message, rabbitmq_url=RABBITMQ_URL)
@@ -141,8 +274,7 @@ def _send_to_dlq(message: Dict[str, Any]) -> None:
         pass
 
 
-def callback(ch, method, properties, body):
-    tracer = trace.get_tracer("transcription_consumer")
+def _extract_context(properties):
     carrier: Dict[str, str] = {}
     try:
         if getattr(properties, "headers", None):
@@ -154,51 +286,155 @@ def callback(ch, method, properties, body):
                 carrier[key] = value
     except Exception:
         pass
-    ctx = extract(carrier) if carrier else None
-    with tracer.start_as_current_span("consume_message", context=ctx) as span:
-        logger = _log
+    return extract(carrier) if carrier else None
+
+
+def _handle_delivery(properties, body) -> None:
+    """Parse one delivery and process every transcript it carries (no ack)."""
+    tracer = trace.get_tracer("transcription_consumer")
+    with tracer.start_as_current_span("consume_message", context=_extract_context(properties)) as span:
         try:
-            data: Dict[str, Any] = json.loads(body)
+            with _stage("parse"):
+                data = json.loads(decode_body(body, getattr(properties, "content_encoding", None)))
         except Exception as exc:
             span.record_exception(exc)
-            logger.error("invalid_payload", error=str(exc))
+            _log.error("invalid_payload", error=str(exc))
             consumer_failure_total.inc()
             raw_body = body.decode("utf-8", errors="ignore") if isinstance(body, (bytes, bytearray)) else str(body)
             _send_to_dlq({"raw_body": raw_body, "reason": "invalid_json"})
-            ch.basic_ack(delivery_tag=method.delivery_tag)
             return
 
-        span.set_attribute("filename", data.get("filename", ""))
-        started_ts = None
-        try:
-            started_ts = float(data.get("publish_time"))
-        except Exception:
-            started_ts = None
-        if started_ts:
-            e2e_transcription_latency_seconds.observe(max(0, time.time() - started_ts))
-
-        message_hash = _message_hash(data)
-        if settings.enable_idempotency and _check_duplicate(message_hash):
-            duplicates_skipped_total.inc()
-            logger.info("duplicate_skipped", filename=data.get("filename"))
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            return
+        messages = unpack_envelope(data)
+        if len(messages) > 1:
+            span.set_attribute("batch_size", len(messages))
+        # A batch envelope is acked once, after every transcript in it was handled;
+        # a redelivered batch is made safe by the idempotency checks. A failing
+        # transcript is DLQ'd on its own so its siblings are not replayed.
+        for message in messages:
+            if not isinstance(message, dict):
+                consumer_failure_total.inc()
+                _send_to_dlq({"raw_body": json.dumps(message), "reason": "invalid_json"})
+                continue
+            try:
+                _process_transcript(message, tracer, span)
+            except Exception as exc:  # noqa: BLE001
+                span.record_exception(exc)
+                _log.exception("processing_failed", error=str(exc))
+                consumer_failure_total.inc()
+                _send_to_dlq({**message, "reason": "processing_error"})
+
+
+def callback(ch, method, properties, body):
+    _handle_delivery(properties, body)
+    with _stage("ack"):
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+    _queue_monitor.record_processed()
 
-        if settings.enable_idempotency and not _redis_client:
-            _SEEN_HASHES.append(message_hash)
-            if len(_SEEN_HASHES) > settings.idempotency_cache_size:
-                drop = max(1, settings.idempotency_cache_size // 10)
-                del _SEEN_HASHES[0:drop]
 
-        filename = data.get("filename")
-        text_value = data.get("text")
-        if not filename or not text_value:
-            logger.error("missing_fields", filename=filename)
+class ConcurrentConsumer:
+    """Process deliveries on a bounded worker pool.
+
+    pika channels are not thread-safe, so workers never touch the channel:
+    acks are handed back to the connection thread with
+    ``add_callback_threadsafe``. In-flight work is bounded by the channel
+    prefetch. A delivery whose processing raises is routed to the DLQ
+    (reason ``processing_error``) and acked, since the DLQ reprocessor owns retries;
+    ``_handle_delivery`` already DLQs failing transcripts one by one, so this only
+    catches failures outside a single transcript.
+    """
+
+    def __init__(self, connection, channel, workers: int):
+        self._connection = connection
+        self._channel = channel
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="consumer-worker")
+
+    def on_message(self, ch, method, properties, body) -> None:
+        consumer_inflight_messages.inc()
+        self._pool.submit(self._work, method.delivery_tag, properties, body)
+
+    def _work(self, delivery_tag, properties, body) -> None:
+        try:
+            _handle_delivery(properties, body)
+        except Exception as exc:  # noqa: BLE001
+            _log.exception("processing_failed", error=str(exc))
             consumer_failure_total.inc()
-            _send_to_dlq({**data, "reason": "missing_fields"})
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            return
+            _dlq_delivery(properties, body, "processing_error")
+        finally:
+            consumer_inflight_messages.dec()
+        self._connection.add_callback_threadsafe(functools.partial(self._ack, delivery_tag))
+
+    def _ack(self, delivery_tag) -> None:
+        if getattr(self._channel, "is_open", True):
+            with _stage("ack"):
+                self._channel.basic_ack(delivery_tag=delivery_tag)
+            _queue_monitor.record_processed()
 
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+def _dlq_delivery(properties, body, reason: str) -> None:
+    try:
+        data = json.loads(decode_body(body, getattr(properties, "content_encoding", None)))
+    except Exception:
+        data = None
+    if isinstance(data, dict):
+        _send_to_dlq({**data, "reason": reason})
+    else:
+        raw_body = body.decode("utf-8", errors="ignore") if isinstance(body, (bytes, bytearray)) else str(body)
+        _send_to_dlq({"raw_body": raw_body, "reason": reason})
+
+
+@dataclass
+class _PreparedTranscript:
+    data: Dict[str, Any]
+    filename: str
+    text: str
+    summary: str | None
+    enrichment: Dict[str, Any]
+
+    def record(self) -> Dict[str, Any]:
+        return {
+            "filename": self.filename,
+            "text": self.text,
+            "summary": self.summary,
+            "enrichment": self.enrichment,
+            "source": self.data.get("source", "api"),
+        }
+
+
+def _prepare_transcript(data: Dict[str, Any], span) -> _PreparedTranscript | None:
+    """Idempotency, validation and enrichment; None when nothing is left to persist."""
+    logger = _log
+    span.set_attribute("filename", data.get("filename", ""))
+    started_ts = None
+    try:
+        started_ts = float(data.get("publish_time"))
+    except Exception:
+        started_ts = None
+    if started_ts:
+        e2e_transcription_latency_seconds.observe(max(0, time.time() - started_ts))
+
+    message_hash = _message_hash(data)
+    duplicate = False
+    if settings.enable_idempotency or settings.enable_db_idempotency:
+        with _stage("idempotency"):
+            # DLQ retries and replays had their claim released, but a Bloom filter still remembers them
+            duplicate = _check_duplicate(message_hash, retry=bool(data.get("_dlq_attempts") or data.get("_replayed")))
+    if duplicate:
+        duplicates_skipped_total.inc()
+        logger.info("duplicate_skipped", filename=data.get("filename"))
+        return None
+
+    filename = data.get("filename")
+    text_value = data.get("text")
+    if not filename or not text_value:
+        logger.error("missing_fields", filename=filename)
+        consumer_failure_total.inc()
+        _send_to_dlq({**data, "reason": "missing_fields"})
+        return None
+
+    with _stage("enrichment"):
         try:
             enrichment = extract_entities(text_value)
             enrichment_dict = enrichment.to_dict()
@@ -214,68 +450,223 @@ def callback(ch, method, properties, body):
             logger.warning("summary_failed", error=str(exc))
             summary = None
 
-        with tracer.start_as_current_span("persist_transcript") as pspan:
-            pspan.set_attribute("filename", filename)
-            record_id = store_transcript(
-                filename=filename,
-                text=text_value,
-                summary=summary,
-                enrichment=enrichment_dict,
-                source=data.get("source", "api"),
-            )
-
-        if record_id <= 0:
-            logger.error("persistence_failed", filename=filename)
-            consumer_failure_total.inc()
-            _send_to_dlq({**data, "reason": "persistence_failed"})
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            return
+    return _PreparedTranscript(data, filename, text_value, summary, enrichment_dict)
 
-        transcripts_persisted_total.inc()
 
-        metadata = {
-            "source": data.get("source"),
-            "correlation_id": data.get("correlation_id"),
-            "publish_time": data.get("publish_time"),
-            "queue": TRANSCRIPTION_QUEUE,
-        }
+def _enqueue_upload(job: Dict[str, Any]) -> bool:
+    """Hand a Nextcloud upload to the uploader queue; False means upload inline."""
+    if settings.nextcloud_upload_mode != "queue" or settings.storage_provider.lower() != "nextcloud":
+        return False
+    try:
+        send_to_rabbitmq(queue=settings.nextcloud_upload_queue, message=job, rabbitmq_url=RABBITMQ_URL)
+    except Exception as exc:  # noqa: BLE001
+        # broker hiccup: journal the job so the outbox relay delivers it later
+        _log.warning("upload_enqueue_failed", record_id=job["record_id"], error=str(exc))
+        return outbox_append(settings.nextcloud_upload_queue, job) > 0
+    return True
+
+
+def _finish_transcript(prepared: _PreparedTranscript, record_id: int) -> None:
+    """Post-persist handling: DLQ on failure, else metrics and the Nextcloud upload (queued or inline)."""
+    logger = _log
+    data = prepared.data
+    if record_id <= 0:
+        logger.error("persistence_failed", filename=prepared.filename)
+        consumer_failure_total.inc()
+        _release_claim(_message_hash(data))
+        _send_to_dlq({**data, "reason": "persistence_failed"})
+        return
+
+    transcripts_persisted_total.inc()
+
+    metadata = {
+        "source": data.get("source"),
+        "correlation_id": data.get("correlation_id"),
+        "publish_time": data.get("publish_time"),
+        "queue": TRANSCRIPTION_QUEUE,
+    }
+
+    job = upload_job(record_id, prepared.filename, prepared.text, prepared.summary, prepared.enrichment, metadata)
+    with _stage("nextcloud"):
+        if not _enqueue_upload(job):
+            store_transcript_payload(**job)
+
+    logger.info("transcript_processed", filename=prepared.filename, record_id=record_id)
+
+
+def _prepare_or_release(data: Dict[str, Any], span) -> _PreparedTranscript | None:
+    try:
+        return _prepare_transcript(data, span)
+    except Exception:
+        _release_claim(_message_hash(data))  # nothing was stored; let the DLQ retry through
+        raise
+
+
+def _process_transcript(data: Dict[str, Any], tracer, span) -> None:
+    prepared = _prepare_or_release(data, span)
+    if prepared is None:
+        return
+    with _stage("persist"), tracer.start_as_current_span("persist_transcript") as pspan:
+        pspan.set_attribute("filename", prepared.filename)
+        try:
+            record_id = store_transcript(**prepared.record())
+        except Exception:
+            _release_claim(_message_hash(data))  # nothing was stored; let the DLQ retry through
+            raise
+    _finish_transcript(prepared, record_id)
+
+
+def _persist_batch(prepared: List[_PreparedTranscript]) -> None:
+    """Persist many transcripts in one transaction, falling back to one-by-one on failure."""
+    if not prepared:
+        return
+    tracer = trace.get_tracer("transcription_consumer")
+    with _stage("persist"), tracer.start_as_current_span("persist_transcript_batch") as span:
+        span.set_attribute("batch_size", len(prepared))
+        try:
+            record_ids = store_transcripts([p.record() for p in prepared])
+        except Exception as exc:  # noqa: BLE001
+            span.record_exception(exc)
+            _log.warning("batch_persist_failed", error=str(exc), size=len(prepared))
+            # isolate the bad row(s); each failure is DLQ'd by _finish_transcript
+            record_ids = []
+            for p in prepared:
+                try:
+                    record_ids.append(store_transcript(**p.record()))
+                except Exception:  # noqa: BLE001
+                    record_ids.append(-1)
+    for p, record_id in zip(prepared, record_ids):
+        _finish_transcript(p, record_id)
+
+
+class BatchingConsumer:
+    """Accumulate deliveries and persist their transcripts with one multi-row insert.
+
+    Runs on the pika connection thread: deliveries are parsed, de-duplicated and
+    enriched as they arrive, then flushed when ``batch_size`` transcripts are
+    pending or ``linger_seconds`` after the first one. A flush stores the batch in
+    one transaction and acks every delivery in it with a single
+    ``basic_ack(multiple=True)``; deliveries are handled in order, so the highest
+    tag covers exactly the flushed ones.
+    """
+
+    def __init__(self, connection, channel, batch_size: int, linger_seconds: float):
+        self._connection = connection
+        self._channel = channel
+        self._batch_size = max(1, batch_size)
+        self._linger = max(0.0, linger_seconds)
+        self._prepared: List[_PreparedTranscript] = []
+        self._last_tag = None
+        self._pending_deliveries = 0
+        self._timer = None
+
+    def on_message(self, ch, method, properties, body) -> None:
+        self._prepared.extend(self._prepare_delivery(properties, body))
+        self._last_tag = method.delivery_tag
+        self._pending_deliveries += 1
+        if len(self._prepared) >= self._batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = self._connection.call_later(self._linger, self._on_linger)
+
+    def _prepare_delivery(self, properties, body) -> List[_PreparedTranscript]:
+        prepared: List[_PreparedTranscript] = []
+        tracer = trace.get_tracer("transcription_consumer")
+        with tracer.start_as_current_span("consume_message", context=_extract_context(properties)) as span:
+            try:
+                with _stage("parse"):
+                    data = json.loads(decode_body(body, getattr(properties, "content_encoding", None)))
+            except Exception as exc:
+                span.record_exception(exc)
+                _log.error("invalid_payload", error=str(exc))
+                consumer_failure_total.inc()
+                _dlq_delivery(properties, body, "invalid_json")
+                return prepared
+            for message in unpack_envelope(data):
+                if not isinstance(message, dict):
+                    consumer_failure_total.inc()
+                    _send_to_dlq({"raw_body": json.dumps(message), "reason": "invalid_json"})
+                    continue
+                try:
+                    item = _prepare_or_release(message, span)
+                except Exception as exc:  # noqa: BLE001
+                    _log.exception("processing_failed", error=str(exc))
+                    consumer_failure_total.inc()
+                    _send_to_dlq({**message, "reason": "processing_error"})
+                    continue
+                if item is not None:
+                    prepared.append(item)
+        return prepared
+
+    def _on_linger(self) -> None:
+        self._timer = None
+        self.flush()
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._connection.remove_timeout(self._timer)
+            self._timer = None
+        prepared, self._prepared = self._prepared, []
+        last_tag, self._last_tag = self._last_tag, None
+        if last_tag is None:
+            return
+        consumer_batch_size.observe(len(prepared))
+        _persist_batch(prepared)
+        with _stage("ack"):
+            self._channel.basic_ack(delivery_tag=last_tag, multiple=True)
+        _queue_monitor.record_processed(self._pending_deliveries)
+        self._pending_deliveries = 0
 
-        store_transcript_payload(
-            record_id=record_id,
-            filename=filename,
-            text=text_value,
-            summary=summary,
-            enrichment=enrichment_dict,
-            metadata=metadata,
-        )
 
-        logger.info("transcript_processed", filename=filename, record_id=record_id)
-        ch.basic_ack(delivery_tag=method.delivery_tag)
 def main():
     print(f"[Consumer] Connecting to RabbitMQ at {RABBITMQ_URL}")
     connection = pika.BlockingConnection(pika.URLParameters(RABBITMQ_URL))
     channel = connection.channel()
     channel.queue_declare(queue=TRANSCRIPTION_QUEUE, durable=True)
+    # depth/lag sampling uses its own connection: pika connections are not thread-safe
+    _queue_monitor.start(settings.queue_depth_poll_interval)
+    start_worker_server(
+        settings.consumer_metrics_port,
+        "transcription_consumer",
+        ready=lambda: {"connection_open": connection.is_open, "channel_open": channel.is_open},
+    )
+    if settings.enable_db_idempotency:
+        start_idempotency_sweeper()
+    workers = max(1, settings.consumer_workers)
+    configure_stage_limits({
+        "enrichment": settings.consumer_enrichment_concurrency,
+        "persist": settings.consumer_persist_concurrency,
+        "nextcloud": settings.consumer_nextcloud_concurrency,
+    })
+    dispatcher = None
+    batcher = None
+    on_message = callback
+    prefetch = max(settings.consumer_prefetch, workers)  # prefetch below the worker count leaves workers idle
+    if settings.consumer_batch_size > 1:
+        batcher = BatchingConsumer(
+            connection, channel, settings.consumer_batch_size, settings.consumer_batch_linger_ms / 1000.0
+        )
+        on_message = batcher.on_message
+        prefetch = max(settings.consumer_prefetch, settings.consumer_batch_size)
+        if workers > 1:
+            # batches are collected and flushed on the connection thread; there is no pool to size
+            _log.warning("consumer_workers_ignored", workers=workers, batch_size=settings.consumer_batch_size)
+            workers = 1
+    elif workers > 1:
+        dispatcher = ConcurrentConsumer(connection, channel, workers)
+        on_message = dispatcher.on_message
+    channel.basic_qos(prefetch_count=prefetch)
+    channel.basic_consume(queue=TRANSCRIPTION_QUEUE, on_message_callback=on_message)
+    print(f"[Consumer] Waiting for transcription messages on '{TRANSCRIPTION_QUEUE}' ({workers} worker(s)). Press CTRL+C to exit.")
     try:
-        q = channel.queue_declare(queue=TRANSCRIPTION_QUEUE, passive=True)
-        transcription_queue_depth.set(q.method.message_count)  # type: ignore[attr-defined]
-    except Exception:
-        pass
-
-    def poll_depth():  # background gauge updater
-        while True:
-            try:
-                q = channel.queue_declare(queue=TRANSCRIPTION_QUEUE, passive=True)
-                transcription_queue_depth.set(q.method.message_count)  # type: ignore[attr-defined]
-            except Exception:
-                pass
-            time.sleep(settings.queue_depth_poll_interval)
-
-    threading.Thread(target=poll_depth, daemon=True).start()
-    channel.basic_qos(prefetch_count=1)
-    channel.basic_consume(queue=TRANSCRIPTION_QUEUE, on_message_callback=callback)
-    print(f"[Consumer] Waiting for transcription messages on '{TRANSCRIPTION_QUEUE}'. Press CTRL+C to exit.")
-    channel.start_consuming()
+        channel.start_consuming()
+    finally:
+        if batcher is not None and channel.is_open:
+            batcher.flush()
+        if dispatcher is not None:
+            dispatcher.shutdown()
+            # deliver acks queued by workers before the connection goes away
+            connection.process_data_events(time_limit=1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,143 @@
+"""Publish outbox relay.
+
+When the broker is unreachable or the publish circuit is open, the API journals
+messages in ``publish_outbox`` instead of writing transcripts directly, so they
+still pass through the consumer (idempotency, enrichment, Nextcloud upload).
+``relay_once`` drains the oldest rows to their queues in batch envelopes and
+deletes them in the same transaction that locked them.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, UTC
+from typing import Any, Callable, Dict, List
+
+import structlog
+from sqlalchemy import select
+
+from config import get_settings
+from metrics import outbox_depth, outbox_oldest_age_seconds, outbox_parked, outbox_relayed_total
+from persistence import SessionLocal, publish_outbox, outbox_decode, outbox_stats
+from rabbitmq_utils import make_batch_envelope, send_to_rabbitmq
+
+logger = structlog.get_logger().bind(component="outbox")
+
+Publish = Callable[[str, Dict[str, Any]], None]
+
+
+def _default_publish(queue: str, message: Dict[str, Any]) -> None:
+    send_to_rabbitmq(queue=queue, message=message, rabbitmq_url=get_settings().rabbitmq_url)
+
+
+def update_outbox_metrics() -> int:
+    depth, oldest, parked = outbox_stats()
+    outbox_depth.set(depth)
+    outbox_parked.set(parked)
+    outbox_oldest_age_seconds.set(max(0.0, (datetime.now(UTC) - oldest).total_seconds()) if oldest else 0)
+    return depth
+
+
+def relay_once(batch_size: int | None = None, publish: Publish | None = None) -> int:
+    """Relay up to ``batch_size`` journaled messages; returns how many were published.
+
+    Rows are locked with ``SKIP LOCKED`` where the backend supports it so
+    replicas can relay concurrently. A publish failure rolls the batch back for
+    the next run; rows whose payload cannot be decoded are parked with
+    ``last_error`` set instead of blocking the head of the outbox.
+    """
+    limit = batch_size or get_settings().outbox_relay_batch_size
+    publish = publish or _default_publish
+    relayed = 0
+    with SessionLocal() as session:
+        rows = session.execute(
+            select(publish_outbox.c.id, publish_outbox.c.queue, publish_outbox.c.payload, publish_outbox.c.kid)
+            .where(publish_outbox.c.last_error.is_(None))
+            .order_by(publish_outbox.c.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not rows:
+            return 0
+        by_queue: Dict[str, List[tuple[int, Dict[str, Any]]]] = {}
+        for row in rows:
+            try:
+                message = outbox_decode(row.payload, row.kid)
+            except Exception as e:  # noqa: BLE001
+                logger.error("outbox_parked", id=row.id, error=str(e))
+                session.execute(
+                    publish_outbox.update().where(publish_outbox.c.id == row.id).values(last_error=f"undecodable: {e}")
+                )
+                continue
+            by_queue.setdefault(row.queue, []).append((row.id, message))
+        published_ids: List[int] = []
+        try:
+            for queue, items in by_queue.items():
+                messages = [m for _, m in items]
+                publish(queue, messages[0] if len(messages) == 1 else make_batch_envelope(messages))
+                published_ids.extend(i for i, _ in items)
+        except Exception as e:  # noqa: BLE001
+            logger.warning("outbox_relay_failed", error=str(e), pending=len(rows) - len(published_ids))
+        if published_ids:
+            session.execute(publish_outbox.delete().where(publish_outbox.c.id.in_(published_ids)))
+            relayed = len(published_ids)
+            outbox_relayed_total.inc(relayed)
+        session.commit()
+    if relayed:
+        logger.info("outbox_relayed", count=relayed)
+    return relayed
+
+
+def start_relay_thread(
+    can_publish: Callable[[], bool],
+    stop: Callable[[], bool] | None = None,
+    on_success: Callable[[], Any] | None = None,
+    on_failure: Callable[[], Any] | None = None,
+    publish: Publish | None = None,
+) -> threading.Thread:
+    """Run the relay in a daemon thread.
+
+    ``can_publish`` gates draining and is only asked while rows are pending, so
+    it may claim the publish breaker's half-open probe; ``on_success`` /
+    ``on_failure`` report each relay pass back so the relay alone can close
+    the breaker after an outage. Depth and age metrics are refreshed on every
+    tick regardless.
+    """
+    publish = publish or _default_publish
+    failed: List[Exception] = []
+
+    def _publish(queue: str, message: Dict[str, Any]) -> None:
+        try:
+            publish(queue, message)
+        except Exception as e:  # noqa: BLE001
+            failed.append(e)
+            raise
+
+    def _drain() -> None:
+        while True:
+            failed.clear()
+            relayed = relay_once(publish=_publish)
+            if failed:
+                if on_failure:
+                    on_failure()
+                return
+            if relayed and on_success:
+                on_success()
+            # keep draining full batches back-to-back until the outbox is empty
+            if relayed < get_settings().outbox_relay_batch_size or not can_publish():
+                return
+
+    def _loop():
+        while not (stop and stop()):
+            interval = get_settings().outbox_relay_interval_seconds
+            try:
+                if update_outbox_metrics() and can_publish():
+                    _drain()
+                    update_outbox_metrics()
+            except Exception as e:  # noqa: BLE001
+                logger.warning("outbox_relay_error", error=str(e))
+            time.sleep(interval)
+
+    thread = threading.Thread(target=_loop, daemon=True, name="outbox-relay")
+    thread.start()
+    return thread
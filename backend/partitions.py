@@ -0,0 +1,146 @@
+"""Monthly RANGE partitioning of ``transcripts`` on MySQL.
+
+Migration ``0009`` partitions the table ``BY RANGE COLUMNS(created_at)``:
+partition ``pYYYYMM`` holds one UTC month and ``pmax`` catches rows past the
+last planned month. MySQL requires the partitioning column in every unique
+key, so the primary key becomes ``(id, created_at)``; ``id`` stays
+AUTO_INCREMENT. ``maintain_partitions`` splits the next
+``TRANSCRIPT_PARTITION_MONTHS_AHEAD`` months off the (empty) ``pmax`` so new
+rows never land there, and the retention purge drops whole expired months
+with ``DROP PARTITION`` instead of deleting their rows.
+
+SQLite, and MySQL schemas that were not migrated, report no partitions and
+every function here is a no-op. Run one maintenance pass with::
+
+    python -m partitions
+"""
+from __future__ import annotations
+
+import re
+from datetime import datetime, UTC
+
+import structlog
+from sqlalchemy import text
+
+from config import get_settings
+from metrics import transcript_partitions
+from persistence import ENGINE
+
+_log = structlog.get_logger(__name__)
+
+TABLE = "transcripts"
+OVERFLOW = "pmax"
+_MONTHLY = re.compile(r"p(\d{4})(\d{2})")
+
+
+def month_start(value: datetime) -> datetime:
+    value = value if value.tzinfo else value.replace(tzinfo=UTC)
+    return value.astimezone(UTC).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"p{month:%Y%m}"
+
+
+def _definition(month: datetime) -> str:
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{add_months(month, 1):%Y-%m-%d %H:%M:%S}')"
+
+
+def partition_definitions(first: datetime, last: datetime) -> str:
+    """Monthly partitions from ``first``'s month through ``last``'s, then ``pmax``."""
+    month, last = month_start(first), month_start(last)
+    parts = []
+    while month <= last:
+        parts.append(_definition(month))
+        month = add_months(month, 1)
+    parts.append(f"PARTITION {OVERFLOW} VALUES LESS THAN (MAXVALUE)")
+    return ", ".join(parts)
+
+
+def is_partitioned() -> bool:
+    return ENGINE.url.get_backend_name().startswith("mysql") and bool(list_partitions())
+
+
+def list_partitions() -> list[tuple[str, datetime | None]]:
+    """``(name, exclusive upper bound)`` per partition in order; ``pmax`` has no bound."""
+    if not ENGINE.url.get_backend_name().startswith("mysql"):
+        return []
+    with ENGINE.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        ), {"table": TABLE}).all()
+    out = []
+    for name, bound in rows:
+        bound = (bound or "").strip("'")
+        out.append((name, None if bound in ("", "MAXVALUE") else datetime.fromisoformat(bound).replace(tzinfo=UTC)))
+    return out
+
+
+def missing_months(names: list[str], now: datetime, months_ahead: int) -> list[datetime]:
+    """Months to add so partitions reach ``months_ahead`` months past ``now``."""
+    months = [datetime(int(m.group(1)), int(m.group(2)), 1, tzinfo=UTC) for m in map(_MONTHLY.fullmatch, names) if m]
+    current = month_start(now)
+    month = add_months(max(months), 1) if months else current
+    target = add_months(current, months_ahead)
+    out = []
+    while month <= target:
+        out.append(month)
+        month = add_months(month, 1)
+    return out
+
+
+def expired_partitions(
+    partitions: list[tuple[str, datetime | None]], cutoff: datetime
+) -> list[tuple[str, datetime | None, datetime]]:
+    """``(name, lower bound, upper bound)`` of monthly partitions entirely older than ``cutoff``."""
+    out = []
+    lower = None
+    for name, upper in partitions:
+        if upper is None or upper > cutoff:
+            break
+        if _MONTHLY.fullmatch(name):
+            out.append((name, lower, upper))
+        lower = upper
+    return out
+
+
+def drop_partition(name: str) -> None:
+    if not _MONTHLY.fullmatch(name):
+        raise ValueError(f"refusing to drop partition {name!r}")
+    with ENGINE.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {TABLE} DROP PARTITION {name}"))
+    _log.info("partitions/dropped", partition=name)
+
+
+def maintain_partitions(now: datetime | None = None, months_ahead: int | None = None) -> list[str]:
+    """Split upcoming months off ``pmax``; returns the partitions added."""
+    partitions = list_partitions()
+    if not partitions:
+        return []
+    names = [name for name, _ in partitions]
+    if months_ahead is None:
+        months_ahead = get_settings().transcript_partition_months_ahead
+    months = missing_months(names, now or datetime.now(UTC), months_ahead)
+    if months and OVERFLOW in names:
+        definitions = ", ".join(_definition(m) for m in months)
+        with ENGINE.begin() as conn:
+            conn.execute(text(
+                f"ALTER TABLE {TABLE} REORGANIZE PARTITION {OVERFLOW} INTO "
+                f"({definitions}, PARTITION {OVERFLOW} VALUES LESS THAN (MAXVALUE))"
+            ))
+        _log.info("partitions/added", partitions=[partition_name(m) for m in months])
+    else:
+        months = []
+    transcript_partitions.set(len(names) + len(months) - (OVERFLOW in names))
+    return [partition_name(m) for m in months]
+
+
+if __name__ == "__main__":  # pragma: no cover
+    print(maintain_partitions() or "partitions up to date")
@@ -0,0 +1,98 @@
+"""Stored size and throughput of compress-then-encrypt for transcript fields.
+
+Generates clinical-style transcripts (SOAP notes with varying vitals,
+medications and free text), trains a zstd dictionary on a disjoint sample and
+reports, per codec, the average stored ``text`` column size and rows/s for
+sealing (compress + encrypt + envelope) and opening (``_decrypt_row``)::
+
+    python perf/bench_compression.py --rows 2000 --minutes 2 10 30
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENABLE_FIELD_ENCRYPTION", "true")
+os.environ.setdefault("ENCRYPTION_KEYS", "bench:" + base64.b64encode(os.urandom(32)).decode())
+os.environ.setdefault("PRIMARY_ENCRYPTION_KEY_ID", "bench")
+os.chdir(tempfile.mkdtemp(prefix="bench-compress-"))  # persistence creates ./transcripts.db on import
+
+import persistence  # noqa: E402
+from field_compression import FieldCompressor, train_dictionary, zstandard  # noqa: E402
+
+COMPLAINTS = ["chest pain", "shortness of breath", "lower back pain", "persistent cough", "headache", "fatigue", "dizziness"]
+MEDS = ["metformin 500 mg twice daily", "lisinopril 10 mg daily", "atorvastatin 40 mg nightly", "albuterol as needed",
+        "ibuprofen 400 mg every 6 hours", "levothyroxine 75 mcg daily", "omeprazole 20 mg daily"]
+FILLER = ["um", "okay", "so", "you know", "let me check", "right", "I see"]
+WORDS_PER_MINUTE = 140
+
+
+def _transcript(rng: random.Random, minutes: int) -> str:
+    """Doctor/patient dialogue of roughly ``minutes`` of speech."""
+    complaint = rng.choice(COMPLAINTS)
+    lines = [f"Doctor: Good morning, what brings you in today? Patient: I have had {complaint} for {rng.randint(1, 14)} days."]
+    words = 0
+    while words < minutes * WORDS_PER_MINUTE:
+        kind = rng.random()
+        if kind < 0.25:
+            line = (f"Doctor: Your blood pressure is {rng.randint(100, 160)} over {rng.randint(60, 100)}, "
+                    f"heart rate {rng.randint(55, 110)}, temperature {rng.uniform(36.1, 38.9):.1f}.")
+        elif kind < 0.45:
+            line = f"Doctor: Are you still taking {rng.choice(MEDS)}? Patient: {rng.choice(['Yes', 'Mostly', 'No, I stopped'])}."
+        elif kind < 0.7:
+            line = (f"Patient: {rng.choice(FILLER).capitalize()}, the {complaint} gets worse when I "
+                    f"{rng.choice(['walk', 'lie down', 'eat', 'climb stairs', 'wake up'])}, {rng.choice(FILLER)}.")
+        else:
+            line = (f"Doctor: {rng.choice(FILLER).capitalize()}, I would like to order "
+                    f"{rng.choice(['an ECG', 'a chest x-ray', 'blood work', 'a urinalysis', 'an MRI'])} and see you again in "
+                    f"{rng.randint(1, 6)} weeks.")
+        lines.append(line)
+        words += len(line.split())
+    return " ".join(lines)
+
+
+def _measure(compressor: FieldCompressor, texts: list[str]) -> tuple[float, float, float]:
+    persistence._compressor = compressor
+    start = time.perf_counter()
+    rows = [{"text": persistence._envelope(*persistence._seal_many([t], compress=True)[0])} for t in texts]
+    seal = len(texts) / (time.perf_counter() - start)
+    size = sum(len(r["text"]) for r in rows) / len(rows)
+    start = time.perf_counter()
+    for row in rows:
+        assert persistence._decrypt_row(dict(row))["text"]
+    open_rate = len(texts) / (time.perf_counter() - start)
+    return size, seal, open_rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--minutes", type=int, nargs="+", default=[2, 10, 30], help="transcript lengths (speech minutes)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    persistence.reload_encryption_keys()
+    rng = random.Random(args.seed)
+    codecs = [("none", FieldCompressor()), ("zlib", FieldCompressor("zlib"))]
+    if zstandard is not None:
+        training = [_transcript(rng, rng.choice(args.minutes)) for _ in range(500)]
+        codecs += [
+            ("zstd", FieldCompressor("zstd")),
+            ("zstd+dict", FieldCompressor("zstd", dictionaries=[train_dictionary(training)])),
+        ]
+    for minutes in args.minutes:
+        texts = [_transcript(rng, minutes) for _ in range(args.rows)]
+        raw = sum(len(t.encode()) for t in texts) / len(texts)
+        print(f"{minutes} min transcripts, {raw:,.0f} B plaintext")
+        for name, compressor in codecs:
+            size, seal, open_rate = _measure(compressor, texts)
+            print(f"  {name:<10} stored {size:>9,.0f} B ({size / raw:5.0%})  seal {seal:8,.0f} rows/s  open {open_rate:8,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
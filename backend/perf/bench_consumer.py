@@ -0,0 +1,112 @@
+"""Consumer throughput vs worker count (no broker needed).
+
+Deliveries are fed straight into ``ConcurrentConsumer`` (or the serial
+``callback``) while enrichment, the DB insert and the Nextcloud upload are
+replaced by sleeps that mimic their I/O latency. Acks are drained by a single
+"connection thread", as pika would do::
+
+    python perf/bench_consumer.py --messages 400 --workers 1 2 4 8 16
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import queue
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("FAST_TEST_MODE", "1")
+
+import structlog  # noqa: E402
+
+import openemr_consumer as consumer  # noqa: E402
+
+
+class _Entities:
+    def to_dict(self):
+        return {}
+
+
+class _FakeConnection:
+    """Runs threadsafe callbacks on one thread, like BlockingConnection does."""
+
+    def __init__(self):
+        self.callbacks: queue.Queue = queue.Queue()
+
+    def add_callback_threadsafe(self, cb):
+        self.callbacks.put(cb)
+
+
+class _FakeChannel:
+    is_open = True
+
+    def __init__(self):
+        self.acked = 0
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.acked += 1
+
+
+class _Method:
+    def __init__(self, tag):
+        self.delivery_tag = tag
+
+
+def _patch_stages(enrich_ms: float, persist_ms: float, nextcloud_ms: float) -> None:
+    consumer.settings.enable_idempotency = False
+    consumer.settings.enable_db_idempotency = False
+
+    def extract(text):
+        time.sleep(enrich_ms / 1000)
+        return _Entities()
+
+    def store(**kwargs):
+        time.sleep(persist_ms / 1000)
+        return 1
+
+    consumer.extract_entities = extract
+    consumer.summarize_text = lambda text: None
+    consumer.store_transcript = store
+    consumer.store_transcript_payload = lambda **kwargs: time.sleep(nextcloud_ms / 1000)
+
+
+def run(messages: int, workers: int) -> float:
+    body = json.dumps({"filename": "bench.wav", "text": "bench transcript"}).encode()
+    channel = _FakeChannel()
+    start = time.perf_counter()
+    if workers == 1:
+        for tag in range(messages):
+            consumer.callback(channel, _Method(tag), None, body)
+    else:
+        connection = _FakeConnection()
+        dispatcher = consumer.ConcurrentConsumer(connection, channel, workers)
+        for tag in range(messages):
+            dispatcher.on_message(channel, _Method(tag), None, body)
+        while channel.acked < messages:
+            connection.callbacks.get()()
+        dispatcher.shutdown()
+    return messages / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--enrich-ms", type=float, default=2)
+    parser.add_argument("--persist-ms", type=float, default=5)
+    parser.add_argument("--nextcloud-ms", type=float, default=15)
+    parser.add_argument("--persist-limit", type=int, default=0, help="CONSUMER_PERSIST_CONCURRENCY")
+    args = parser.parse_args()
+    _patch_stages(args.enrich_ms, args.persist_ms, args.nextcloud_ms)
+    consumer.configure_stage_limits({"persist": args.persist_limit})
+    # keep per-message log lines out of the timing loop
+    consumer._log = structlog.wrap_logger(structlog.ReturnLogger())
+    for workers in args.workers:
+        rate = run(args.messages, workers)
+        print(f"workers={workers:<3d} {rate:8.1f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Field-encryption throughput (rows/s) at typical transcript sizes.
+
+Compares the previous per-call path (new ``AESGCM(key)`` and a separate
+encrypt per field / enrichment value) with the cached-cipher batch helpers
+used by ``store_transcript`` and ``get_transcript``. No database involved::
+
+    python perf/bench_encryption.py --rows 2000 --sizes 2000 20000 100000
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENABLE_FIELD_ENCRYPTION", "true")
+os.environ.setdefault("ENCRYPTION_KEYS", "bench:" + base64.b64encode(os.urandom(32)).decode())
+os.environ.setdefault("PRIMARY_ENCRYPTION_KEY_ID", "bench")
+os.chdir(tempfile.mkdtemp(prefix="bench-enc-"))  # persistence creates ./transcripts.db on import
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM  # noqa: E402
+
+import persistence  # noqa: E402
+
+ENRICHMENT = {f"entity_{i}": f"value {i}" for i in range(8)}
+
+
+def _legacy_encrypt(plaintext: str) -> str:
+    key = persistence._enc_material[persistence._settings.primary_encryption_key_id]
+    nonce = os.urandom(12)
+    return base64.b64encode(nonce + AESGCM(key).encrypt(nonce, plaintext.encode(), None)).decode()
+
+
+def _legacy_decrypt(blob: str, kid: str) -> str:
+    raw = base64.b64decode(blob[4:] if blob.startswith("ENC:") else blob)
+    return AESGCM(persistence._enc_material[kid]).decrypt(raw[:12], raw[12:], None).decode()
+
+
+def _legacy_row(text: str, summary: str):
+    return [_legacy_encrypt(text), _legacy_encrypt(summary)], {k: _legacy_encrypt(v) for k, v in ENRICHMENT.items()}
+
+
+def _legacy_decrypt_row(row: dict) -> dict:
+    d = dict(row)
+    for field in ("text", "summary"):
+        env = json.loads(d[field])
+        d[field] = _legacy_decrypt(env["v"], env["kid"])
+    d["enrichment"] = {k: _legacy_decrypt(v["v"], v["kid"]) for k, v in d["enrichment"].items()}
+    return d
+
+
+def _cached_row(text: str, summary: str):
+    return persistence._encrypt_many([text, summary]), persistence._maybe_encrypt_dict(ENRICHMENT)
+
+
+def _rate(fn, rows: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rows):
+        fn()
+    return rows / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000, 100000], help="transcript text bytes")
+    args = parser.parse_args()
+    persistence.reload_encryption_keys()
+    for size in args.sizes:
+        text = ("patient reports mild headache " * (size // 30 + 1))[:size]
+        summary = text[: max(200, size // 20)]
+        row = {
+            "text": persistence._envelope(*persistence._encrypt_field(text)),
+            "summary": persistence._envelope(*persistence._encrypt_field(summary)),
+            "enrichment": persistence._maybe_encrypt_dict(ENRICHMENT),
+        }
+        enc_legacy = _rate(lambda: _legacy_row(text, summary), args.rows)
+        enc_cached = _rate(lambda: _cached_row(text, summary), args.rows)
+        dec_legacy = _rate(lambda: _legacy_decrypt_row(row), args.rows)
+        dec_cached = _rate(lambda: persistence._decrypt_row(dict(row)), args.rows)
+        print(
+            f"{size:>7d} B  encrypt {enc_legacy:9.0f} -> {enc_cached:9.0f} rows/s   "
+            f"decrypt {dec_legacy:9.0f} -> {dec_cached:9.0f} rows/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
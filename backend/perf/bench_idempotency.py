@@ -0,0 +1,79 @@
+"""DB idempotency claim cost with a large existing key set.
+
+Compares the previous per-message transaction (DELETE expired + SELECT +
+INSERT) with the single-statement ``claim_idempotency_key``. Runs against a
+throwaway SQLite file unless ``TRANSCRIPTS_DB_HOST`` points at MySQL::
+
+    python perf/bench_idempotency.py --existing 1000000 --messages 2000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, UTC
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+if not os.environ.get("TRANSCRIPTS_DB_HOST"):
+    os.chdir(tempfile.mkdtemp(prefix="bench-idemp-"))  # persistence opens ./transcripts.db
+
+from sqlalchemy import text  # noqa: E402
+
+from persistence import SessionLocal, claim_idempotency_key, idempotency_keys  # noqa: E402
+
+TTL = 86400
+
+
+def _seed(count: int, expired_ratio: float) -> None:
+    now = datetime.now(UTC)
+    with SessionLocal() as session:
+        session.execute(idempotency_keys.delete())
+        chunk = 10000
+        for start in range(0, count, chunk):
+            rows = []
+            for i in range(start, min(start + chunk, count)):
+                expires = now - timedelta(seconds=1) if i < count * expired_ratio else now + timedelta(seconds=TTL)
+                rows.append({"key": uuid.uuid4().hex + uuid.uuid4().hex, "created_at": now, "expires_at": expires})
+            session.execute(idempotency_keys.insert(), rows)
+        session.commit()
+
+
+def _legacy_claim(key: str) -> bool:
+    with SessionLocal() as session:
+        now = datetime.now(UTC)
+        session.execute(text("DELETE FROM idempotency_keys WHERE expires_at < :now"), {"now": now})
+        existed = session.execute(text('SELECT 1 FROM idempotency_keys WHERE "key"=:k'), {"k": key}).first()
+        if not existed:
+            session.execute(idempotency_keys.insert().values(key=key, created_at=now, expires_at=now + timedelta(seconds=TTL)))
+        session.commit()
+        return not existed
+
+
+def _run(label: str, claim, messages: int) -> None:
+    keys = [uuid.uuid4().hex + uuid.uuid4().hex for _ in range(messages)]
+    start = time.perf_counter()
+    for key in keys:
+        claim(key)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8s} {messages / elapsed:9.1f} claims/s  ({elapsed / messages * 1000:.3f} ms/claim)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--existing", type=int, default=1_000_000)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--expired-ratio", type=float, default=0.0, help="share of seeded keys already expired")
+    parser.add_argument("--rounds", type=int, default=2)
+    args = parser.parse_args()
+    print(f"seeding {args.existing} keys ...")
+    _seed(args.existing, args.expired_ratio)
+    for _ in range(args.rounds):
+        _run("legacy", _legacy_claim, args.messages)
+        _run("claim", lambda k: claim_idempotency_key(k, TTL), args.messages)
+
+
+if __name__ == "__main__":
+    main()
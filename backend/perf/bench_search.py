@@ -0,0 +1,83 @@
+"""Blind-index search latency over a large token table.
+
+Seeds ``transcript_search_tokens`` with ``--transcripts`` documents of
+``--terms`` tokens drawn from a Zipf-like vocabulary (no transcript rows, so
+only the index lookup is timed), then times ``search_transcripts`` for one-,
+two- and three-term queries. Runs against a throwaway SQLite file unless
+``TRANSCRIPTS_DB_HOST`` points at MySQL::
+
+    python perf/bench_search.py --transcripts 200000 --terms 60
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ENABLE_SEARCH_INDEX", "true")
+os.environ.setdefault("SEARCH_INDEX_KEYS", "bench:" + base64.b64encode(os.urandom(32)).decode())
+os.environ.setdefault("PRIMARY_SEARCH_INDEX_KEY_ID", "bench")
+if not os.environ.get("TRANSCRIPTS_DB_HOST"):
+    os.chdir(tempfile.mkdtemp(prefix="bench-search-"))  # persistence opens ./transcripts.db
+
+import persistence  # noqa: E402
+
+VOCABULARY = 20000
+
+
+def _word(rank: int) -> str:
+    return f"term{rank}"
+
+
+def _seed(count: int, terms: int, rng: random.Random) -> None:
+    index = persistence._search_index()
+    weights = [1 / (r + 1) for r in range(VOCABULARY)]
+    with persistence.SessionLocal() as session:
+        session.execute(persistence.search_tokens.delete())
+        for start in range(0, count, 2000):
+            entries = []
+            for tid in range(start + 1, min(start + 2000, count) + 1):
+                entries.append((tid, {_word(r) for r in rng.choices(range(VOCABULARY), weights, k=terms)}))
+            persistence._insert_search_tokens(session, entries)
+            session.commit()
+
+
+def _time(query: str, runs: int) -> tuple[float, float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        persistence.search_transcripts(query, limit=50)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples) * 1000, samples[int(len(samples) * 0.95) - 1] * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transcripts", type=int, default=200000)
+    parser.add_argument("--terms", type=int, default=60, help="distinct tokens per transcript (before dedupe)")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+    rng = random.Random(11)
+    start = time.perf_counter()
+    _seed(args.transcripts, args.terms, rng)
+    print(f"seeded {args.transcripts:,} transcripts in {time.perf_counter() - start:.1f}s")
+    queries = {
+        "common term": _word(0),
+        "rare term": _word(VOCABULARY - 1),
+        "common + mid": f"{_word(0)} {_word(50)}",
+        "three terms": f"{_word(1)} {_word(20)} {_word(400)}",
+    }
+    for label, query in queries.items():
+        p50, p95 = _time(query, args.runs)
+        print(f"  {label:<14} p50 {p50:7.2f} ms  p95 {p95:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,19 +6,23 @@ Store minimal metadata + enrichment JSON + FHIR DocumentReference ID when availa
 from __future__ import annotations
 
 import os
-from datetime import datetime, UTC
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC, timedelta
 import json
-from typing import Any, Dict
+from typing import Any, Dict, Iterator
 
 from sqlalchemy import (
-    create_engine, MetaData, Table, Column, Integer, String, Text, DateTime
+    create_engine, MetaData, Table, Column, Index, Integer, String, Text, DateTime, Float, text as sql_text
 )
 from sqlalchemy.dialects.mysql import JSON as MYSQL_JSON  # type: ignore
 from sqlalchemy.types import JSON as SQLITE_JSON
 from sqlalchemy.engine import Engine
-from sqlalchemy.exc import SQLAlchemyError
-from audit import mask_phi, audit, AuditEvent
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from audit import mask_phi, mask_phi_many, audit, AuditEvent
+from blind_index import BlindIndex, query_terms, transcript_terms
 from config import get_settings
+from field_compression import FieldCompressor
 from sqlalchemy.orm import sessionmaker
 from base64 import b64decode, b64encode
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
@@ -30,11 +34,18 @@ from metrics import (
     encryption_active_keys,
     encryption_rotate_attempt_total,
     encryption_rotate_failures_total,
+    encryption_rotation_rows_remaining,
+    transcript_compression_saved_bytes_total,
+    search_index_rebuild_rows_total,
+    transcript_search_seconds,
+    idempotency_keys_expired_total,
 )
 import structlog
-from threading import RLock
+from threading import Lock, RLock
 
 _enc_material: dict[str, bytes] = {}
+_ciphers: dict[str, AESGCM] = {}  # kid -> cipher, rebuilt together with _enc_material
+_compressor = FieldCompressor()  # compress-then-encrypt for text/summary, from FIELD_COMPRESSION*
 _settings = get_settings()
 _encryption_initialized = False
 _enc_lock = RLock()
@@ -45,13 +56,21 @@ def _load_encryption_material(force: bool = False) -> None:
 
     Safe to call multiple times; respects force flag. Sets _encryption_initialized.
     """
-    global _enc_material, _settings, _encryption_initialized
+    global _enc_material, _ciphers, _compressor, _settings, _encryption_initialized
     with _enc_lock:
         if not force and _encryption_initialized and _enc_material:
             return
         _settings = get_settings()
         _enc_material = {}
+        _ciphers = {}
         _encryption_initialized = True
+        try:
+            _compressor = FieldCompressor.from_settings(_settings)
+        except Exception:
+            _log.exception("encryption/compression-config-failed")
+            _compressor = FieldCompressor()
+            if os.environ.get('ENV','dev') == 'prod':
+                raise
         if not (_settings.enable_field_encryption and _settings.encryption_keys and _settings.primary_encryption_key_id):
             if _settings.enable_field_encryption:
                 _log.warning("encryption/config-missing", primary=_settings.primary_encryption_key_id, keys=bool(_settings.encryption_keys))
@@ -81,6 +100,7 @@ def _load_encryption_material(force: bool = False) -> None:
                 if os.environ.get('ENV','dev') == 'prod':
                     raise RuntimeError("Primary encryption key id missing or invalid")
                 return
+            _ciphers = {kid: AESGCM(key) for kid, key in _enc_material.items()}
             encryption_key_reload_total.inc()
             encryption_active_keys.set(len(_enc_material))
             if invalid:
@@ -89,6 +109,7 @@ def _load_encryption_material(force: bool = False) -> None:
         except Exception as e:  # pragma: no cover
             _log.exception("encryption/load-failed")
             _enc_material = {}
+            _ciphers = {}
             encryption_active_keys.set(0)
             if os.environ.get('ENV','dev') == 'prod':
                 raise
@@ -102,76 +123,144 @@ def reload_encryption_keys() -> int:
     return len(_enc_material)
 
 def _encrypt_field(plaintext: str | None) -> tuple[str | None, str | None]:
-    if plaintext is None:
-        return plaintext, None
+    return _encrypt_many([plaintext])[0]
+
+def _encrypt_many(plaintexts: list[str | None]) -> list[tuple[str | None, str | None]]:
+    """Encrypt a batch with the primary key: one cipher lookup and one nonce draw.
+
+    Returns ``(blob, kid)`` per input; ``(value, None)`` when encryption is
+    off or fails, ``(None, None)`` for ``None`` inputs.
+    """
+    return [(blob, kid) for blob, kid, _ in _seal_many(plaintexts)]
+
+def _seal_many(plaintexts: list[str | None], compress: bool = False) -> list[tuple[str | None, str | None, str | None]]:
+    """``_encrypt_many`` returning ``(blob, kid, codec)``; ``compress`` runs FIELD_COMPRESSION first."""
     if not _enc_material:
         _load_encryption_material()
-    if not _enc_material:
-        return plaintext, None
     kid = _settings.primary_encryption_key_id
-    key = _enc_material.get(kid)
-    if not key:
-        return plaintext, None
+    aes = _ciphers.get(kid) if kid else None
+    if aes is None:
+        return [(p, None, None) for p in plaintexts]
+    compressor = _compressor if compress else None
     try:
-        aes = AESGCM(key)
-        import os as _os
-        nonce = _os.urandom(12)
-        ct = aes.encrypt(nonce, plaintext.encode(), None)
-        blob = b64encode(nonce + ct).decode()
-        return blob, kid
+        nonces = os.urandom(12 * len(plaintexts))
+        out: list[tuple[str | None, str | None, str | None]] = []
+        for i, p in enumerate(plaintexts):
+            if p is None:
+                out.append((None, None, None))
+                continue
+            raw = p.encode()
+            data, codec = compressor.compress(raw) if compressor else (raw, None)
+            if codec:
+                transcript_compression_saved_bytes_total.labels(codec).inc(len(raw) - len(data))
+            nonce = nonces[12 * i:12 * i + 12]
+            out.append((b64encode(nonce + aes.encrypt(nonce, data, None)).decode(), kid, codec))
+        return out
     except Exception:  # pragma: no cover
         encryption_encrypt_failures_total.inc()
         _log.exception("encryption/encrypt-failed")
-        return plaintext, None
+        return [(p, None, None) for p in plaintexts]
 
 def _maybe_encrypt_dict(d: Dict[str, Any] | None) -> Dict[str, Any] | None:
     if d is None:
         return None
     if not _enc_material:
         return d
+    keys = [k for k, v in d.items() if isinstance(v, str)]
+    encrypted = dict(zip(keys, _encrypt_many([d[k] for k in keys])))
     out = {}
     for k, v in d.items():
-        if isinstance(v, str):
-            ev, kid = _encrypt_field(v)
+        if k in encrypted:
+            ev, kid = encrypted[k]
             out[k] = {"enc": True, "kid": kid, "v": ev} if kid else v
         else:
             out[k] = v
     return out
 
 def _decrypt_field(blob: str, kid: str | None) -> str:
-    if not kid:
-        return blob
-    if kid not in _enc_material:
+    return _decrypt_many([(blob, kid)])[0]
+
+def _decrypt_many(items: list[tuple], strict: bool = False) -> list[str | None]:
+    """Decrypt ``(blob, kid)`` or ``(blob, kid, codec)`` items with cached ciphers.
+
+    ``codec`` is the envelope's ``"z"`` value; the plaintext is decompressed
+    after decryption. Undecryptable blobs are returned as-is, or as ``None``
+    when ``strict`` (rotation must not re-encrypt ciphertext it could not read).
+    """
+    if any(item[1] and item[1] not in _ciphers for item in items):
         _load_encryption_material()
-    if kid not in _enc_material:
-        return blob
-    if blob.startswith('ENC:'):
-        blob = blob[4:]
-    try:
-        raw = b64decode(blob)
-        if len(raw) < 13:
-            return blob
-        nonce, ct = raw[:12], raw[12:]
-        aes = AESGCM(_enc_material[kid])
-        pt = aes.decrypt(nonce, ct, None)
-        return pt.decode()
-    except Exception:  # pragma: no cover
-        encryption_decrypt_failures_total.inc()
-        _log.exception("encryption/decrypt-failed")
-        return blob
+    ciphers = _ciphers
+    out: list[str | None] = []
+    for blob, kid, *codec in items:
+        aes = ciphers.get(kid) if kid else None
+        if aes is None:
+            out.append(None if strict and kid else blob)
+            continue
+        if blob.startswith('ENC:'):
+            blob = blob[4:]
+        try:
+            raw = b64decode(blob)
+            if len(raw) < 13:
+                out.append(None if strict else blob)
+                continue
+            pt = aes.decrypt(raw[:12], raw[12:], None)
+            if codec and codec[0]:
+                pt = _compressor.decompress(pt, codec[0])
+            out.append(pt.decode())
+        except Exception:  # pragma: no cover
+            encryption_decrypt_failures_total.inc()
+            _log.exception("encryption/decrypt-failed")
+            out.append(None if strict else blob)
+    return out
 
 def _maybe_decrypt_enrichment(e: Dict[str, Any] | None) -> Dict[str, Any] | None:
     if e is None:
         return None
     if not isinstance(e, dict):
         return e
-    out = {}
-    for k, v in e.items():
-        if isinstance(v, dict) and v.get('enc') and 'v' in v:
-            out[k] = _decrypt_field(v['v'], v.get('kid'))
+    keys = [k for k, v in e.items() if isinstance(v, dict) and v.get('enc') and 'v' in v]
+    decrypted = dict(zip(keys, _decrypt_many([(e[k]['v'], e[k].get('kid')) for k in keys])))
+    return {k: decrypted.get(k, v) for k, v in e.items()}
+
+def _text_envelope(val: Any) -> Dict[str, Any] | None:
+    """Parse the ``{"enc", "kid", "v"}`` wrapper stored in text/summary columns."""
+    if isinstance(val, dict):
+        return val if val.get("enc") and "v" in val else None
+    if isinstance(val, str) and val.startswith('{'):
+        try:
+            obj = json.loads(val)
+        except Exception:
+            return None
+        return obj if isinstance(obj, dict) and obj.get("enc") and "v" in obj else None
+    return None
+
+def _decrypt_row(d: Dict[str, Any]) -> Dict[str, Any]:
+    """Decrypt text, summary and enrichment of one transcript row in a single batch."""
+    if not _enc_material:
+        return d
+    slots: list[tuple[str, str | None]] = []
+    items: list[tuple[str, str | None]] = []
+    for field in ("text", "summary"):
+        env = _text_envelope(d.get(field))
+        if env is not None:
+            slots.append((field, None))
+            items.append((env["v"], env.get("kid"), env.get("z")))
+    enrichment = d.get("enrichment")
+    if isinstance(enrichment, dict):
+        for k, v in enrichment.items():
+            if isinstance(v, dict) and v.get('enc') and 'v' in v:
+                slots.append(("enrichment", k))
+                items.append((v['v'], v.get('kid')))
+    if not items:
+        return d
+    if isinstance(enrichment, dict):
+        d["enrichment"] = dict(enrichment)
+    for (field, key), plain in zip(slots, _decrypt_many(items)):
+        if key is None:
+            d[field] = plain
         else:
-            out[k] = v
-    return out
+            d["enrichment"][key] = plain
+    return d
 
 def get_transcript(record_id: int) -> dict | None:
     try:
@@ -179,101 +268,289 @@ def get_transcript(record_id: int) -> dict | None:
             row = session.execute(transcripts.select().where(transcripts.c.id == record_id)).mappings().first()
             if not row:
                 return None
-            d = dict(row)
-            # Decrypt fields if needed
-            if _enc_material:
-                for field in ("text", "summary"):
-                    val = d.get(field)
-                    if isinstance(val, str) and val.startswith('{'):
-                        try:
-                            val_obj = json.loads(val)
-                        except Exception:
-                            val_obj = None
-                    else:
-                        val_obj = val if isinstance(val, dict) else None
-                    if isinstance(val_obj, dict) and val_obj.get("enc") and "v" in val_obj:
-                        d[field] = _decrypt_field(val_obj["v"], val_obj.get("kid"))
-                if isinstance(d.get("enrichment"), dict):
-                    d["enrichment"] = _maybe_decrypt_enrichment(d.get("enrichment"))
-            return d
+            return _decrypt_row(dict(row))
     except Exception:
         return None
 
-def rotate_encryption_keys(batch_size: int = 500, max_batches: int = 5) -> int:
-    """Re-encrypt transcripts encrypted with non-primary keys.
+# ---------------- Key Rotation ---------------- #
+_rotation_lock = Lock()  # one rotation run per process; ranges are leased across replicas
+_ROTATION_LEASE_SECONDS = 300
+
+
+class Throttle:
+    """Rows-per-second cap shared by rotation workers and the retention purge (0 disables it)."""
 
-    Processes up to max_batches * batch_size rows using pagination on id.
-    Includes enrichment string fields.
-    Returns count of rows updated.
+    def __init__(self, rate: float, clock=time.monotonic, sleep=time.sleep):
+        self._rate = rate
+        self._clock = clock
+        self._sleep = sleep
+        self._next = clock()
+        self._lock = Lock()
+
+    def wait(self, rows: int) -> None:
+        if self._rate <= 0 or rows <= 0:
+            return
+        with self._lock:
+            now = self._clock()
+            start = max(now, self._next)
+            self._next = start + rows / self._rate
+        if start > now:
+            self._sleep(start - now)
+
+
+def _rotation_updates(rows, primary: str) -> tuple[list[tuple[int, Dict[str, Any], str | None]], int]:
+    """Re-encrypt every non-primary value in ``rows`` in one decrypt/encrypt batch.
+
+    Returns ``(id, column values, previous text kid)`` per changed row and the
+    number of values left alone because they could not be decrypted.
     """
-    if not _enc_material:
-        _load_encryption_material()
-    if not _enc_material or not _settings.enable_field_encryption:
-        return 0
-    primary = _settings.primary_encryption_key_id
-    total_updated = 0
-    encryption_rotate_attempt_total.inc()
-    last_id = 0
+    slots: list[tuple[int, str, str | None]] = []
+    items: list[tuple[str, str | None]] = []
+    for i, row in enumerate(rows):
+        for field in ("text", "summary"):
+            env = _text_envelope(row.get(field))
+            if env is not None and env.get("kid") != primary:
+                slots.append((i, field, None))
+                items.append((env["v"], env.get("kid"), env.get("z")))
+        enrichment = row.get("enrichment")
+        if isinstance(enrichment, dict):
+            for k, v in enrichment.items():
+                if isinstance(v, dict) and v.get("enc") and "v" in v and v.get("kid") != primary:
+                    slots.append((i, "enrichment", k))
+                    items.append((v["v"], v.get("kid")))
+    if not items:
+        return [], 0
+    plains = _decrypt_many(items, strict=True)
+    sealed: list = [None] * len(slots)
+    for compress in (True, False):  # text/summary follow FIELD_COMPRESSION, enrichment values never do
+        idx = [n for n, slot in enumerate(slots) if (slot[2] is None) == compress]
+        for n, result in zip(idx, _seal_many([plains[n] for n in idx], compress=compress)):
+            sealed[n] = result
+    updates: dict[int, Dict[str, Any]] = {}
+    skipped = 0
+    for (i, field, key), plain, (enc, kid, codec) in zip(slots, plains, sealed):
+        if plain is None or not kid:
+            skipped += 1
+            continue
+        values = updates.setdefault(i, {})
+        if key is None:
+            values[field] = _envelope(enc, kid, codec)
+        else:
+            values.setdefault("enrichment", dict(rows[i]["enrichment"]))[key] = {"enc": True, "kid": kid, "v": enc}
+    changed = []
+    for i, values in updates.items():
+        env = _text_envelope(rows[i].get("text"))
+        changed.append((rows[i]["id"], values, env.get("kid") if env else None))
+    return changed, skipped
+
+
+def _plan_rotation(primary: str, workers: int) -> None:
+    """Make sure checkpoint ranges for ``primary`` cover every transcript id.
+
+    Ranges are ``(range_start, range_end]`` id spans. Ids above the covered
+    span (rows written since the last pass) get new ranges split across
+    ``workers``; finished passes are collapsed into one row.
+    """
+    from sqlalchemy import func, select
+    cp = rotation_checkpoints.c
+    with SessionLocal() as session:
+        session.execute(rotation_checkpoints.delete().where(cp.target_kid != primary))
+        ranges = session.execute(select(cp.range_end, cp.high_water_mark).where(cp.target_kid == primary)).all()
+        covered = max((r.range_end for r in ranges), default=0)
+        if len(ranges) > 1 and all(r.high_water_mark >= r.range_end for r in ranges):
+            session.execute(rotation_checkpoints.delete().where(cp.target_kid == primary))
+            session.execute(rotation_checkpoints.insert().values(
+                target_kid=primary, range_start=0, range_end=covered, high_water_mark=covered,
+            ))
+        max_id = session.execute(select(func.max(transcripts.c.id))).scalar() or 0
+        if max_id > covered:
+            step = -(-(max_id - covered) // workers)
+            for start in range(covered, max_id, step):
+                session.execute(rotation_checkpoints.insert().values(
+                    target_kid=primary, range_start=start, range_end=min(start + step, max_id), high_water_mark=start,
+                ))
+        try:
+            session.commit()
+        except IntegrityError:  # another replica planned the same ranges
+            session.rollback()
+
+
+def _rotate_range(primary: str, range_start: int, batch_size: int, max_batches: int | None, throttle: Throttle) -> int:
+    """Lease one checkpoint range and rotate it batch by batch; returns rows updated."""
+    from sqlalchemy import or_, select
+    cp = rotation_checkpoints.c
+    key = (cp.target_kid == primary) & (cp.range_start == range_start)
+    now = datetime.now(UTC)
+    with SessionLocal() as session:
+        claimed = session.execute(
+            rotation_checkpoints.update()
+            .where(key, or_(cp.lease_until.is_(None), cp.lease_until < now))
+            .values(lease_until=now + timedelta(seconds=_ROTATION_LEASE_SECONDS))
+        ).rowcount == 1
+        session.commit()
+        if not claimed:
+            return 0
+        row = session.execute(select(cp.high_water_mark, cp.range_end).where(key)).first()
+    hwm, end = row.high_water_mark, row.range_end
+    updated = 0
+    batches = 0
     try:
-        with SessionLocal() as session:
-            for _ in range(max_batches):
+        while hwm < end and (max_batches is None or batches < max_batches):
+            throttle.wait(batch_size)
+            encryption_rotate_attempt_total.inc()
+            with SessionLocal() as session:
                 rows = session.execute(
-                    transcripts.select().where(transcripts.c.id > last_id).order_by(transcripts.c.id.asc()).limit(batch_size)
+                    transcripts.select().where(transcripts.c.id > hwm, transcripts.c.id <= end)
+                    .order_by(transcripts.c.id.asc()).limit(batch_size)
                 ).mappings().all()
-                if not rows:
-                    break
-                for row in rows:
-                    last_id = max(last_id, row['id'])
-                    changed = False
-                    updates = {}
-                    # Handle text & summary (JSON string wrapper stored)
-                    for field in ("text", "summary"):
-                        val = row.get(field)
-                        try:
-                            if isinstance(val, str) and val.startswith('{'):
-                                val_obj = json.loads(val)
-                            else:
-                                val_obj = None
-                        except Exception:
-                            val_obj = None
-                        if isinstance(val_obj, dict) and val_obj.get('enc') and val_obj.get('kid') != primary:
-                            dec = _decrypt_field(val_obj['v'], val_obj.get('kid'))
-                            enc, kid = _encrypt_field(dec)
-                            if kid:
-                                updates[field] = json.dumps({"enc": True, "kid": kid, "v": enc}, separators=(',',':'))
-                                changed = True
-                    # Enrichment (JSON column) decrypt + re-encrypt string values with old key
-                    enrichment = row.get('enrichment')
-                    if isinstance(enrichment, dict):
-                        new_enrichment = {}
-                        enrichment_changed = False
-                        for k, v in enrichment.items():
-                            if isinstance(v, dict) and v.get('enc') and v.get('kid') != primary and 'v' in v:
-                                dec = _decrypt_field(v['v'], v.get('kid'))
-                                enc, kid = _encrypt_field(dec)
-                                if kid:
-                                    new_enrichment[k] = {"enc": True, "kid": kid, "v": enc}
-                                    enrichment_changed = True
-                                else:
-                                    new_enrichment[k] = v
-                            else:
-                                new_enrichment[k] = v
-                        if enrichment_changed:
-                            updates['enrichment'] = new_enrichment
-                            changed = True
-                    if changed:
-                        session.execute(transcripts.update().where(transcripts.c.id == row['id']).values(**updates))
-                        total_updated += 1
+                next_hwm = rows[-1]["id"] if len(rows) == batch_size else end
+                changed, skipped = _rotation_updates(rows, primary)
+                for record_id, values, _ in changed:
+                    session.execute(transcripts.update().where(transcripts.c.id == record_id).values(**values))
+                now = datetime.now(UTC)
+                session.execute(rotation_checkpoints.update().where(key).values(
+                    high_water_mark=next_hwm,
+                    rows_rotated=cp.rows_rotated + len(changed),
+                    lease_until=now + timedelta(seconds=_ROTATION_LEASE_SECONDS),
+                    updated_at=now,
+                ))
                 session.commit()
+            for _, _, old_kid in changed:
+                if old_kid:
+                    encryption_rotation_rows_remaining.labels(kid=old_kid).dec()
+            if skipped:
+                _log.warning("encryption/rotation-skipped", count=skipped, range_start=range_start)
+            hwm = next_hwm
+            updated += len(changed)
+            batches += 1
     except Exception:
         encryption_rotate_failures_total.inc()
-        _log.exception("encryption/rotation-failed")
-        return total_updated
+        _log.exception("encryption/rotation-failed", range_start=range_start, high_water_mark=hwm)
+    finally:
+        with SessionLocal() as session:
+            session.execute(rotation_checkpoints.update().where(key).values(lease_until=None))
+            session.commit()
+    return updated
+
+
+def rotation_in_progress() -> bool:
+    return _rotation_lock.locked()
+
+
+def rotate_encryption_keys(
+    batch_size: int | None = None,
+    max_batches: int | None = None,
+    workers: int | None = None,
+    max_rows_per_second: float | None = None,
+) -> int:
+    """Re-encrypt transcripts (text, summary, enrichment) still under non-primary keys.
+
+    The id space is split into ranges checkpointed in
+    ``encryption_rotation_checkpoints``. Each batch commits its row updates
+    together with the range's high-water mark, so a restarted run resumes
+    where the previous one stopped. Ranges are leased, so replicas running
+    rotation at the same time work on different ranges. ``max_batches``
+    caps batches per range for this call (None runs to completion). SQLite
+    always uses one worker. Returns count of rows updated.
+    """
+    if not _enc_material:
+        _load_encryption_material()
+    if not _enc_material or not _settings.enable_field_encryption:
+        return 0
+    if not _rotation_lock.acquire(blocking=False):
+        _log.info("encryption/rotation-already-running")
+        return 0
+    total_updated = 0
+    try:
+        settings = get_settings()
+        primary = _settings.primary_encryption_key_id
+        batch_size = batch_size or settings.encryption_rotate_batch_size
+        workers = max(1, workers or settings.encryption_rotate_workers)
+        if ENGINE.url.get_backend_name() == "sqlite":
+            workers = 1
+        if max_rows_per_second is None:
+            max_rows_per_second = settings.encryption_rotate_max_rows_per_second
+        try:
+            _plan_rotation(primary, workers)
+            starts = [r["range_start"] for r in encryption_rotation_progress()["ranges"] if not r["done"]]
+        except SQLAlchemyError:
+            encryption_rotate_failures_total.inc()
+            _log.exception("encryption/rotation-plan-failed")
+            return 0
+        throttle = Throttle(max_rows_per_second)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="encryption-rotate") as pool:
+            total_updated = sum(pool.map(
+                lambda start: _rotate_range(primary, start, batch_size, max_batches, throttle), starts
+            ))
+        try:
+            encryption_rotation_progress(exact=True)  # refresh the remaining-rows gauges
+        except SQLAlchemyError:
+            pass
+    finally:
+        _rotation_lock.release()
     if total_updated:
         encryption_rotate_updated_total.inc(total_updated)
     return total_updated
 
 
+def encryption_rotation_progress(exact: bool = False) -> Dict[str, Any]:
+    """Checkpoint state: per-range high-water marks and ids left to scan.
+
+    With ``exact`` the rows still encrypted with each non-primary key are also
+    counted (``rows_remaining``) by the kid of the stored ``text`` envelope,
+    only in id spans not yet scanned, and the
+    ``encryption_rotation_rows_remaining`` gauges are set. That count scans
+    the text column, so it is opt-in; otherwise ``rows_remaining`` is None.
+    """
+    from sqlalchemy import and_, func, or_, select
+    if not _enc_material:
+        _load_encryption_material()
+    primary = _settings.primary_encryption_key_id
+    if not _enc_material or not primary:
+        return {"enabled": False, "running": rotation_in_progress()}
+    cp = rotation_checkpoints.c
+    with SessionLocal() as session:
+        ranges = session.execute(
+            rotation_checkpoints.select().where(cp.target_kid == primary).order_by(cp.range_start)
+        ).mappings().all()
+        max_id = session.execute(select(func.max(transcripts.c.id))).scalar() or 0
+        pending = [(r["high_water_mark"], r["range_end"]) for r in ranges if r["high_water_mark"] < r["range_end"]]
+        covered = max((r["range_end"] for r in ranges), default=0)
+        if max_id > covered:
+            pending.append((covered, max_id))
+        remaining = {kid: 0 for kid in sorted(_enc_material) if kid != primary}
+        if exact and pending:
+            span = or_(*[and_(transcripts.c.id > lo, transcripts.c.id <= hi) for lo, hi in pending])
+            for kid in remaining:
+                prefix = json.dumps({"enc": True, "kid": kid}, separators=(',', ':'))[:-1] + ",%"
+                remaining[kid] = session.execute(
+                    select(func.count()).select_from(transcripts).where(span, transcripts.c.text.like(prefix))
+                ).scalar() or 0
+    if exact:
+        for kid in _enc_material:
+            encryption_rotation_rows_remaining.labels(kid=kid).set(remaining.get(kid, 0))
+    return {
+        "enabled": True,
+        "primary_kid": primary,
+        "running": rotation_in_progress(),
+        "complete": not pending,
+        "ids_remaining": sum(hi - lo for lo, hi in pending),
+        "rows_remaining": remaining if exact else None,
+        "ranges": [
+            {
+                "range_start": r["range_start"],
+                "range_end": r["range_end"],
+                "high_water_mark": r["high_water_mark"],
+                "rows_rotated": r["rows_rotated"],
+                "leased": r["lease_until"] is not None,
+                "updated_at": r["updated_at"],
+                "done": r["high_water_mark"] >= r["range_end"],
+            }
+            for r in ranges
+        ],
+    }
+
+
 def _database_url() -> str:
     host = os.environ.get("TRANSCRIPTS_DB_HOST")
     if host:
@@ -320,9 +597,12 @@ async_tasks = Table(
     META,
     Column("task_id", String(32), primary_key=True),
     Column("filename", String(255), nullable=False),
-    Column("status", String(16), nullable=False),  # processing|done|error
+    Column("status", String(16), nullable=False),  # queued|processing|done|error|cancelled
     Column("result_text", Text, nullable=True),
     Column("error", Text, nullable=True),
+    Column("progress_seconds", Float, nullable=True),  # audio seconds transcribed so far
+    Column("total_seconds", Float, nullable=True),  # audio duration once known
+    Column("estimated_completion_at", DateTime(timezone=True), nullable=True),
     Column("created_at", DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False),
     Column("updated_at", DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False),
 )
@@ -335,6 +615,69 @@ idempotency_keys = Table(
     Column("expires_at", DateTime(timezone=True), nullable=False, index=True),
 )
 
+publish_outbox = Table(
+    "publish_outbox",
+    META,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("queue", String(128), nullable=False),
+    Column("payload", Text, nullable=False),  # JSON message, encrypted when keys are configured
+    Column("kid", String(64), nullable=True),
+    Column("last_error", Text, nullable=True),  # set when a row is parked as undeliverable
+    Column("created_at", DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False, index=True),
+)
+
+rotation_checkpoints = Table(
+    "encryption_rotation_checkpoints",
+    META,
+    Column("target_kid", String(64), primary_key=True),
+    Column("range_start", Integer, primary_key=True, autoincrement=False),  # exclusive
+    Column("range_end", Integer, nullable=False),  # inclusive
+    Column("high_water_mark", Integer, nullable=False),  # last id rotated in this range
+    Column("rows_rotated", Integer, nullable=False, default=0),
+    Column("lease_until", DateTime(timezone=True), nullable=True),
+    Column("updated_at", DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False),
+)
+
+search_tokens = Table(
+    "transcript_search_tokens",
+    META,
+    Column("token", String(32), primary_key=True),  # truncated HMAC of a normalized term
+    Column("transcript_id", Integer, primary_key=True, autoincrement=False),
+    Column("key_id", String(64), nullable=False),
+    Index("ix_transcript_search_tokens_transcript_key", "transcript_id", "key_id"),
+)
+
+transcript_artifacts = Table(
+    "transcript_artifacts",
+    META,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("transcript_id", Integer, nullable=False, index=True),
+    Column("base_path", String(512), nullable=False),  # Nextcloud path without the .json/.txt suffix
+    Column("created_at", DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False),
+)
+
+search_index_builds = Table(
+    "search_index_builds",
+    META,
+    Column("key_id", String(64), primary_key=True),
+    Column("high_water_mark", Integer, nullable=False, default=0),  # last transcript id indexed
+    Column("completed_at", DateTime(timezone=True), nullable=True),
+    Column("lease_until", DateTime(timezone=True), nullable=True),
+    Column("updated_at", DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False),
+)
+
+retention_checkpoints = Table(
+    "retention_purge_checkpoints",
+    META,
+    Column("name", String(32), primary_key=True),  # purge job, e.g. "transcripts"
+    Column("cutoff", DateTime(timezone=True), nullable=False),
+    Column("range_end", Integer, nullable=False),  # highest expired id when the run started
+    Column("high_water_mark", Integer, nullable=False),  # last id purged
+    Column("rows_purged", Integer, nullable=False, default=0),
+    Column("lease_until", DateTime(timezone=True), nullable=True),
+    Column("updated_at", DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False),
+)
+
 ENV = os.environ.get("ENV", "dev")
 if ENV == "prod" and ENGINE.url.get_backend_name().startswith("sqlite"):
     raise RuntimeError("SQLite backend is not permitted in production. Configure a MySQL database via TRANSCRIPTS_DB_HOST.")
@@ -346,15 +689,76 @@ if ENV != "prod":
 SessionLocal = sessionmaker(bind=ENGINE, expire_on_commit=False, future=True)
 SESSION_MAKER = SessionLocal
 
-def async_task_create(task_id: str, filename: str):
+def async_task_create(task_id: str, filename: str, status: str = "queued"):
+    with SessionLocal() as session:
+        session.execute(async_tasks.insert().values(task_id=task_id, filename=filename, status=status))
+        session.commit()
+
+def async_task_start(task_id: str) -> bool:
+    """Move a queued task to processing; False if it was cancelled meanwhile."""
     with SessionLocal() as session:
-        session.execute(async_tasks.insert().values(task_id=task_id, filename=filename, status="processing"))
+        res = session.execute(
+            async_tasks.update()
+            .where(async_tasks.c.task_id == task_id, async_tasks.c.status == "queued")
+            .values(status="processing", updated_at=datetime.now(UTC))
+        )
         session.commit()
+        return (res.rowcount or 0) > 0
+
+def async_task_progress(
+    task_id: str,
+    progress_seconds: float,
+    total_seconds: float | None,
+    estimated_completion_at: datetime | None,
+) -> bool:
+    """Record segment progress for a running task.
 
-def async_task_update(task_id: str, status: str, result_text: str | None = None, error: str | None = None):
+    Returns False when the task is no longer processing (e.g. cancelled from
+    another replica) so the worker can stop at the next segment boundary.
+    """
     with SessionLocal() as session:
-        session.execute(async_tasks.update().where(async_tasks.c.task_id == task_id).values(status=status, result_text=result_text, error=error, updated_at=datetime.now(UTC)))
+        res = session.execute(
+            async_tasks.update()
+            .where(async_tasks.c.task_id == task_id, async_tasks.c.status == "processing")
+            .values(
+                progress_seconds=progress_seconds,
+                total_seconds=total_seconds,
+                estimated_completion_at=estimated_completion_at,
+                updated_at=datetime.now(UTC),
+            )
+        )
         session.commit()
+        return (res.rowcount or 0) > 0
+
+def async_task_cancel(task_id: str) -> bool:
+    """Mark a queued or processing task cancelled; False if already finished."""
+    with SessionLocal() as session:
+        res = session.execute(
+            async_tasks.update()
+            .where(async_tasks.c.task_id == task_id, async_tasks.c.status.in_(("queued", "processing")))
+            .values(status="cancelled", updated_at=datetime.now(UTC))
+        )
+        session.commit()
+        return (res.rowcount or 0) > 0
+
+def async_task_update(
+    task_id: str,
+    status: str,
+    result_text: str | None = None,
+    error: str | None = None,
+    expected_status: str | None = None,
+) -> bool:
+    """Set a task's final state; with ``expected_status`` only if it is still in that state.
+
+    Returns False when the guard did not match (e.g. the task was cancelled meanwhile).
+    """
+    query = async_tasks.update().where(async_tasks.c.task_id == task_id)
+    if expected_status is not None:
+        query = query.where(async_tasks.c.status == expected_status)
+    with SessionLocal() as session:
+        res = session.execute(query.values(status=status, result_text=result_text, error=error, updated_at=datetime.now(UTC)))
+        session.commit()
+        return (res.rowcount or 0) > 0
 
 def async_task_get(task_id: str) -> dict | None:
     with SessionLocal() as session:
@@ -362,6 +766,41 @@ def async_task_get(task_id: str) -> dict | None:
         return dict(row) if row else None
 
 
+def _validate_transcript(filename: str, text: str, source: str) -> None:
+    if not filename or not filename.strip():
+        raise ValueError("Filename cannot be empty")
+    if not text or not text.strip():
+        raise ValueError("Text cannot be empty")
+    if not source or not source.strip():
+        raise ValueError("Source cannot be empty")
+
+
+def _transcript_row(
+    filename: str,
+    text: str,
+    summary: str | None,
+    enrichment: Dict[str, Any] | None,
+    source: str,
+    fhir_document_id: str | None = None,
+) -> tuple[Dict[str, Any], set[str]]:
+    """Mask + (compress +) encrypt one transcript into ``transcripts`` column values.
+
+    Also returns the blind-index terms of the masked text (empty when search
+    indexing is off).
+    """
+    masked_text, masked_summary = mask_phi(text), mask_phi(summary) if summary else None
+    sealed_text, sealed_summary = _seal_many([masked_text, masked_summary], compress=True)
+    row = {
+        "filename": filename,
+        "text": _envelope(*sealed_text),
+        "summary": _envelope(*sealed_summary),
+        "enrichment": _maybe_encrypt_dict(enrichment),
+        "source": source,
+        "fhir_document_id": fhir_document_id,
+    }
+    return row, _index_terms(masked_text, masked_summary, enrichment)
+
+
 def store_transcript(
     filename: str,
     text: str,
@@ -371,38 +810,13 @@ def store_transcript(
     fhir_document_id: str | None = None,
 ) -> int:
     # Input validation
-    if not filename or not filename.strip():
-        raise ValueError("Filename cannot be empty")
-    if not text or not text.strip():
-        raise ValueError("Text cannot be empty")
-    if not source or not source.strip():
-        raise ValueError("Source cannot be empty")
+    _validate_transcript(filename, text, source)
     settings = get_settings()
     try:
         with SessionLocal() as session:
-            enc_text, text_kid = _encrypt_field(mask_phi(text))
-            enc_summary = None
-            summary_kid = None
-            if summary:
-                enc_summary, summary_kid = _encrypt_field(mask_phi(summary))
-            enc_enrichment = _maybe_encrypt_dict(enrichment)
-            text_value = {"enc": True, "kid": text_kid, "v": f"ENC:{enc_text}"} if text_kid else enc_text
-            summary_value = {"enc": True, "kid": summary_kid, "v": f"ENC:{enc_summary}"} if summary_kid and enc_summary else enc_summary
-            # Serialize dicts to JSON for Text columns
-            if isinstance(text_value, dict):
-                text_value = json.dumps(text_value, separators=(',',':'))
-            if isinstance(summary_value, dict):
-                summary_value = json.dumps(summary_value, separators=(',',':'))
-            result = session.execute(
-                transcripts.insert().values(
-                    filename=filename,
-                    text=text_value,
-                    summary=summary_value,
-                    enrichment=enc_enrichment,
-                    source=source,
-                    fhir_document_id=fhir_document_id,
-                )
-            )
+            row, terms = _transcript_row(filename, text, summary, enrichment, source, fhir_document_id)
+            result = session.execute(transcripts.insert().values(**row))
+            _insert_search_tokens(session, [(int(result.inserted_primary_key[0]), terms)])
             session.commit()
             audit(AuditEvent.TRANSCRIPT_STORE, filename=filename, masked=not settings.store_phi)
             return int(result.inserted_primary_key[0])
@@ -413,6 +827,107 @@ def store_transcript(
         return -1
 
 
+def _envelope(value: str | None, kid: str | None, codec: str | None = None) -> str | None:
+    if kid and value is not None:
+        env: Dict[str, Any] = {"enc": True, "kid": kid}
+        if codec:
+            env["z"] = codec
+        env["v"] = f"ENC:{value}"
+        return json.dumps(env, separators=(',',':'))
+    return value
+
+
+def _transcript_rows(records: list[Dict[str, Any]]) -> tuple[list[Dict[str, Any]], list[set[str]]]:
+    """Batch form of ``_transcript_row``: mask, compress and encrypt all texts/summaries in one pass."""
+    n = len(records)
+    masked = mask_phi_many([r["text"] for r in records] + [r.get("summary") or None for r in records])
+    sealed = _seal_many(masked, compress=True)
+    rows = []
+    for i, rec in enumerate(records):
+        rows.append({
+            "filename": rec["filename"],
+            "text": _envelope(*sealed[i]),
+            "summary": _envelope(*sealed[n + i]),
+            "enrichment": _maybe_encrypt_dict(rec.get("enrichment")),
+            "source": rec["source"],
+            "fhir_document_id": rec.get("fhir_document_id"),
+        })
+    terms = [_index_terms(masked[i], masked[n + i], rec.get("enrichment")) for i, rec in enumerate(records)]
+    return rows, terms
+
+
+_mysql_autoinc_step: int | None = None
+_mysql_autoinc_checked = False
+
+
+def _mysql_consecutive_id_step(session) -> int | None:
+    """Auto-increment step when one multi-row INSERT gets consecutive ids, else None.
+
+    InnoDB only guarantees that for ``innodb_autoinc_lock_mode`` 0/1; in mode 2
+    (the MySQL 8 default) concurrent inserts may interleave ids.
+    """
+    global _mysql_autoinc_step, _mysql_autoinc_checked
+    if not _mysql_autoinc_checked:
+        try:
+            mode, step = session.execute(
+                sql_text("SELECT @@innodb_autoinc_lock_mode, @@auto_increment_increment")
+            ).one()
+            _mysql_autoinc_step = int(step) if int(mode) in (0, 1) else None
+        except SQLAlchemyError:
+            _mysql_autoinc_step = None
+        _mysql_autoinc_checked = True
+    return _mysql_autoinc_step
+
+
+def store_transcripts(records: list[Dict[str, Any]]) -> list[int]:
+    """Insert many transcripts in one transaction; returns ids in input order.
+
+    Each record takes the ``store_transcript`` keyword arguments. Masking and
+    encryption run once over the whole batch, rows go in with a single
+    multi-row INSERT where ids can be recovered (RETURNING, or consecutive
+    MySQL auto-increment), and one audit record covers the batch. Unlike the
+    single-row helper this raises (ValueError / SQLAlchemyError) instead of
+    returning -1, so callers can fall back to per-record handling.
+    """
+    if not records:
+        return []
+    for rec in records:
+        _validate_transcript(rec.get("filename"), rec.get("text"), rec.get("source"))
+    settings = get_settings()
+    rows, terms = _transcript_rows(records)
+    try:
+        with SessionLocal() as session:
+            if ENGINE.dialect.insert_executemany_returning_sort_by_parameter_order:
+                # executemany INSERT ... RETURNING id, ordered like the input
+                result = session.execute(
+                    transcripts.insert().returning(transcripts.c.id, sort_by_parameter_order=True), rows
+                )
+                ids = [int(r[0]) for r in result]
+            elif (step := _mysql_consecutive_id_step(session)) is not None:
+                # one multi-row INSERT; LAST_INSERT_ID() is the first id of the statement
+                result = session.execute(transcripts.insert().values(rows))
+                first = int(result.lastrowid)
+                ids = [first + i * step for i in range(len(rows))]
+            else:
+                ids = [int(session.execute(transcripts.insert().values(**row)).inserted_primary_key[0]) for row in rows]
+            _insert_search_tokens(session, list(zip(ids, terms)))
+            session.commit()
+    except SQLAlchemyError as e:
+        from metrics import transcripts_persist_failures_total
+        transcripts_persist_failures_total.inc()
+        _log.warning("persistence/store-batch-failed", error=str(e), rows=len(rows))
+        raise
+    audit(
+        AuditEvent.TRANSCRIPT_STORE_BATCH,
+        count=len(ids),
+        first_id=ids[0],
+        last_id=ids[-1],
+        sources=sorted({rec["source"] for rec in records}),
+        masked=not settings.store_phi,
+    )
+    return ids
+
+
 def update_fhir_id(record_id: int, fhir_id: str) -> None:
     if record_id <= 0:
         return
@@ -469,4 +984,424 @@ def get_session(session_id: str) -> dict | None:
                 return dict(row)
     except SQLAlchemyError:
         return None
-    return None
\ No newline at end of file
+    return None
+
+
+# ---------------- Listing / Export ---------------- #
+LISTABLE_FIELDS = ("id", "filename", "text", "summary", "enrichment", "source", "fhir_document_id", "created_at")
+
+
+def _encode_cursor(created_at: datetime, record_id: int) -> str:
+    return b64encode(f"{created_at.isoformat()}|{record_id}".encode(), altchars=b"-_").decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, record_id = b64decode(cursor.encode(), altchars=b"-_", validate=True).decode().rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(record_id)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+
+
+def _listing_query(
+    fields: list[str] | None,
+    source: str | None,
+    since: datetime | None,
+    until: datetime | None,
+):
+    """SELECT of the requested columns (id and created_at always included) with filters."""
+    from sqlalchemy import select
+    wanted = list(fields) if fields else list(LISTABLE_FIELDS)
+    unknown = [f for f in wanted if f not in LISTABLE_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    names = ["id", "created_at"] + [f for f in LISTABLE_FIELDS if f in wanted and f not in ("id", "created_at")]
+    stmt = select(*[transcripts.c[name] for name in names])
+    if source:
+        stmt = stmt.where(transcripts.c.source == source)
+    if since:
+        stmt = stmt.where(transcripts.c.created_at >= (since.astimezone(UTC) if since.tzinfo else since))
+    if until:
+        stmt = stmt.where(transcripts.c.created_at < (until.astimezone(UTC) if until.tzinfo else until))
+    return stmt
+
+
+def list_transcripts(
+    limit: int = 50,
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+    source: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> tuple[list[Dict[str, Any]], str | None]:
+    """One page of transcripts, newest first; returns ``(items, next_cursor)``.
+
+    Keyset-paginated on ``(created_at, id)`` so every page is a range scan of
+    the ``created_at`` index regardless of depth. ``fields`` limits the
+    columns read (and decrypted). Raises ValueError for an unknown field or a
+    malformed cursor.
+    """
+    from sqlalchemy import and_, or_
+    stmt = _listing_query(fields, source, since, until)
+    if cursor:
+        created_at, record_id = _decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            transcripts.c.created_at < created_at,
+            and_(transcripts.c.created_at == created_at, transcripts.c.id < record_id),
+        ))
+    stmt = stmt.order_by(transcripts.c.created_at.desc(), transcripts.c.id.desc()).limit(limit + 1)
+    with SessionLocal() as session:
+        rows = session.execute(stmt).mappings().all()
+    page = rows[:limit]
+    next_cursor = _encode_cursor(page[-1]["created_at"], page[-1]["id"]) if len(rows) > limit else None
+    return [_decrypt_row(dict(r)) for r in page], next_cursor
+
+
+def iter_transcripts(
+    fields: list[str] | None = None,
+    source: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    batch_size: int = 500,
+) -> Iterator[Dict[str, Any]]:
+    """Decrypted transcripts oldest first, streamed from a server-side cursor.
+
+    Rows are fetched ``batch_size`` at a time (unbuffered on MySQL) and
+    decrypted one by one, so memory stays bounded however many rows match.
+    Arguments are validated eagerly (ValueError); the session stays open
+    until the returned iterator is exhausted or closed.
+    """
+    stmt = _listing_query(fields, source, since, until).order_by(transcripts.c.created_at.asc(), transcripts.c.id.asc())
+    return _stream_rows(stmt, batch_size)
+
+
+def _stream_rows(stmt, batch_size: int) -> Iterator[Dict[str, Any]]:
+    with SessionLocal() as session:
+        result = session.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+        for row in result.mappings():
+            yield _decrypt_row(dict(row))
+
+
+# ---------------- Search Index ---------------- #
+_blind_index: BlindIndex | None = None
+_search_index_loaded = False
+_SEARCH_BUILD_LEASE_SECONDS = 300
+
+
+def reload_search_index_keys() -> BlindIndex | None:
+    """(Re)load blind-index keys from settings; None when search indexing is off."""
+    global _blind_index, _search_index_loaded
+    with _enc_lock:
+        try:
+            _blind_index = BlindIndex.from_settings(get_settings())
+        except ValueError:
+            _log.exception("search_index/config-invalid")
+            _blind_index = None
+            if os.environ.get('ENV','dev') == 'prod':
+                raise
+        _search_index_loaded = True
+    return _blind_index
+
+
+def _search_index() -> BlindIndex | None:
+    if not _search_index_loaded:
+        reload_search_index_keys()
+    return _blind_index
+
+
+def _index_terms(text: str | None, summary: str | None, enrichment: Dict[str, Any] | None) -> set[str]:
+    if _search_index() is None:
+        return set()
+    return transcript_terms(text, summary, enrichment)
+
+
+def _insert_search_tokens(session, entries: list[tuple[int, set[str]]]) -> None:
+    """Add primary-key tokens for ``(transcript_id, terms)`` pairs within ``session``."""
+    index = _search_index()
+    if index is None:
+        return
+    rows = [
+        {"token": token, "transcript_id": transcript_id, "key_id": index.primary}
+        for transcript_id, terms in entries
+        for token in set(index.tokens(terms))
+    ]
+    if rows:
+        session.execute(search_tokens.insert(), rows)
+
+
+def search_transcripts(query: str, limit: int = 50, cursor: int | None = None) -> tuple[list[Dict[str, Any]], int | None]:
+    """Transcripts containing every query term, newest first.
+
+    Keyset-paginated on id: pass the returned cursor back to get the next page
+    (None once exhausted). Terms are hashed under every configured index key,
+    so results stay complete during a rebuild. Raises ValueError for an
+    unusable query and RuntimeError when search indexing is off.
+    """
+    from sqlalchemy import select
+    index = _search_index()
+    if index is None:
+        raise RuntimeError("search index is not enabled")
+    terms = query_terms(query)
+    started = time.perf_counter()
+    tid = search_tokens.c.transcript_id
+    stmt = select(tid).where(search_tokens.c.token.in_(index.query_tokens(terms[0])))
+    for term in terms[1:]:
+        other = search_tokens.alias()
+        stmt = stmt.where(tid.in_(select(other.c.transcript_id).where(other.c.token.in_(index.query_tokens(term)))))
+    if cursor is not None:
+        stmt = stmt.where(tid < cursor)
+    stmt = stmt.distinct().order_by(tid.desc()).limit(limit + 1)
+    with SessionLocal() as session:
+        ids = session.execute(stmt).scalars().all()
+        page = ids[:limit]
+        rows = session.execute(transcripts.select().where(transcripts.c.id.in_(page))).mappings().all() if page else []
+    by_id = {r["id"]: _decrypt_row(dict(r)) for r in rows}
+    transcript_search_seconds.observe(time.perf_counter() - started)
+    return [by_id[i] for i in page if i in by_id], (page[-1] if len(ids) > limit else None)
+
+
+def search_index_complete() -> bool:
+    """True when every transcript has tokens under the primary index key (or indexing is off)."""
+    from sqlalchemy import select
+    index = _search_index()
+    if index is None:
+        return True
+    with SessionLocal() as session:
+        completed = session.execute(
+            select(search_index_builds.c.completed_at).where(search_index_builds.c.key_id == index.primary)
+        ).scalar()
+    return completed is not None
+
+
+def rebuild_search_index(batch_size: int | None = None, max_batches: int | None = None) -> int:
+    """(Re)index every transcript under the primary index key; returns transcripts indexed.
+
+    Started in the background when the primary key has no completed build
+    (first enablement or key rotation). Progress is checkpointed per key in
+    ``search_index_builds``: each batch replaces its rows' tokens and commits
+    with the new high-water mark, so a restart resumes. The build is leased
+    so one replica runs it. When a batch comes back short, tokens under
+    other keys are deleted and the build is marked complete.
+    """
+    from sqlalchemy import or_, select
+    index = _search_index()
+    if index is None:
+        return 0
+    kid = index.primary
+    batch_size = batch_size or get_settings().search_index_rebuild_batch_size
+    b = search_index_builds.c
+    now = datetime.now(UTC)
+    with SessionLocal() as session:
+        try:
+            with session.begin_nested():
+                session.execute(search_index_builds.insert().values(key_id=kid, high_water_mark=0))
+        except IntegrityError:
+            pass  # resuming, or another replica created it
+        claimed = session.execute(
+            search_index_builds.update()
+            .where(b.key_id == kid, b.completed_at.is_(None), or_(b.lease_until.is_(None), b.lease_until < now))
+            .values(lease_until=now + timedelta(seconds=_SEARCH_BUILD_LEASE_SECONDS))
+        ).rowcount == 1
+        session.commit()
+        if not claimed:
+            return 0
+        hwm = session.execute(select(b.high_water_mark).where(b.key_id == kid)).scalar() or 0
+    indexed = 0
+    batches = 0
+    finished = False
+    try:
+        while not finished and (max_batches is None or batches < max_batches):
+            with SessionLocal() as session:
+                rows = session.execute(
+                    transcripts.select().where(transcripts.c.id > hwm).order_by(transcripts.c.id.asc()).limit(batch_size)
+                ).mappings().all()
+                ids = [r["id"] for r in rows]
+                if ids:
+                    session.execute(search_tokens.delete().where(
+                        search_tokens.c.transcript_id.in_(ids), search_tokens.c.key_id == kid
+                    ))
+                    entries = []
+                    for row in rows:
+                        d = _decrypt_row(dict(row))
+                        entries.append((d["id"], transcript_terms(d.get("text"), d.get("summary"), d.get("enrichment"))))
+                    _insert_search_tokens(session, entries)
+                    hwm = ids[-1]
+                finished = len(rows) < batch_size
+                now = datetime.now(UTC)
+                session.execute(search_index_builds.update().where(b.key_id == kid).values(
+                    high_water_mark=hwm, lease_until=now + timedelta(seconds=_SEARCH_BUILD_LEASE_SECONDS), updated_at=now,
+                ))
+                session.commit()
+            indexed += len(ids)
+            batches += 1
+            search_index_rebuild_rows_total.inc(len(ids))
+        if finished:
+            _purge_search_tokens(keep_kid=kid)
+            _log.info("search_index/rebuild-complete", key_id=kid, indexed=indexed)
+    except Exception:
+        finished = False
+        _log.exception("search_index/rebuild-failed", key_id=kid, high_water_mark=hwm)
+    finally:
+        with SessionLocal() as session:
+            session.execute(search_index_builds.update().where(b.key_id == kid).values(
+                lease_until=None, completed_at=datetime.now(UTC) if finished else None,
+            ))
+            session.commit()
+    return indexed
+
+
+def _purge_search_tokens(keep_kid: str, span: int = 10000) -> int:
+    """Delete tokens written under keys other than ``keep_kid``, one id span per transaction."""
+    from sqlalchemy import func, select
+    with SessionLocal() as session:
+        max_id = session.execute(
+            select(func.max(search_tokens.c.transcript_id)).where(search_tokens.c.key_id != keep_kid)
+        ).scalar() or 0
+    deleted = 0
+    for lo in range(0, max_id, span):
+        with SessionLocal() as session:
+            deleted += session.execute(search_tokens.delete().where(
+                search_tokens.c.transcript_id > lo,
+                search_tokens.c.transcript_id <= lo + span,
+                search_tokens.c.key_id != keep_kid,
+            )).rowcount or 0
+            session.commit()
+    return deleted
+
+
+# ---------------- Idempotency Key Helpers ---------------- #
+def claim_idempotency_key(key: str, ttl_seconds: int) -> bool:
+    """Atomically claim ``key``; True if it was new (or expired), False for a duplicate.
+
+    SQLite/PostgreSQL do it in one upsert that only overwrites an expired row,
+    judged by rowcount. MySQL uses INSERT IGNORE (the driver's FOUND_ROWS flag
+    makes ON DUPLICATE KEY rowcounts ambiguous) and only on a conflict issues a
+    conditional UPDATE to take over an expired, not yet swept key.
+    """
+    now = datetime.now(UTC)
+    values = {"key": key, "created_at": now, "expires_at": now + timedelta(seconds=ttl_seconds)}
+    backend = ENGINE.url.get_backend_name()
+    with SessionLocal() as session:
+        if backend in ("sqlite", "postgresql"):
+            if backend == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            stmt = dialect_insert(idempotency_keys).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[idempotency_keys.c.key],
+                set_={"created_at": stmt.excluded.created_at, "expires_at": stmt.excluded.expires_at},
+                where=idempotency_keys.c.expires_at < now,
+            )
+            claimed = session.execute(stmt).rowcount == 1
+        else:
+            if backend.startswith("mysql"):
+                claimed = session.execute(idempotency_keys.insert().prefix_with("IGNORE").values(**values)).rowcount == 1
+            else:
+                try:
+                    with session.begin_nested():
+                        session.execute(idempotency_keys.insert().values(**values))
+                    claimed = True
+                except IntegrityError:
+                    claimed = False
+            if not claimed:
+                claimed = session.execute(
+                    idempotency_keys.update()
+                    .where(idempotency_keys.c.key == key, idempotency_keys.c.expires_at < now)
+                    .values(created_at=values["created_at"], expires_at=values["expires_at"])
+                ).rowcount == 1
+        session.commit()
+    return claimed
+
+
+def release_idempotency_key(key: str) -> None:
+    """Drop a claim whose message was not persisted, so a retry is not treated as a duplicate."""
+    with SessionLocal() as session:
+        session.execute(idempotency_keys.delete().where(idempotency_keys.c.key == key))
+        session.commit()
+
+
+def record_transcript_artifacts(transcript_id: int, base_path: str) -> None:
+    """Remember where a transcript's Nextcloud artifacts go so retention deletes them by path."""
+    with SessionLocal() as session:
+        session.execute(transcript_artifacts.insert().values(transcript_id=transcript_id, base_path=base_path))
+        session.commit()
+
+
+def purge_expired_idempotency_keys(
+    batch_size: int = 1000, max_batches: int | None = None, created_before: datetime | None = None
+) -> int:
+    """Delete expired idempotency keys in short batches; returns rows deleted.
+
+    Each batch is its own transaction so the sweeper never holds locks on a
+    large range while consumers are claiming keys. ``created_before`` also
+    drops keys older than a retention cutoff even if they have not expired.
+    """
+    from sqlalchemy import or_, select
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        now = datetime.now(UTC)
+        expired = idempotency_keys.c.expires_at < now
+        if created_before is not None:
+            expired = or_(expired, idempotency_keys.c.created_at < created_before)
+        with SessionLocal() as session:
+            keys = session.execute(
+                select(idempotency_keys.c.key).where(expired).limit(batch_size)
+            ).scalars().all()
+            if not keys:
+                break
+            session.execute(idempotency_keys.delete().where(idempotency_keys.c.key.in_(keys)))
+            session.commit()
+        total += len(keys)
+        batches += 1
+        if len(keys) < batch_size:
+            break
+    if total:
+        idempotency_keys_expired_total.inc(total)
+    return total
+
+
+# ---------------- Publish Outbox Helpers ---------------- #
+def _outbox_values(queue: str, message: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values journaling ``message``; callers insert them in their own transaction."""
+    payload, kid = _encrypt_field(json.dumps(message, separators=(',', ':')))
+    return {"queue": queue, "payload": payload, "kid": kid}
+
+
+def outbox_append(queue: str, message: Dict[str, Any]) -> int:
+    """Journal a message that could not be published; returns row id or -1."""
+    values = _outbox_values(queue, message)
+    try:
+        with SessionLocal() as session:
+            result = session.execute(publish_outbox.insert().values(**values))
+            session.commit()
+            return int(result.inserted_primary_key[0])
+    except SQLAlchemyError as e:
+        _log.warning("persistence/outbox-append-failed", error=str(e))
+        return -1
+
+
+def outbox_decode(payload: str, kid: str | None) -> Dict[str, Any]:
+    return json.loads(_decrypt_field(payload, kid))
+
+
+def outbox_stats() -> tuple[int, datetime | None, int]:
+    """Return (depth, created_at of the oldest pending row, parked rows).
+
+    Parked rows (``last_error`` set) are never relayed, so they are counted on
+    their own instead of pinning the depth and oldest-age figures.
+    """
+    from sqlalchemy import case, func, select
+    pending = publish_outbox.c.last_error.is_(None)
+    with SessionLocal() as session:
+        depth, oldest, parked = session.execute(select(
+            func.count(case((pending, publish_outbox.c.id))),
+            func.min(case((pending, publish_outbox.c.created_at))),
+            func.count(publish_outbox.c.last_error),
+        )).one()
+    if isinstance(oldest, str):  # SQLite may hand back the raw column text
+        oldest = datetime.fromisoformat(oldest)
+    if oldest is not None and oldest.tzinfo is None:
+        oldest = oldest.replace(tzinfo=UTC)
+    return int(depth or 0), oldest, int(parked or 0)
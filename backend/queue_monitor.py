@@ -0,0 +1,108 @@
+"""Queue depth and consumer-lag sampling for the transcription consumer.
+
+pika connections are not thread-safe, so depth is sampled over a connection
+owned by the monitor thread instead of the one ``start_consuming`` runs on.
+Each sample also turns the number of deliveries acked since the last sample
+into a smoothed processing rate; ``backlog / rate`` is exported as an
+estimated drain time for autoscalers.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Callable
+
+import pika
+import structlog
+
+from metrics import consumer_processing_rate, transcription_queue_depth, transcription_queue_drain_seconds
+
+_log = structlog.get_logger(__name__)
+
+DepthSampler = Callable[[], int]
+
+
+class AmqpDepthSampler:
+    """Read a queue's ready-message count with a passive declare on a private connection."""
+
+    def __init__(self, url: str, queue: str):
+        self._url = url
+        self._queue = queue
+        self._connection = None
+        self._channel = None
+
+    def __call__(self) -> int:
+        try:
+            if self._channel is None or not self._channel.is_open:
+                self._connection = pika.BlockingConnection(pika.URLParameters(self._url))
+                self._channel = self._connection.channel()
+            return int(self._channel.queue_declare(queue=self._queue, passive=True).method.message_count)
+        except Exception:
+            self.close()  # reconnect on the next sample
+            raise
+
+    def close(self) -> None:
+        connection, self._connection, self._channel = self._connection, None, None
+        if connection is not None and connection.is_open:
+            try:
+                connection.close()
+            except Exception:  # noqa: BLE001
+                pass
+
+
+class QueueMonitor:
+    """Periodically sample depth and processing rate; see module docstring.
+
+    ``record_processed`` is called from whichever thread acks deliveries.
+    The rate is an exponentially weighted average so one idle or bursty
+    interval does not swing the estimate.
+    """
+
+    def __init__(self, sample_depth: DepthSampler, smoothing: float = 0.3, clock: Callable[[], float] = time.monotonic):
+        self._sample_depth = sample_depth
+        self._smoothing = smoothing
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._processed = 0
+        self._last_at: float | None = None
+        self.rate: float | None = None  # deliveries per second
+        self.depth: int | None = None
+
+    def record_processed(self, count: int = 1) -> None:
+        with self._lock:
+            self._processed += count
+
+    def sample(self) -> float | None:
+        """Take one sample; returns the estimated drain time in seconds (None until known)."""
+        now = self._clock()
+        with self._lock:
+            processed, self._processed = self._processed, 0
+        if self._last_at is not None and now > self._last_at:
+            current = processed / (now - self._last_at)
+            self.rate = current if self.rate is None else self._smoothing * current + (1 - self._smoothing) * self.rate
+            consumer_processing_rate.set(self.rate)
+        self._last_at = now
+        self.depth = self._sample_depth()
+        transcription_queue_depth.set(self.depth)
+        if self.depth == 0:
+            drain = 0.0
+        elif self.rate is None:
+            return None
+        else:
+            drain = self.depth / self.rate if self.rate > 0 else math.inf
+        transcription_queue_drain_seconds.set(drain)
+        return drain
+
+    def start(self, interval: float, stop: Callable[[], bool] | None = None) -> threading.Thread:
+        def _loop():
+            while not (stop and stop()):
+                try:
+                    self.sample()
+                except Exception as e:  # noqa: BLE001
+                    _log.warning("queue_monitor/sample-failed", error=str(e))
+                time.sleep(interval)
+
+        thread = threading.Thread(target=_loop, daemon=True, name="queue-monitor")
+        thread.start()
+        return thread
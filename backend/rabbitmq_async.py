@@ -0,0 +1,164 @@
+"""Asyncio RabbitMQ publisher for the FastAPI event loop.
+
+Owned by the app lifespan: one robust aio-pika connection with a
+publisher-confirm channel, so awaiting ``publish`` never blocks the loop.
+The synchronous ``rabbitmq_utils`` helpers remain for the consumer, DLQ
+tools and worker threads.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import structlog
+from opentelemetry import trace  # type: ignore
+from opentelemetry.propagate import inject
+
+from metrics import amqp_batch_size
+from rabbitmq_utils import encode_body, make_batch_envelope
+
+try:  # optional dependency; main falls back to a worker thread without it
+    import aio_pika  # type: ignore
+except ImportError:  # pragma: no cover - depends on environment
+    aio_pika = None
+
+_log = structlog.get_logger(__name__)
+
+
+def is_available() -> bool:
+    return aio_pika is not None
+
+
+class AsyncRabbitPublisher:
+    """Single robust connection + confirm channel shared by all requests on the loop."""
+
+    def __init__(self, url: str):
+        if aio_pika is None:
+            raise RuntimeError("aio-pika is not installed")
+        self._url = url
+        self._connection = None
+        self._channel = None
+        self._declared: set[str] = set()
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        # connect_robust reconnects and restores channels automatically
+        self._connection = await aio_pika.connect_robust(self._url)
+        self._channel = await self._connection.channel(publisher_confirms=True)
+        self._channel.reopen_callbacks.add(lambda *_a: self._declared.clear())
+        _log.info("rabbitmq/async-publisher-started")
+
+    async def _ensure_queue(self, queue: str) -> None:
+        if queue in self._declared:
+            return
+        async with self._lock:
+            if queue not in self._declared:
+                await self._channel.declare_queue(queue, durable=True)
+                self._declared.add(queue)
+
+    async def publish(self, queue: str, message: Dict[str, Any]) -> None:
+        """Publish and await the broker confirm (raises on nack / connection loss)."""
+        if self._channel is None:
+            raise RuntimeError("async publisher not started")
+        tracer = trace.get_tracer("rabbitmq")
+        with tracer.start_as_current_span("rabbitmq_publish") as span:
+            span.set_attribute("queue", queue)
+            carrier: Dict[str, str] = {}
+            inject(carrier)
+            await self._ensure_queue(queue)
+            body, content_encoding = encode_body(message)
+            await self._channel.default_exchange.publish(
+                aio_pika.Message(
+                    body=body,
+                    content_encoding=content_encoding,
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                    headers=carrier,
+                ),
+                routing_key=queue,
+            )
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            try:
+                await self._connection.close()
+            except Exception:  # noqa: BLE001
+                pass
+        self._connection = None
+        self._channel = None
+
+
+class TranscriptBatcher:
+    """Coalesce messages submitted within a linger window into one envelope.
+
+    A batch is flushed after ``linger_seconds`` or as soon as ``max_messages``
+    are pending, whichever comes first. ``submit`` resolves only once the
+    envelope carrying the message has been published (and confirmed), so a
+    request never returns before its transcript reached the broker; a failed
+    flush fails every caller in that batch and each applies its own retries.
+    ``on_failure(exc, size)`` runs once per failed flush, so per-publish
+    bookkeeping such as a circuit breaker sees one failure per envelope
+    rather than one per caller.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Dict[str, Any]], Awaitable[None]],
+        max_messages: int = 50,
+        linger_seconds: float = 0.02,
+        on_failure: Callable[[Exception, int], Awaitable[None]] | None = None,
+    ):
+        self._send = send
+        self._on_failure = on_failure
+        self._max = max(1, max_messages)
+        self._linger = max(0.0, linger_seconds)
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+    async def submit(self, message: Dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((message, fut))
+        if len(self._pending) >= self._max:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._linger, self._flush)
+        await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._publish(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _publish(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        amqp_batch_size.observe(len(batch))
+        try:
+            if len(batch) == 1:
+                await self._send(batch[0][0])
+            else:
+                await self._send(make_batch_envelope([message for message, _ in batch]))
+        except Exception as e:  # noqa: BLE001
+            if self._on_failure is not None:
+                try:
+                    await self._on_failure(e, len(batch))
+                except Exception:  # noqa: BLE001
+                    pass
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for _, fut in batch:
+            if not fut.done():
+                fut.set_result(None)
+
+    async def close(self) -> None:
+        """Flush whatever is pending and wait for in-flight batches."""
+        self._flush()
+        if self._inflight:
+            await asyncio.gather(*list(self._inflight), return_exceptions=True)
@@ -2,34 +2,317 @@
 
 Deletes transcripts older than RETENTION_DAYS (if >0) on a scheduled run.
 Run periodically via cron / Kubernetes CronJob.
+
+Rows are deleted by primary key in batches of RETENTION_PURGE_BATCH_SIZE, one
+short transaction each, optionally capped at RETENTION_PURGE_MAX_ROWS_PER_SECOND,
+so a large backlog never holds locks on a wide ``created_at`` range. Every
+batch commits together with a checkpoint in ``retention_purge_checkpoints``;
+a run that dies part-way is resumed from its high-water mark, and the
+checkpoint's lease keeps replicas from purging at the same time. Each batch
+also drops the transcripts' search tokens and, with the Nextcloud storage
+provider, removes their artifacts by the paths recorded at upload time: in
+``NEXTCLOUD_UPLOAD_MODE=queue`` as delete jobs for ``nextcloud_uploader``
+journaled in the publish outbox, otherwise directly once the batch has
+committed. Inline deletes keep their ``transcript_artifacts`` rows until
+Nextcloud confirms them, so a failed delete is retried by the next run.
+Idempotency keys older than the cutoff go after the last batch.
+
+When ``transcripts`` is partitioned by month (MySQL, see ``partitions``),
+months entirely before the cutoff are removed with ``DROP PARTITION`` first and
+the batches only cover the rest of the boundary month.
 """
 from __future__ import annotations
 
+import time
 from datetime import datetime, UTC, timedelta
-from sqlalchemy import delete
-from persistence import transcripts, SessionLocal
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from persistence import (
+    Throttle,
+    _outbox_values,
+    publish_outbox,
+    purge_expired_idempotency_keys,
+    retention_checkpoints,
+    search_tokens,
+    transcript_artifacts,
+    transcripts,
+    SessionLocal,
+)
 from config import get_settings
-from metrics import transcripts_purged_total
+from metrics import (
+    retention_artifact_deletions_total,
+    retention_purge_rows_per_second,
+    transcript_partitions_dropped_total,
+    transcripts_purged_total,
+)
+from nextcloud_storage import delete_transcript_artifacts
+from nextcloud_uploader import delete_job
+import partitions
 import structlog
 
 logger = structlog.get_logger().bind(component="retention")
 
+JOB_NAME = "transcripts"
+LEASE_SECONDS = 300
+
+
+def _aware(value: datetime) -> datetime:
+    if isinstance(value, str):  # SQLite may hand back the raw column text
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=UTC)
+
+
+def _claim(cutoff: datetime) -> tuple[int, int] | None:
+    """Lease the checkpoint; returns ``(high_water_mark, range_end)`` or None if another run holds it.
+
+    A finished checkpoint starts a new run bounded by the expired id range
+    under ``cutoff``; an unfinished one is resumed where it stopped.
+    """
+    cp = retention_checkpoints.c
+    now = datetime.now(UTC)
+    lease = now + timedelta(seconds=LEASE_SECONDS)
+    with SessionLocal() as session:
+        row = session.execute(select(retention_checkpoints).where(cp.name == JOB_NAME)).mappings().first()
+        if row is None:
+            try:
+                session.execute(retention_checkpoints.insert().values(
+                    name=JOB_NAME, cutoff=cutoff, range_end=0, high_water_mark=0, rows_purged=0, updated_at=now,
+                ))
+                session.commit()
+            except IntegrityError:  # another replica created it first
+                session.rollback()
+            row = session.execute(select(retention_checkpoints).where(cp.name == JOB_NAME)).mappings().first()
+        claimed = session.execute(
+            retention_checkpoints.update()
+            .where(cp.name == JOB_NAME, or_(cp.lease_until.is_(None), cp.lease_until < now))
+            .values(lease_until=lease)
+        ).rowcount == 1
+        if not claimed:
+            session.rollback()
+            return None
+        hwm, end = row["high_water_mark"], row["range_end"]
+        if hwm >= end:  # previous run finished: bound a new one
+            first, last = session.execute(
+                select(func.min(transcripts.c.id), func.max(transcripts.c.id)).where(transcripts.c.created_at < cutoff)
+            ).one()
+            hwm, end = (first - 1, last) if first is not None else (0, 0)
+            session.execute(retention_checkpoints.update().where(cp.name == JOB_NAME).values(
+                cutoff=cutoff, range_end=end, high_water_mark=hwm, rows_purged=0, updated_at=now,
+            ))
+        else:
+            logger.info("retention_purge_resumed", high_water_mark=hwm, range_end=end)
+        session.commit()
+    return hwm, end
+
+
+def _extend_lease(session) -> None:
+    session.execute(retention_checkpoints.update().where(retention_checkpoints.c.name == JOB_NAME).values(
+        lease_until=datetime.now(UTC) + timedelta(seconds=LEASE_SECONDS)
+    ))
+
+
+def _release() -> None:
+    with SessionLocal() as session:
+        session.execute(
+            retention_checkpoints.update().where(retention_checkpoints.c.name == JOB_NAME).values(lease_until=None)
+        )
+        session.commit()
+
+
+def _artifact_mode(settings) -> str | None:
+    """How purged transcripts' Nextcloud artifacts are removed: "queue", "inline" or None."""
+    if settings.storage_provider.lower() != "nextcloud":
+        return None
+    return "queue" if settings.nextcloud_upload_mode == "queue" else "inline"
+
+
+def _cascade(session, rows, artifacts: str | None) -> list[dict]:
+    """Delete search tokens of ``rows`` (id, filename, created_at) and their Nextcloud artifacts.
 
-def purge_once(now: datetime | None = None) -> int:
+    Returns the delete jobs the caller runs with ``_delete_inline`` after
+    committing (inline mode only; no Nextcloud call happens inside the
+    transaction).
+    """
+    ids = [r.id for r in rows]
+    session.execute(delete(search_tokens).where(search_tokens.c.transcript_id.in_(ids)))
+    paths: dict[int, list[str]] = {}
+    for transcript_id, base_path in session.execute(
+        select(transcript_artifacts.c.transcript_id, transcript_artifacts.c.base_path)
+        .where(transcript_artifacts.c.transcript_id.in_(ids))
+    ):
+        paths.setdefault(transcript_id, []).append(base_path)
+    if artifacts != "inline":
+        session.execute(delete(transcript_artifacts).where(transcript_artifacts.c.transcript_id.in_(ids)))
+    if not artifacts:
+        return []
+    jobs = [delete_job(r.id, r.filename, _aware(r.created_at).isoformat(), paths.get(r.id)) for r in rows]
+    if artifacts == "queue":
+        queue = get_settings().nextcloud_upload_queue
+        session.execute(publish_outbox.insert(), [_outbox_values(queue, job) for job in jobs])
+        return []
+    return jobs
+
+
+def _delete_inline(jobs: list[dict]) -> None:
+    """Remove committed transcripts' artifacts from Nextcloud, then forget their recorded paths.
+
+    A failed delete keeps its ``transcript_artifacts`` rows for
+    ``_retry_orphaned_artifacts``.
+    """
+    done = []
+    for job in jobs:
+        try:
+            delete_transcript_artifacts(job["record_id"], job["filename"], job["created_at"], job["paths"])
+        except Exception as e:  # noqa: BLE001
+            logger.warning("retention_artifact_delete_failed", record_id=job["record_id"], error=str(e))
+            continue
+        done.append(job["record_id"])
+    if done:
+        with SessionLocal() as session:
+            session.execute(delete(transcript_artifacts).where(transcript_artifacts.c.transcript_id.in_(done)))
+            session.commit()
+
+
+def _retry_orphaned_artifacts(batch_size: int) -> None:
+    """Retry inline deletes left behind by earlier runs (paths of transcripts that no longer exist)."""
+    with SessionLocal() as session:
+        rows = session.execute(
+            select(transcript_artifacts.c.transcript_id, transcript_artifacts.c.base_path)
+            .where(transcript_artifacts.c.transcript_id.not_in(select(transcripts.c.id)))
+            .order_by(transcript_artifacts.c.id.asc()).limit(batch_size)
+        ).all()
+    paths: dict[int, list[str]] = {}
+    for transcript_id, base_path in rows:
+        paths.setdefault(transcript_id, []).append(base_path)
+    _delete_inline([delete_job(transcript_id, "", None, p) for transcript_id, p in paths.items()])
+
+
+def _drop_expired_partitions(cutoff: datetime, batch_size: int, throttle: Throttle, artifacts: str | None) -> int:
+    """Drop monthly partitions wholly older than ``cutoff``; returns transcripts dropped.
+
+    Dependent rows are cleaned up first, reading the partition's ids in
+    batches (the ``created_at`` bounds prune the scan to that partition), so
+    an interrupted run only repeats idempotent token and artifact deletes
+    before the ``DROP PARTITION`` itself.
+    """
+    dropped = 0
+    for name, lower, upper in partitions.expired_partitions(partitions.list_partitions(), cutoff):
+        after = 0
+        while True:
+            throttle.wait(batch_size)
+            query = select(transcripts.c.id, transcripts.c.filename, transcripts.c.created_at).where(
+                transcripts.c.created_at < upper, transcripts.c.id > after
+            )
+            if lower is not None:
+                query = query.where(transcripts.c.created_at >= lower)
+            with SessionLocal() as session:
+                rows = session.execute(query.order_by(transcripts.c.id.asc()).limit(batch_size)).all()
+                jobs = _cascade(session, rows, artifacts) if rows else []
+                _extend_lease(session)
+                session.commit()
+            _delete_inline(jobs)
+            dropped += len(rows)
+            if len(rows) < batch_size:
+                break
+            after = rows[-1].id
+        partitions.drop_partition(name)
+        transcript_partitions_dropped_total.inc()
+    return dropped
+
+
+def _purge_batch(
+    session, hwm: int, end: int, cutoff: datetime, batch_size: int, artifacts: str | None
+) -> tuple[int, int, list[dict]]:
+    """Delete the next batch of expired transcripts after ``hwm``.
+
+    Returns ``(deleted, next_hwm, jobs)``; ``jobs`` are inline artifact
+    deletes to run once the batch has committed.
+    """
+    rows = session.execute(
+        select(transcripts.c.id, transcripts.c.filename, transcripts.c.created_at)
+        .where(transcripts.c.id > hwm, transcripts.c.id <= end, transcripts.c.created_at < cutoff)
+        .order_by(transcripts.c.id.asc()).limit(batch_size)
+    ).all()
+    next_hwm = rows[-1].id if len(rows) == batch_size else end
+    ids = [r.id for r in rows]
+    jobs = []
+    if ids:
+        jobs = _cascade(session, rows, artifacts)
+        session.execute(delete(transcripts).where(transcripts.c.id.in_(ids)))
+    session.execute(retention_checkpoints.update().where(retention_checkpoints.c.name == JOB_NAME).values(
+        high_water_mark=next_hwm,
+        rows_purged=retention_checkpoints.c.rows_purged + len(ids),
+        lease_until=datetime.now(UTC) + timedelta(seconds=LEASE_SECONDS),
+        updated_at=datetime.now(UTC),
+    ))
+    return len(ids), next_hwm, jobs
+
+
+def purge_once(
+    now: datetime | None = None,
+    batch_size: int | None = None,
+    max_batches: int | None = None,
+    max_rows_per_second: float | None = None,
+) -> int:
+    """Purge expired transcripts batch by batch; returns transcripts deleted by this call.
+
+    ``max_batches`` stops early (the checkpoint picks up from there next
+    time). Returns 0 without doing anything while another run holds the lease.
+    """
     settings = get_settings()
     days = settings.retention_days
     if not days or days <= 0:
         return 0
     cutoff = (now or datetime.now(UTC)) - timedelta(days=days)
-    with SessionLocal() as session:
-        result = session.execute(
-            delete(transcripts).where(transcripts.c.created_at < cutoff)
-        )
-        deleted = result.rowcount or 0
-        if deleted:
-            transcripts_purged_total.inc(deleted)
-        session.commit()
-    logger.info("retention_purge", deleted=deleted, cutoff=cutoff.isoformat())
+    batch_size = max(1, batch_size or settings.retention_purge_batch_size)
+    rate = settings.retention_purge_max_rows_per_second if max_rows_per_second is None else max_rows_per_second
+    throttle = Throttle(rate)
+    artifacts = _artifact_mode(settings)
+    claimed = _claim(cutoff)
+    if claimed is None:
+        logger.info("retention_purge_skipped", reason="lease_held")
+        return 0
+    hwm, end = claimed
+    deleted = 0
+    batches = 0
+    started = time.monotonic()
+    try:
+        if artifacts == "inline":
+            _retry_orphaned_artifacts(batch_size)
+        if partitions.is_partitioned():
+            deleted = _drop_expired_partitions(cutoff, batch_size, throttle, artifacts)
+            if deleted:
+                transcripts_purged_total.inc(deleted)
+                if artifacts:
+                    retention_artifact_deletions_total.inc(deleted)
+        while hwm < end and (max_batches is None or batches < max_batches):
+            throttle.wait(batch_size)
+            with SessionLocal() as session:
+                count, hwm, jobs = _purge_batch(session, hwm, end, cutoff, batch_size, artifacts)
+                session.commit()
+            _delete_inline(jobs)
+            if count:
+                transcripts_purged_total.inc(count)
+                if artifacts:
+                    retention_artifact_deletions_total.inc(count)
+            deleted += count
+            batches += 1
+    finally:
+        _release()
+    elapsed = time.monotonic() - started
+    rows_per_second = deleted / elapsed if elapsed > 0 else 0.0
+    retention_purge_rows_per_second.set(rows_per_second)
+    keys = purge_expired_idempotency_keys(batch_size=batch_size, created_before=cutoff) if hwm >= end else 0
+    logger.info(
+        "retention_purge",
+        deleted=deleted,
+        cutoff=cutoff.isoformat(),
+        batches=batches,
+        complete=hwm >= end,
+        seconds=round(elapsed, 3),
+        rows_per_second=round(rows_per_second, 1),
+        idempotency_keys=keys,
+    )
     return deleted
 
 
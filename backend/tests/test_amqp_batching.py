@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+import pytest
+
+import openemr_consumer as consumer
+from rabbitmq_async import TranscriptBatcher
+from rabbitmq_utils import BATCH_ENVELOPE_TYPE, make_batch_envelope, unpack_envelope
+
+
+def test_batcher_coalesces_within_linger_window():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def scenario():
+        batcher = TranscriptBatcher(send, max_messages=50, linger_seconds=0.02)
+        await asyncio.gather(*(batcher.submit({"filename": f"f{i}", "text": "t"}) for i in range(5)))
+        await batcher.close()
+
+    asyncio.run(scenario())
+    assert len(sent) == 1
+    assert sent[0]["type"] == BATCH_ENVELOPE_TYPE
+    assert [m["filename"] for m in sent[0]["messages"]] == ["f0", "f1", "f2", "f3", "f4"]
+
+
+def test_batcher_flushes_on_max_count_and_sends_singletons_plain():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def scenario():
+        batcher = TranscriptBatcher(send, max_messages=2, linger_seconds=10)
+        await asyncio.gather(*(batcher.submit({"filename": f"f{i}", "text": "t"}) for i in range(2)))
+        lone = asyncio.ensure_future(batcher.submit({"filename": "lone", "text": "t"}))
+        await asyncio.sleep(0)
+        await batcher.close()
+        await lone
+
+    asyncio.run(scenario())
+    assert len(sent) == 2
+    assert len(sent[0]["messages"]) == 2
+    assert sent[1] == {"filename": "lone", "text": "t"}
+
+
+def test_batcher_failure_reaches_every_caller():
+    async def send(message):
+        raise ConnectionError("broker down")
+
+    async def scenario():
+        batcher = TranscriptBatcher(send, max_messages=10, linger_seconds=0.01)
+        return await asyncio.gather(
+            *(batcher.submit({"filename": str(i), "text": "t"}) for i in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ConnectionError) for r in results)
+
+
+def test_batcher_reports_failure_once_per_flush():
+    reported = []
+
+    async def send(message):
+        raise ConnectionError("broker down")
+
+    async def on_failure(exc, size):
+        reported.append((type(exc), size))
+
+    async def scenario():
+        batcher = TranscriptBatcher(send, max_messages=10, linger_seconds=0.01, on_failure=on_failure)
+        await asyncio.gather(*(batcher.submit({"filename": str(i), "text": "t"}) for i in range(3)), return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert reported == [(ConnectionError, 3)]
+
+def test_unpack_envelope_passes_plain_messages_through():
+    plain = {"filename": "a", "text": "b"}
+    assert unpack_envelope(plain) == [plain]
+    assert unpack_envelope(make_batch_envelope([plain, plain])) == [plain, plain]
+
+
+def test_consumer_processes_each_transcript_and_acks_once(monkeypatch):
+    monkeypatch.setattr(consumer.settings, "enable_idempotency", False)
+    stored = []
+    monkeypatch.setattr(consumer, "store_transcript", lambda **k: stored.append(k["filename"]) or len(stored))
+    monkeypatch.setattr(consumer, "extract_entities", lambda text: type("E", (), {"to_dict": lambda self: {}})())
+    monkeypatch.setattr(consumer, "summarize_text", lambda text: "summary")
+    monkeypatch.setattr(consumer, "store_transcript_payload", lambda **k: None)
+    dlq = []
+    monkeypatch.setattr(consumer, "_send_to_dlq", lambda message: dlq.append(message))
+
+    acks = []
+
+    class DummyChannel:
+        def basic_ack(self, delivery_tag):
+            acks.append(delivery_tag)
+
+    class DummyMethod:
+        delivery_tag = 7
+
+    envelope = make_batch_envelope([
+        {"filename": "a.txt", "text": "one"},
+        {"filename": "b.txt", "text": "two"},
+        {"filename": "c.txt"},
+    ])
+    consumer.callback(DummyChannel(), DummyMethod(), None, json.dumps(envelope).encode())
+    assert stored == ["a.txt", "b.txt"]
+    assert [m["reason"] for m in dlq] == ["missing_fields"]
+    assert acks == [7]
+
+
+def test_consumer_decompresses_gzip_bodies(monkeypatch):
+    import gzip
+    from types import SimpleNamespace
+
+    monkeypatch.setattr(consumer.settings, "enable_idempotency", False)
+    stored = []
+    monkeypatch.setattr(consumer, "store_transcript", lambda **k: stored.append(k["text"]) or 1)
+    monkeypatch.setattr(consumer, "extract_entities", lambda text: type("E", (), {"to_dict": lambda self: {}})())
+    monkeypatch.setattr(consumer, "summarize_text", lambda text: None)
+    monkeypatch.setattr(consumer, "store_transcript_payload", lambda **k: None)
+
+    class DummyChannel:
+        def basic_ack(self, delivery_tag):
+            pass
+
+    class DummyMethod:
+        delivery_tag = 1
+
+    body = gzip.compress(json.dumps({"filename": "z.wav", "text": "compressed text"}).encode())
+    consumer.callback(DummyChannel(), DummyMethod(), SimpleNamespace(headers=None, content_encoding="gzip"), body)
+    assert stored == ["compressed text"]
+
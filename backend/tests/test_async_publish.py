@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import main as app_module
+
+
+class FakeAsyncPublisher:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.published = []
+
+    async def publish(self, queue, message):
+        await asyncio.sleep(0.01)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("broker down")
+        self.published.append((queue, message))
+
+
+@pytest.fixture(autouse=True)
+def _reset_breaker(monkeypatch):
+    app_module._breaker.store.reset()
+    monkeypatch.setattr(app_module.settings, "demo_mode", False)
+    yield
+    app_module._async_publisher = None
+    app_module._breaker.store.reset()
+
+
+def test_async_publish_retries_without_blocking_loop(monkeypatch):
+    publisher = FakeAsyncPublisher(failures=2)
+    monkeypatch.setattr(app_module, "_async_publisher", publisher)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.05)
+                ticks += 1
+
+        t = asyncio.create_task(ticker())
+        await app_module._publish_transcription_async("a.wav", "hello", "cid-1")
+        t.cancel()
+        return ticks
+
+    ticks = asyncio.run(scenario())
+    # backoff of 0.5s + 1.0s happened on the loop while the ticker kept running
+    assert ticks >= 20
+    assert len(publisher.published) == 1
+    queue, payload = publisher.published[0]
+    assert queue == app_module.settings.transcription_queue
+    assert payload["correlation_id"] == "cid-1"
+    assert app_module._breaker.store.get() == (0, 0.0)
+
+
+def test_async_publish_falls_back_to_thread_without_aio_pika(monkeypatch):
+    calls = []
+
+    def fake_send(queue, message, rabbitmq_url=None):
+        calls.append(queue)
+
+    monkeypatch.setattr(app_module, "send_to_rabbitmq", fake_send)
+    asyncio.run(app_module._publish_transcription_async("b.wav", "text"))
+    assert calls == [app_module.settings.transcription_queue]
+
+
+def test_async_publish_opens_breaker_and_journals_to_outbox(monkeypatch):
+    monkeypatch.setattr(app_module, "_async_publisher", FakeAsyncPublisher(failures=100))
+    monkeypatch.setattr(app_module._breaker, "threshold", 1)
+
+    async def no_sleep(_delay):
+        return None
+
+    monkeypatch.setattr(app_module.asyncio, "sleep", no_sleep)
+    journaled = []
+    import persistence
+    monkeypatch.setattr(persistence, "outbox_append", lambda queue, message: journaled.append(message["filename"]) or 1)
+
+    asyncio.run(app_module._publish_transcription_async("c.wav", "text"))
+    assert app_module._breaker.state.value == "open"
+    assert journaled == ["c.wav"]
+
+    # circuit open: journaled without attempting the broker
+    asyncio.run(app_module._publish_transcription_async("d.wav", "text"))
+    assert journaled == ["c.wav", "d.wav"]
+
+
+def test_async_publish_rejected_while_draining(monkeypatch):
+    monkeypatch.setattr(app_module, "_draining", True)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(app_module._publish_transcription_async("e.wav", "text"))
+    assert exc.value.status_code == 503
+
+
+def test_failed_batch_counts_one_breaker_failure_per_flush(monkeypatch):
+    publisher = FakeAsyncPublisher(failures=100)
+    monkeypatch.setattr(app_module, "_async_publisher", publisher)
+    monkeypatch.setattr(app_module, "_publish_batcher", app_module.rabbitmq_async.TranscriptBatcher(
+        app_module._send_transcription_async, max_messages=10, linger_seconds=0.01,
+        on_failure=app_module._record_batch_failure,
+    ))
+    failures, sends = [], []
+    monkeypatch.setattr(app_module._breaker, "record_failure", lambda: failures.append(1) or False)
+    real_send = app_module._send_transcription_async
+
+    async def counting_send(payload):
+        sends.append(payload)
+        await real_send(payload)
+
+    monkeypatch.setattr(app_module._publish_batcher, "_send", counting_send)
+
+    async def no_sleep(_delay):
+        return None
+
+    monkeypatch.setattr(app_module.asyncio, "sleep", no_sleep)
+    import persistence
+    monkeypatch.setattr(persistence, "outbox_append", lambda queue, message: 1)
+
+    async def scenario():
+        await asyncio.gather(*(
+            app_module._publish_transcription_async(f"{i}.wav", "text", batchable=True) for i in range(4)
+        ))
+
+    asyncio.run(scenario())
+    # four callers, but each failed envelope is one breaker failure
+    assert sends and len(failures) == len(sends) <= app_module._PUBLISH_ATTEMPTS
@@ -0,0 +1,136 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC, timedelta
+
+from fastapi.testclient import TestClient
+
+import main as app_module
+import transcription_services
+from main import issue_internal_jwt
+from persistence import save_session
+
+
+def _auth():
+    sid = 'cancel1'
+    save_session(sid, 'user/DocumentReference.write user/DocumentReference.read', 'access', None, datetime.now(UTC)+timedelta(hours=1))
+    token = issue_internal_jwt(sid, 'user/DocumentReference.write user/DocumentReference.read')
+    return {'Authorization': f'Bearer {token}'}
+
+
+def _wait_status(client, headers, task_id, wanted, tries=50):
+    js = None
+    for _ in range(tries):
+        js = client.get(f'/transcribe/local/task/{task_id}', headers=headers).json()
+        if js['status'] == wanted:
+            return js
+        time.sleep(0.05)
+    raise AssertionError(f'task never reached {wanted}: {js}')
+
+
+def test_running_task_reports_progress_and_cancels(monkeypatch):
+    client = TestClient(app_module.app)
+    headers = _auth()
+    published = []
+
+    def fake_transcribe_local(data, filename, mime):
+        scope = transcription_services._progress_scope.get()
+        for i in range(200):
+            scope.check_cancelled()
+            scope.report(float(i + 1), 400.0)
+            time.sleep(0.02)
+        return 'never finished'
+
+    monkeypatch.setattr(app_module, 'transcribe_local', fake_transcribe_local, raising=True)
+    monkeypatch.setattr(app_module, '_publish_transcription', lambda *a, **k: published.append(a), raising=True)
+
+    resp = client.post('/transcribe/local/?async_mode=true', headers=headers, files={'file': ('a.wav', b'RIFF....data', 'audio/wav')})
+    assert resp.status_code == 202
+    task_id = resp.json()['task_id']
+    js = _wait_status(client, headers, task_id, 'processing')
+    for _ in range(50):
+        js = client.get(f'/transcribe/local/task/{task_id}', headers=headers).json()
+        if js['progress_seconds']:
+            break
+        time.sleep(0.05)
+    assert js['total_seconds'] == 400.0
+    assert 0 < js['progress'] < 1
+    assert js['estimated_completion_at']
+
+    r = client.delete(f'/transcribe/local/task/{task_id}', headers=headers)
+    assert r.status_code == 202 and r.json()['status'] == 'cancelling'
+    _wait_status(client, headers, task_id, 'cancelled')
+    assert not published
+    # Finished tasks cannot be cancelled again
+    assert client.delete(f'/transcribe/local/task/{task_id}', headers=headers).status_code == 409
+
+
+def test_queued_task_removed_before_running(monkeypatch):
+    client = TestClient(app_module.app)
+    headers = _auth()
+    release = threading.Event()
+    calls = []
+
+    def fake_transcribe_local(data, filename, mime):
+        calls.append(filename)
+        release.wait(5)
+        return 'text'
+
+    monkeypatch.setattr(app_module, 'transcribe_local', fake_transcribe_local, raising=True)
+    monkeypatch.setattr(app_module, '_publish_transcription', lambda *a, **k: None, raising=True)
+    monkeypatch.setattr(app_module, '_tx_executor', ThreadPoolExecutor(max_workers=1), raising=True)
+
+    first = client.post('/transcribe/local/?async_mode=true', headers=headers, files={'file': ('first.wav', b'RIFF', 'audio/wav')}).json()['task_id']
+    _wait_status(client, headers, first, 'processing')
+    second = client.post('/transcribe/local/?async_mode=true', headers=headers, files={'file': ('second.wav', b'RIFF', 'audio/wav')}).json()['task_id']
+    assert client.get(f'/transcribe/local/task/{second}', headers=headers).json()['status'] == 'queued'
+
+    r = client.delete(f'/transcribe/local/task/{second}', headers=headers)
+    assert r.status_code == 200 and r.json()['status'] == 'cancelled'
+    release.set()
+    _wait_status(client, headers, first, 'done')
+    time.sleep(0.1)
+    assert calls == ['first.wav']
+    assert client.get(f'/transcribe/local/task/{second}', headers=headers).json()['status'] == 'cancelled'
+
+
+def test_cancel_unknown_task_404():
+    client = TestClient(app_module.app)
+    assert client.delete('/transcribe/local/task/nope', headers=_auth()).status_code == 404
+
+
+def test_completion_does_not_overwrite_cancel():
+    from persistence import async_task_create, async_task_start, async_task_cancel, async_task_update, async_task_get
+    async_task_create('guarded1', 'g.wav')
+    assert async_task_start('guarded1')
+    assert async_task_cancel('guarded1')
+    assert not async_task_update('guarded1', 'done', result_text='late', expected_status='processing')
+    row = async_task_get('guarded1')
+    assert row['status'] == 'cancelled' and row['result_text'] is None
+
+
+def test_segmented_windows_carry_context_and_cut_segments(monkeypatch):
+    from types import SimpleNamespace
+    rate = 10
+    monkeypatch.setattr(transcription_services, 'whisper', SimpleNamespace(
+        load_audio=lambda path: list(range(70 * rate)), audio=SimpleNamespace(SAMPLE_RATE=rate),
+    ))
+    monkeypatch.setattr(transcription_services.get_settings(), 'local_segment_seconds', 30)
+    calls = []
+
+    class Model:
+        def transcribe(self, audio, initial_prompt=None):
+            calls.append((audio[0] // rate, len(audio) // rate, initial_prompt))
+            first = audio[0] // rate
+            return {'text': f'w{first} cut', 'segments': [
+                {'start': 0.0, 'text': f' w{first}'}, {'start': 25.0, 'text': ' cut'},
+            ]}
+
+    progress = []
+    scope = transcription_services._ProgressScope(lambda done, total: progress.append(done), None)
+    text = transcription_services._transcribe_segmented(Model(), 'x.wav', scope)
+    # The cut last segment of each window is re-decoded from its start in the next one
+    assert [c[:2] for c in calls] == [(0, 30), (25, 30), (50, 20)]
+    assert calls[0][2] is None and calls[1][2] == 'w0' and calls[2][2] == 'w0 w25'
+    assert text == 'w0 w25 w50 cut'
+    assert progress == [25.0, 50.0, 70.0]
@@ -1,4 +1,3 @@
-import time
 from datetime import datetime, UTC, timedelta
 import main as app_module
 from persistence import save_session, async_task_create, async_task_update
@@ -28,14 +27,15 @@ def test_breaker_metrics(monkeypatch):
     def fail_send(*a, **k):
         raise RuntimeError('rmq down')
     monkeypatch.setattr(app_module, 'send_to_rabbitmq', fail_send, raising=True)
-    app_module._CB_THRESHOLD = 1
+    monkeypatch.setattr(app_module._breaker, 'threshold', 1)
     r = client.post('/transcribe/local/?async_mode=false', headers={'Authorization': f'Bearer {token}'}, files={'file':('f.wav', b'RIFF....data', 'audio/wav')})
     assert r.status_code in (500,503)
     # Circuit should open next attempt and fallback
-    app_module._cb_open_until = time.time() + 60
+    app_module._breaker.trip(60)
     r2 = client.post('/transcribe/local/?async_mode=false', headers={'Authorization': f'Bearer {token}'}, files={'file':('f.wav', b'RIFF....data', 'audio/wav')})
     assert r2.status_code in (200,500,503)
     # Metrics endpoint scrape to ensure metrics emitted
     m = client.get('/metrics')
     body = m.text
     assert 'breaker_open_total' in body or 'breaker_fallback_persist_total' in body
+    app_module._breaker.store.reset()
@@ -0,0 +1,76 @@
+import os
+import time
+
+import pytest
+
+from circuit_breaker import BreakerState, CircuitBreaker, MemoryBreakerStore, RedisBreakerStore
+from metrics import breaker_state_transitions_total
+
+
+def _transitions(state):
+    return breaker_state_transitions_total.labels("test", state)._value.get()  # type: ignore[attr-defined]
+
+
+def test_opens_after_threshold_and_single_prober_closes_it():
+    store = MemoryBreakerStore()
+    a = CircuitBreaker("test", store=store, threshold=2, reset_seconds=0.05)
+    b = CircuitBreaker("test", store=store, threshold=2, reset_seconds=0.05)  # another worker sharing state
+    opened_before = _transitions("open")
+
+    assert a.record_failure() is False
+    assert b.record_failure() is True
+    assert a.state is BreakerState.OPEN and not a.allow_request() and not b.allow_request()
+    assert _transitions("open") == opened_before + 1
+
+    time.sleep(0.06)
+    assert a.state is BreakerState.HALF_OPEN
+    assert a.allow_request() is True  # wins the probe lease
+    assert b.allow_request() is False
+    a.record_success()
+    assert b.state is BreakerState.CLOSED and b.allow_request()
+    assert _transitions("closed") >= 1
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    assert breaker.record_failure() is True
+    assert breaker.state is BreakerState.OPEN
+    assert breaker.snapshot()["open_until"] > time.time()
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("test", threshold=2, reset_seconds=60)
+    breaker.record_failure()
+    breaker.record_success()
+    assert breaker.record_failure() is False
+    assert breaker.state is BreakerState.CLOSED
+
+
+def test_memory_store_forgets_failures_outside_window():
+    breaker = CircuitBreaker("test", threshold=2, reset_seconds=0.05)
+    assert breaker.record_failure() is False
+    time.sleep(0.08)
+    # the first failure aged out, as a Redis counter would have expired
+    assert breaker.record_failure() is False
+    assert breaker.snapshot()["failures"] == 1
+    assert breaker.state is BreakerState.CLOSED
+
+
+@pytest.mark.skipif(not os.environ.get("REDIS_URL"), reason="REDIS_URL not set; skipping Redis breaker integration test")
+def test_redis_store_shares_state_across_breakers():
+    import redis
+
+    client = redis.StrictRedis.from_url(os.environ["REDIS_URL"], decode_responses=True)
+    client.delete("breaker:shared-test:failures", "breaker:shared-test:open_until", "breaker:shared-test:probe")
+    a = CircuitBreaker("test", store=RedisBreakerStore(client, "shared-test"), threshold=2, reset_seconds=1)
+    b = CircuitBreaker("test", store=RedisBreakerStore(client, "shared-test"), threshold=2, reset_seconds=1)
+    a.record_failure()
+    assert b.record_failure() is True
+    assert a.state is BreakerState.OPEN
+    time.sleep(1.1)
+    assert [a.allow_request(), b.allow_request()].count(True) == 1
+    a.record_success()  # success reported by either worker closes the shared breaker
+    assert b.state is BreakerState.CLOSED
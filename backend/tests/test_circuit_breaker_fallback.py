@@ -3,7 +3,6 @@ from fastapi.testclient import TestClient
 from main import issue_internal_jwt
 from persistence import save_session
 from datetime import datetime, UTC, timedelta
-import time
 
 
 def test_circuit_breaker_fallback(monkeypatch):
@@ -16,14 +15,15 @@ def test_circuit_breaker_fallback(monkeypatch):
         raise RuntimeError('rmq down')
     monkeypatch.setattr(app_module, 'send_to_rabbitmq', fail_send, raising=True)
     # Hit threshold quickly by lowering internal threshold values
-    app_module._CB_THRESHOLD = 2
+    monkeypatch.setattr(app_module._breaker, 'threshold', 2)
+    app_module._breaker.store.reset()
     # first attempt -> error (503)
     r1 = client.post('/transcribe/local/?async_mode=false', headers={'Authorization': f'Bearer {token}'}, files={'file':('f.wav', b'RIFF....data', 'audio/wav')})
     assert r1.status_code == 500 or r1.status_code == 503
     # second attempt triggers open then fallback on third
     r2 = client.post('/transcribe/local/?async_mode=false', headers={'Authorization': f'Bearer {token}'}, files={'file':('f.wav', b'RIFF....data', 'audio/wav')})
     # After breaker opens, subsequent publish should fallback silently; we simulate by calling publish via another attempt
-    app_module._cb_open_until =  time.time() + 60
+    app_module._breaker.trip(60)
     r3 = client.post('/transcribe/local/?async_mode=false', headers={'Authorization': f'Bearer {token}'}, files={'file':('f.wav', b'RIFF....data', 'audio/wav')})
     assert r3.status_code in (200,500,503)  # allow variability; primary assertion is breaker state exposed
     if not app_module.settings.admin_api_key:
@@ -33,4 +33,6 @@ def test_circuit_breaker_fallback(monkeypatch):
     if status.status_code == 200:
         js = status.json()
         assert 'circuit_open_until' in js
+        assert js['circuit_state'] == 'open'
+    app_module._breaker.store.reset()
 
@@ -0,0 +1,130 @@
+import json
+import queue
+import threading
+import time
+
+import openemr_consumer as consumer
+
+
+class FakeConnection:
+    def __init__(self):
+        self.callbacks = queue.Queue()
+
+    def add_callback_threadsafe(self, cb):
+        self.callbacks.put(cb)
+
+
+class FakeChannel:
+    is_open = True
+
+    def __init__(self):
+        self.acked = []
+        self.ack_threads = set()
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.acked.append(delivery_tag)
+        self.ack_threads.add(threading.current_thread().name)
+
+
+class Method:
+    def __init__(self, tag):
+        self.delivery_tag = tag
+
+
+def _patch(monkeypatch, persist):
+    monkeypatch.setattr(consumer.settings, "enable_idempotency", False)
+    monkeypatch.setattr(consumer, "extract_entities", lambda text: type("E", (), {"to_dict": lambda self: {}})())
+    monkeypatch.setattr(consumer, "summarize_text", lambda text: None)
+    monkeypatch.setattr(consumer, "store_transcript", persist)
+    monkeypatch.setattr(consumer, "store_transcript_payload", lambda **k: None)
+
+
+def _drain(connection, channel, expected):
+    deadline = time.time() + 5
+    while len(channel.acked) < expected and time.time() < deadline:
+        connection.callbacks.get(timeout=5)()
+
+
+def test_workers_run_in_parallel_and_ack_on_connection_thread(monkeypatch):
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def persist(**kwargs):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+        return 1
+
+    _patch(monkeypatch, persist)
+    consumer.configure_stage_limits({"persist": 2})
+    connection, channel = FakeConnection(), FakeChannel()
+    dispatcher = consumer.ConcurrentConsumer(connection, channel, workers=4)
+    try:
+        for tag in range(8):
+            body = json.dumps({"filename": f"f{tag}.wav", "text": "t"}).encode()
+            dispatcher.on_message(channel, Method(tag), None, body)
+        _drain(connection, channel, 8)
+    finally:
+        dispatcher.shutdown()
+        consumer.configure_stage_limits({})
+    assert sorted(channel.acked) == list(range(8))
+    assert channel.ack_threads == {threading.current_thread().name}
+    assert active["peak"] == 2  # persist stage limit honoured
+
+
+def test_processing_error_goes_to_dlq_and_is_acked(monkeypatch):
+    def persist(**kwargs):
+        raise RuntimeError("boom")
+
+    _patch(monkeypatch, persist)
+    dlq = []
+    monkeypatch.setattr(consumer, "_send_to_dlq", lambda message: dlq.append(message))
+    connection, channel = FakeConnection(), FakeChannel()
+    dispatcher = consumer.ConcurrentConsumer(connection, channel, workers=2)
+    try:
+        dispatcher.on_message(channel, Method(1), None, json.dumps({"filename": "x.wav", "text": "t"}).encode())
+        _drain(connection, channel, 1)
+    finally:
+        dispatcher.shutdown()
+    assert channel.acked == [1]
+    assert dlq == [{"filename": "x.wav", "text": "t", "reason": "processing_error"}]
+
+
+def test_failing_batch_member_is_dlqd_alone(monkeypatch):
+    from rabbitmq_utils import make_batch_envelope
+
+    stored = []
+    fail = {"b.wav"}
+
+    def persist(**kwargs):
+        if kwargs["filename"] in fail:
+            raise RuntimeError("boom")
+        stored.append(kwargs["filename"])
+        return len(stored)
+
+    _patch(monkeypatch, persist)
+    monkeypatch.setattr(consumer.settings, "enable_idempotency", True)
+    monkeypatch.setattr(consumer, "_redis_client", None)
+    dlq = []
+    monkeypatch.setattr(consumer, "_send_to_dlq", lambda message: dlq.append(message))
+    members = [{"filename": f"{name}.wav", "text": f"text {name}"} for name in "abc"]
+    connection, channel = FakeConnection(), FakeChannel()
+    dispatcher = consumer.ConcurrentConsumer(connection, channel, workers=2)
+    try:
+        dispatcher.on_message(channel, Method(1), None, json.dumps(make_batch_envelope(members)).encode())
+        _drain(connection, channel, 1)
+        assert channel.acked == [1]
+        assert stored == ["a.wav", "c.wav"]
+        assert dlq == [{"filename": "b.wav", "text": "text b", "reason": "processing_error"}]
+
+        # the reprocessor's retry of the member is processed, not skipped as a duplicate
+        fail.clear()
+        retry = {**members[1], "_dlq_attempts": 1}
+        dispatcher.on_message(channel, Method(2), None, json.dumps(retry).encode())
+        _drain(connection, channel, 2)
+    finally:
+        dispatcher.shutdown()
+    assert stored == ["a.wav", "c.wav", "b.wav"]
@@ -0,0 +1,110 @@
+import json
+
+import openemr_consumer as consumer
+
+
+class FakeConnection:
+    def __init__(self):
+        self.timers = {}
+        self._next = 0
+
+    def call_later(self, delay, callback):
+        self._next += 1
+        self.timers[self._next] = callback
+        return self._next
+
+    def remove_timeout(self, timer_id):
+        self.timers.pop(timer_id, None)
+
+    def fire_timers(self):
+        for timer_id in list(self.timers):
+            self.timers.pop(timer_id)()
+
+
+class FakeChannel:
+    is_open = True
+
+    def __init__(self):
+        self.acks = []
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.acks.append((delivery_tag, multiple))
+
+
+class Method:
+    def __init__(self, tag):
+        self.delivery_tag = tag
+
+
+def _body(i, **extra):
+    return json.dumps({"filename": f"f{i}.wav", "text": f"text {i}", **extra}).encode()
+
+
+def _patch(monkeypatch):
+    monkeypatch.setattr(consumer.settings, "enable_idempotency", False)
+    monkeypatch.setattr(consumer, "extract_entities", lambda text: type("E", (), {"to_dict": lambda self: {}})())
+    monkeypatch.setattr(consumer, "summarize_text", lambda text: None)
+    uploads = []
+    monkeypatch.setattr(consumer, "store_transcript_payload", lambda **k: uploads.append(k["record_id"]))
+    dlq = []
+    monkeypatch.setattr(consumer, "_send_to_dlq", lambda message: dlq.append(message))
+    return uploads, dlq
+
+
+def test_flushes_on_batch_size_with_one_insert_and_multi_ack(monkeypatch):
+    uploads, dlq = _patch(monkeypatch)
+    batches = []
+    monkeypatch.setattr(consumer, "store_transcripts", lambda records: batches.append(records) or [11, 12, 13])
+    connection, channel = FakeConnection(), FakeChannel()
+    batcher = consumer.BatchingConsumer(connection, channel, batch_size=3, linger_seconds=1)
+    for tag in (1, 2, 3):
+        batcher.on_message(channel, Method(tag), None, _body(tag))
+    assert len(batches) == 1 and [r["filename"] for r in batches[0]] == ["f1.wav", "f2.wav", "f3.wav"]
+    assert channel.acks == [(3, True)]
+    assert uploads == [11, 12, 13]
+    assert not connection.timers and not dlq
+
+
+def test_linger_flushes_partial_batch_and_covers_skipped_deliveries(monkeypatch):
+    uploads, dlq = _patch(monkeypatch)
+    monkeypatch.setattr(consumer, "store_transcripts", lambda records: [21])
+    connection, channel = FakeConnection(), FakeChannel()
+    batcher = consumer.BatchingConsumer(connection, channel, batch_size=10, linger_seconds=0.2)
+    batcher.on_message(channel, Method(1), None, b"not-json")  # DLQ'd, acked with the batch
+    batcher.on_message(channel, Method(2), None, _body(2))
+    assert channel.acks == []
+    connection.fire_timers()
+    assert channel.acks == [(2, True)]
+    assert uploads == [21]
+    assert [m["reason"] for m in dlq] == ["invalid_json"]
+
+
+def test_batch_failure_falls_back_per_message_and_dlqs_bad_rows(monkeypatch):
+    uploads, dlq = _patch(monkeypatch)
+
+    def failing_batch(records):
+        raise RuntimeError("deadlock")
+
+    def single(**kwargs):
+        return -1 if kwargs["filename"] == "f2.wav" else 30 + int(kwargs["filename"][1])
+
+    monkeypatch.setattr(consumer, "store_transcripts", failing_batch)
+    monkeypatch.setattr(consumer, "store_transcript", single)
+    connection, channel = FakeConnection(), FakeChannel()
+    batcher = consumer.BatchingConsumer(connection, channel, batch_size=3, linger_seconds=1)
+    for tag in (1, 2, 3):
+        batcher.on_message(channel, Method(tag), None, _body(tag))
+    assert channel.acks == [(3, True)]
+    assert uploads == [31, 33]
+    assert [(m["filename"], m["reason"]) for m in dlq] == [("f2.wav", "persistence_failed")]
+
+
+def test_store_transcripts_returns_ids_in_order():
+    from persistence import get_transcript, store_transcripts
+
+    ids = store_transcripts([
+        {"filename": "bulk-a.txt", "text": "alpha", "source": "test"},
+        {"filename": "bulk-b.txt", "text": "beta", "summary": "b", "source": "test"},
+    ])
+    assert len(ids) == 2 and ids[0] < ids[1]
+    assert get_transcript(ids[1])["filename"] == "bulk-b.txt"
@@ -29,10 +29,149 @@ def test_handle_malformed_message(monkeypatch):
 
 
 def test_handle_permanent_failure(monkeypatch):
-	# Message exceeding attempts triggers permanent failure
+	# Message exceeding attempts triggers permanent failure and is parked
+	import dlq_reprocessor
+
+	sent = []
+	monkeypatch.setattr(dlq_reprocessor, "send_to_rabbitmq", lambda queue, message, **kw: sent.append((queue, message)))
 	ch = DummyChannel()
 	body = json.dumps({"_dlq_attempts": MAX_REPROCESS_ATTEMPTS + 1}).encode()
 	_handle_message(ch, DummyMethod(), None, body)
 	assert ch.acks == 1
 	assert reprocessor_permanent_failure_total._value.get() >= 1  # type: ignore
+	assert sent[0][0] == dlq_reprocessor.PARKED_QUEUE and sent[0][1]["_parked"] == "exhausted"
+
+
+
+def test_handle_compressed_message(monkeypatch):
+	import gzip
+	import dlq_reprocessor
+
+	sent = []
+	monkeypatch.setattr(
+		dlq_reprocessor, "send_to_rabbitmq",
+		lambda queue, message, rabbitmq_url=None, queue_arguments=None: sent.append((queue, message)),
+	)
+	ch = DummyChannel()
+	body = gzip.compress(json.dumps({"filename": "a.wav", "text": "t"}).encode())
+	_handle_message(ch, DummyMethod(), SimpleNamespace(content_encoding="gzip", headers=None), body)
+	assert ch.acks == 1
+	assert sent == [(dlq_reprocessor._delay_queue(1)[0], {"filename": "a.wav", "text": "t", "_dlq_attempts": 1})]
+
+
+def test_retry_goes_to_ttl_delay_queue_without_sleeping(monkeypatch):
+	import dlq_reprocessor
+
+	sent = []
+	monkeypatch.setattr(
+		dlq_reprocessor, "send_to_rabbitmq",
+		lambda queue, message, rabbitmq_url=None, queue_arguments=None: sent.append((queue, queue_arguments)),
+	)
+	ch = DummyChannel()
+	_handle_message(ch, DummyMethod(), None, json.dumps({"filename": "a.wav", "_dlq_attempts": 2}).encode())
+	queue, args = sent[0]
+	ttl = dlq_reprocessor._delay_tier_ms(3)
+	assert queue == f"{dlq_reprocessor.DLQ_QUEUE}.delay.{ttl}ms"
+	assert args == {"x-message-ttl": ttl, "x-dead-letter-exchange": "", "x-dead-letter-routing-key": dlq_reprocessor.MAIN_QUEUE}
+	assert dlq_reprocessor._delay_tier_ms(1) < ttl <= dlq_reprocessor.MAX_BACKOFF_SECONDS * 1000
+	assert ch.acks == 1
+
+
+def _capture(monkeypatch):
+	import dlq_reprocessor
+
+	sent = []
+	monkeypatch.setattr(
+		dlq_reprocessor, "send_to_rabbitmq",
+		lambda queue, message, rabbitmq_url=None, queue_arguments=None: sent.append((queue, message, queue_arguments)),
+	)
+	return dlq_reprocessor, sent
+
+
+def test_unfixable_reasons_are_parked_immediately(monkeypatch):
+	dlq_reprocessor, sent = _capture(monkeypatch)
+	ch = DummyChannel()
+	_handle_message(ch, DummyMethod(), None, json.dumps({"filename": "a.wav", "reason": "missing_fields"}).encode())
+	assert [(q, m["_parked"]) for q, m, _ in sent] == [(dlq_reprocessor.PARKED_QUEUE, "unfixable")]
+	assert ch.acks == 1
+
+
+def test_persistence_failures_replay_when_db_healthy_else_hold(monkeypatch):
+	dlq_reprocessor, sent = _capture(monkeypatch)
+	body = json.dumps({"filename": "a.wav", "text": "t", "reason": "persistence_failed"}).encode()
+	monkeypatch.setattr(dlq_reprocessor, "_db_healthy", lambda: True)
+	_handle_message(DummyChannel(), DummyMethod(), None, body)
+	monkeypatch.setattr(dlq_reprocessor, "_db_healthy", lambda: False)
+	_handle_message(DummyChannel(), DummyMethod(), None, body)
+	(replay_q, replay_msg, _), (hold_q, hold_msg, hold_args) = sent
+	assert replay_q == dlq_reprocessor.MAIN_QUEUE and replay_msg["_dlq_attempts"] == 1
+	assert hold_q == dlq_reprocessor.HOLD_QUEUE and "_dlq_attempts" not in hold_msg  # holding spends no attempt
+	assert hold_args["x-dead-letter-routing-key"] == dlq_reprocessor.DLQ_QUEUE
+
+
+class BrowseChannel:
+	"""basic_get over an in-memory queue; nack(multiple) requeues everything unacked."""
+
+	def __init__(self, messages):
+		self.queue = [json.dumps(m).encode() for m in messages]
+		self.unacked = {}
+		self.acked = []
+		self._tag = 0
+
+	def basic_get(self, queue, auto_ack=False):
+		if not self.queue:
+			return None, None, None
+		self._tag += 1
+		self.unacked[self._tag] = self.queue.pop(0)
+		return SimpleNamespace(delivery_tag=self._tag), None, self.unacked[self._tag]
+
+	def basic_ack(self, delivery_tag):
+		self.acked.append(json.loads(self.unacked.pop(delivery_tag)))
+
+	def basic_nack(self, delivery_tag, multiple, requeue):
+		self.queue = list(self.unacked.values()) + self.queue
+		self.unacked.clear()
+
+
+def test_cli_composition_and_filtered_replay():
+	import dlq_reprocessor
+
+	channel = BrowseChannel([
+		{"filename": "a", "reason": "persistence_failed", "_dlq_attempts": 2},
+		{"filename": "b", "reason": "invalid_json"},
+		{"filename": "c", "reason": "persistence_failed"},
+	])
+	assert dlq_reprocessor.dlq_composition(channel) == {"persistence_failed": 2, "invalid_json": 1}
+	assert len(channel.queue) == 3  # browsing consumed nothing
+
+	published, sleeps = [], []
+	count = dlq_reprocessor.replay(
+		channel, {"persistence_failed"}, rate=10,
+		publish=lambda **kw: published.append(kw["message"]), sleep=sleeps.append,
+	)
+	assert count == 2 and sleeps == [0.1, 0.1]
+	assert published == [{"filename": "a", "_replayed": True}, {"filename": "c", "_replayed": True}]
+	assert [json.loads(b)["filename"] for b in channel.queue] == ["b"]
+
+
+def test_unconfigured_database_is_unhealthy(monkeypatch):
+	import dlq_reprocessor
+	monkeypatch.delenv("TRANSCRIPTS_DB_HOST", raising=False)
+	monkeypatch.delenv("DLQ_DB_HEALTH_URL", raising=False)
+	monkeypatch.setattr(dlq_reprocessor, "_db_health", (0.0, True))
+	monkeypatch.setattr(dlq_reprocessor, "_db_engine", None)
+	assert dlq_reprocessor._db_healthy() is False
+	monkeypatch.setenv("DLQ_DB_HEALTH_URL", "sqlite://")
+	monkeypatch.setattr(dlq_reprocessor, "_db_health", (0.0, False))
+	assert dlq_reprocessor._db_healthy() is True
+
+
+def test_retry_counts_as_scheduled_not_success(monkeypatch):
+	import dlq_reprocessor
+	from metrics import reprocessor_scheduled_total
 
+	monkeypatch.setattr(dlq_reprocessor, "send_to_rabbitmq", lambda queue, message, **kw: None)
+	success, scheduled = reprocessor_success_total._value.get(), reprocessor_scheduled_total._value.get()  # type: ignore
+	_handle_message(DummyChannel(), DummyMethod(), None, json.dumps({"filename": "a.wav", "text": "t"}).encode())
+	assert reprocessor_scheduled_total._value.get() == scheduled + 1  # type: ignore
+	assert reprocessor_success_total._value.get() == success  # type: ignore
@@ -15,3 +15,43 @@ def test_encryption_roundtrip(encryption_env):
     assert rec['summary'] == 'summary text'
     assert isinstance(rec['enrichment'], dict)
     assert rec['enrichment']['k'] == 'v'
+
+
+def test_bulk_store_encrypts_every_row(encryption_env):
+    from sqlalchemy import select
+    from persistence import SessionLocal, store_transcripts, transcripts
+
+    ids = store_transcripts([
+        {'filename': 'a.wav', 'text': 'first note', 'summary': 'first', 'enrichment': {'k': 'a'}, 'source': 'api'},
+        {'filename': 'b.wav', 'text': 'second note', 'summary': None, 'enrichment': None, 'source': 'api'},
+    ])
+    with SessionLocal() as session:
+        raw = session.execute(select(transcripts.c.text).where(transcripts.c.id.in_(ids))).scalars().all()
+    assert all('"enc":true' in r for r in raw)
+    first, second = get_transcript(ids[0]), get_transcript(ids[1])
+    assert (first['text'], first['summary'], first['enrichment']['k']) == ('first note', 'first', 'a')
+    assert (second['text'], second['summary']) == ('second note', None)
+
+
+def test_cipher_cache_is_reused_and_rebuilt_on_reload(encryption_env, monkeypatch):
+    import base64
+    import os
+
+    import config
+    import persistence
+
+    cipher = persistence._ciphers['k1']
+    blob, kid = persistence._encrypt_field('cached')
+    assert persistence._ciphers['k1'] is cipher  # no per-call construction
+    pairs = persistence._encrypt_many(['a', None, 'c'])
+    assert [p[1] for p in pairs] == ['k1', None, 'k1']
+    assert persistence._decrypt_many([(blob, kid), (pairs[0][0], 'k1'), ('plain', None)]) == ['cached', 'a', 'plain']
+
+    new_key = base64.b64encode(os.urandom(32)).decode()
+    monkeypatch.setenv('ENCRYPTION_KEYS', f'k1:{encryption_env[1]},k2:{new_key}')
+    monkeypatch.setenv('PRIMARY_ENCRYPTION_KEY_ID', 'k2')
+    config.get_settings.cache_clear()
+    assert persistence.reload_encryption_keys() == 2
+    assert persistence._ciphers['k1'] is not cipher and set(persistence._ciphers) == {'k1', 'k2'}
+    assert persistence._encrypt_field('x')[1] == 'k2'
+    assert persistence._decrypt_field(blob, kid) == 'cached'  # old key still decrypts
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from field_compression import FieldCompressor, train_dictionary
+
+NOTE = (
+    "Subjective: patient reports intermittent chest pain radiating to the left arm for two days. "
+    "Denies shortness of breath. Objective: BP 132/84, HR 78, afebrile. Assessment: atypical chest pain. "
+    "Plan: ECG, troponin, follow up in one week. "
+) * 10
+
+
+@pytest.mark.parametrize('codec', ['zlib', 'zstd'])
+def test_roundtrip_and_small_fields_stay_plain(codec):
+    comp = FieldCompressor(codec)
+    data, used = comp.compress(NOTE.encode())
+    assert used == codec and len(data) < len(NOTE) // 3
+    assert comp.decompress(data, used) == NOTE.encode()
+    assert comp.compress(b'short') == (b'short', None)
+    assert FieldCompressor('none').compress(NOTE.encode()) == (NOTE.encode(), None)
+
+
+
+def test_zlib_field_inflating_past_limit_is_rejected(monkeypatch):
+    import zlib
+    import field_compression
+
+    monkeypatch.setattr(field_compression, 'MAX_FIELD_BYTES', 1024)
+    comp = FieldCompressor('zlib')
+    assert comp.decompress(zlib.compress(b'a' * 1024), 'zlib') == b'a' * 1024
+    with pytest.raises(ValueError):
+        comp.decompress(zlib.compress(b'a' * 1025), 'zlib')
+    with pytest.raises(ValueError):
+        comp.decompress(zlib.compress(b'a' * 100)[:-4], 'zlib')
+
+def test_dictionary_frames_resolve_by_id_and_old_dictionaries_stay_readable():
+    samples = [NOTE.replace('two', str(i)).replace('78', str(60 + i % 40)) for i in range(300)]
+    old_dict, new_dict = train_dictionary(samples, 4096), train_dictionary(samples[::-1], 8192)
+    old = FieldCompressor('zstd', dictionaries=[old_dict], min_bytes=0)
+    sealed, codec = old.compress(samples[0][:200].encode())
+    assert codec == 'zstd'
+    # the new primary dictionary compresses, the retired one still decompresses
+    assert FieldCompressor('zstd', dictionaries=[new_dict, old_dict]).decompress(sealed, codec) == samples[0][:200].encode()
+    with pytest.raises(ValueError):
+        FieldCompressor('zstd').decompress(sealed, codec)
+
+
+def test_compressed_rows_are_flagged_and_old_rows_still_decrypt(encryption_env, monkeypatch):
+    import config
+    import persistence
+
+    old_id = persistence.store_transcript('plain.wav', NOTE, NOTE[:300], None, 'api')
+    monkeypatch.setenv('FIELD_COMPRESSION', 'zstd')
+    config.get_settings.cache_clear()
+    persistence.reload_encryption_keys()
+    new_id = persistence.store_transcript('zstd.wav', NOTE, NOTE[:300], {'k': 'v'}, 'api')
+
+    with persistence.SessionLocal() as session:
+        rows = dict(session.execute(
+            persistence.sql_text('SELECT id, text FROM transcripts WHERE id IN (:a, :b)'), {'a': old_id, 'b': new_id}
+        ).all())
+    assert 'z' not in json.loads(rows[old_id])
+    assert json.loads(rows[new_id])['z'] == 'zstd' and len(rows[new_id]) < len(rows[old_id]) // 3
+    for tid in (old_id, new_id):
+        rec = persistence.get_transcript(tid)
+        assert (rec['text'], rec['summary']) == (NOTE, NOTE[:300])
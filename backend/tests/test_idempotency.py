@@ -132,3 +132,101 @@ def test_duplicate_suppression_redis(monkeypatch):
     assert resp2.status_code == 200
     after = duplicates_skipped_total._value.get()  # type: ignore[attr-defined]
     assert after == before + 1
+
+
+class _CountingRedis:
+    def __init__(self):
+        self.keys = set()
+        self.calls = []
+
+    def set(self, name, value, nx=False, ex=None):
+        self.calls.append(("SET", name))
+        if name in self.keys:
+            return None
+        self.keys.add(name)
+        return True
+
+    def register_script(self, script):
+        def run(keys, args):
+            self.calls.append(("EVALSHA", keys[0], tuple(args)))
+            if keys[0] in self.keys:
+                return 0
+            self.keys.add(keys[0])
+            return 1
+        return run
+
+
+def test_recent_claims_answer_redeliveries_without_redis(monkeypatch):
+    fake = _CountingRedis()
+    monkeypatch.setattr(consumer, "_redis_client", fake)
+    monkeypatch.setattr(consumer.settings, "enable_idempotency", True)
+    monkeypatch.setattr(consumer.settings, "enable_db_idempotency", False)
+    consumer._RECENT_CLAIMS.clear()
+    assert consumer._check_duplicate("h1") is False
+    assert consumer._check_duplicate("h1") is True
+    assert fake.calls == [("SET", "idemp:h1")]  # second check served locally
+    consumer._RECENT_CLAIMS.clear()
+    assert consumer._check_duplicate("h1") is True  # Redis stays authoritative
+    assert len(fake.calls) == 2
+
+
+def test_bloom_and_claim_share_one_script_call(monkeypatch):
+    fake = _CountingRedis()
+    monkeypatch.setattr(consumer, "_redis_client", fake)
+    monkeypatch.setattr(consumer, "_redis_has_bloom", True)
+    monkeypatch.setattr(consumer, "_claim_script", None)
+    monkeypatch.setattr(consumer.settings, "use_bloom_idempotency", True)
+    monkeypatch.setattr(consumer.settings, "idempotency_ttl_seconds", 60)
+    assert consumer._redis_claim("h2") is True
+    assert consumer._redis_claim("h2") is False
+    assert fake.calls == [("EVALSHA", "idemp:h2", (60, "h2", "0"))] * 2  # no separate BF.ADD / SET round-trips
+
+
+
+def test_bloom_only_duplicates_are_metered_separately(monkeypatch):
+    from metrics import idempotency_bloom_only_duplicates_total
+
+    class BloomOnlyRedis:
+        seen = set()
+
+        def register_script(self, _source):
+            def run(keys, args):
+                if args[1] in self.seen:
+                    return 2 if args[2] == "1" else 0
+                self.seen.add(args[1])
+                return 1
+            return run
+
+    monkeypatch.setattr(consumer, "_redis_client", BloomOnlyRedis())
+    monkeypatch.setattr(consumer, "_redis_has_bloom", True)
+    monkeypatch.setattr(consumer, "_claim_script", None)
+    monkeypatch.setattr(consumer.settings, "use_bloom_idempotency", True)
+    monkeypatch.setattr(consumer.settings, "idempotency_bloom_only", True)
+    before = idempotency_bloom_only_duplicates_total._value.get()
+    assert consumer._redis_claim("h3") is True
+    assert consumer._redis_claim("h3") is False
+    assert idempotency_bloom_only_duplicates_total._value.get() == before + 1
+
+def test_persistence_failure_releases_claim_for_dlq_retry(monkeypatch):
+    monkeypatch.setattr(consumer.settings, "enable_idempotency", True)
+    monkeypatch.setattr(consumer.settings, "enable_db_idempotency", False)
+    monkeypatch.setattr(consumer, "_redis_client", None)
+    monkeypatch.setattr(consumer, "extract_entities", lambda text: type("E", (), {"to_dict": lambda self: {}})())
+    monkeypatch.setattr(consumer, "summarize_text", lambda text: None)
+    monkeypatch.setattr(consumer, "store_transcript_payload", lambda **k: None)
+    dlq, stored = [], []
+    monkeypatch.setattr(consumer, "_send_to_dlq", lambda message: dlq.append(message))
+    results = iter([-1, 7])
+    monkeypatch.setattr(consumer, "store_transcript", lambda **k: stored.append(k) or next(results))
+    message = {"filename": "release.wav", "text": f"release {datetime.now(UTC).isoformat()}"}
+
+    class Channel:
+        def basic_ack(self, delivery_tag):
+            pass
+
+    method = type("M", (), {"delivery_tag": 1})()
+    consumer.callback(Channel(), method, None, json.dumps(message).encode())
+    assert dlq[0]["reason"] == "persistence_failed"
+    # the DLQ reprocessor sends it back; it must not be skipped as a duplicate
+    consumer.callback(Channel(), method, None, json.dumps({**message, "_dlq_attempts": 1}).encode())
+    assert len(stored) == 2 and len(dlq) == 1
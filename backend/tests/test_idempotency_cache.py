@@ -0,0 +1,49 @@
+import hashlib
+
+from idempotency_cache import BloomFilter, SeenCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_check_and_add_and_ttl_expiry():
+    clock = FakeClock()
+    cache = SeenCache(max_size=10, ttl_seconds=5, clock=clock)
+    assert cache.check_and_add("a") is False
+    assert cache.check_and_add("a") is True
+    clock.now = 5.1
+    assert "a" not in cache
+    assert cache.check_and_add("a") is False  # expired entries count as new
+    assert len(cache) == 1
+
+
+def test_fifo_eviction_at_max_size():
+    cache = SeenCache(max_size=3, ttl_seconds=60)
+    for key in "abcd":
+        cache.add(key)
+    assert "a" not in cache
+    assert all(key in cache for key in "bcd") and len(cache) == 3
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(1000)]
+    assert sum(bloom.add(k) for k in keys) < 50  # only false positives report "present"
+    assert all(k in bloom for k in keys)
+    assert bloom.add(keys[0]) is True
+
+
+def test_bloom_reset_reseeds_from_seen_cache():
+    seen = SeenCache(max_size=100, ttl_seconds=0)
+    bloom = BloomFilter(capacity=4, error_rate=0.01, reseed=seen.keys)
+    keys = [f"{i:064x}" for i in range(1, 7)]
+    for key in keys:
+        if not bloom.add(key):
+            seen.add(key)
+    # the filter reset after four keys; earlier keys still in the cache must not read as new
+    assert all(key in bloom for key in keys)
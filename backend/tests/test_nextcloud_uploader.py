@@ -0,0 +1,124 @@
+import json
+import queue
+
+import pytest
+
+import nextcloud_uploader as uploader
+import openemr_consumer as consumer
+from nextcloud_storage import NextcloudStorageError
+from rabbitmq_utils import make_batch_envelope
+
+
+def _job(record_id):
+    return uploader.upload_job(record_id, f"f{record_id}.wav", "text", None, {}, {"source": "test"})
+
+
+def test_process_job_retries_then_parks(monkeypatch):
+    calls = []
+
+    def failing_upload(**kwargs):
+        calls.append(kwargs["record_id"])
+        raise NextcloudStorageError("503")
+
+    parked = []
+    monkeypatch.setattr(uploader, "upload_transcript_payload", failing_upload)
+    monkeypatch.setattr(uploader, "send_to_rabbitmq", lambda queue, message, rabbitmq_url=None: parked.append((queue, message)))
+    monkeypatch.setattr(uploader.settings, "nextcloud_upload_max_attempts", 3)
+    sleeps = []
+    assert uploader.process_job(_job(7), sleep=sleeps.append) is False
+    assert calls == [7, 7, 7] and len(sleeps) == 2 and sleeps[0] < sleeps[1]
+    assert parked[0][0] == uploader.UPLOAD_DLQ and parked[0][1]["reason"] == "upload_failed"
+
+
+def test_pool_unpacks_envelopes_and_acks_on_connection_thread(monkeypatch):
+    uploaded = []
+    monkeypatch.setattr(uploader, "upload_transcript_payload", lambda **k: uploaded.append(k["record_id"]))
+
+    class Connection:
+        def __init__(self):
+            self.callbacks = queue.Queue()
+
+        def add_callback_threadsafe(self, cb):
+            self.callbacks.put(cb)
+
+    class Channel:
+        is_open = True
+        acked = []
+
+        def basic_ack(self, delivery_tag):
+            self.acked.append(delivery_tag)
+
+    connection, channel = Connection(), Channel()
+    pool = uploader.UploaderPool(connection, channel, workers=2)
+    method = type("M", (), {"delivery_tag": 5})()
+    pool.on_message(channel, method, None, json.dumps(make_batch_envelope([_job(1), _job(2)])).encode())
+    connection.callbacks.get(timeout=5)()
+    pool.shutdown()
+    assert sorted(uploaded) == [1, 2] and channel.acked == [5]
+
+
+@pytest.mark.parametrize("mode, enqueued", [("queue", True), ("inline", False)])
+def test_consumer_queues_uploads_instead_of_uploading_inline(monkeypatch, mode, enqueued):
+    sent, inline = [], []
+    monkeypatch.setattr(consumer.settings, "storage_provider", "nextcloud")
+    monkeypatch.setattr(consumer.settings, "nextcloud_upload_mode", mode)
+    monkeypatch.setattr(consumer, "send_to_rabbitmq", lambda queue, message, rabbitmq_url=None: sent.append((queue, message)))
+    monkeypatch.setattr(consumer, "store_transcript_payload", lambda **k: inline.append(k["record_id"]))
+    prepared = consumer._PreparedTranscript({"filename": "a.wav"}, "a.wav", "hello", None, {})
+    consumer._finish_transcript(prepared, 42)
+    if enqueued:
+        assert sent[0][0] == consumer.settings.nextcloud_upload_queue and sent[0][1]["record_id"] == 42
+        assert inline == []
+    else:
+        assert sent == [] and inline == [42]
+
+
+def test_delete_job_removes_matching_artifacts(monkeypatch):
+    import nextcloud_storage
+
+    class Client:
+        deleted = []
+        listing = {
+            "2026/03/01": ["235959-9-visit.json", "235959-9-visit.txt", "235959-19-visit.json", "120000-9-other.json"],
+            "2026/03/02": ["000105-9-visit.json"],
+        }
+
+        def list_collection(self, rel_dir):
+            return self.listing.get(rel_dir, [])
+
+        def delete_document(self, rel_path):
+            self.deleted.append(rel_path)
+            return True
+
+    monkeypatch.setattr(nextcloud_storage, "_select_client", Client)
+    assert uploader.process_job(uploader.delete_job(9, "visit.wav", "2026-03-01T23:59:30+00:00")) is True
+    assert Client.deleted == ["2026/03/01/235959-9-visit.json", "2026/03/01/235959-9-visit.txt", "2026/03/02/000105-9-visit.json"]
+
+
+def test_upload_records_paths_that_delete_jobs_remove(monkeypatch):
+    import nextcloud_storage
+    from persistence import SessionLocal, transcript_artifacts
+    from sqlalchemy import select
+
+    class Client:
+        uploaded, deleted = [], []
+
+        def upload_document(self, rel_path, content, content_type):
+            self.uploaded.append(rel_path)
+
+        def delete_document(self, rel_path):
+            self.deleted.append(rel_path)
+            return True
+
+    monkeypatch.setattr(nextcloud_storage, "_select_client", Client)
+    record_id = 900001
+    assert uploader.process_job(_job(record_id)) is True
+    with SessionLocal() as session:
+        paths = session.execute(
+            select(transcript_artifacts.c.base_path).where(transcript_artifacts.c.transcript_id == record_id)
+        ).scalars().all()
+        session.execute(transcript_artifacts.delete().where(transcript_artifacts.c.transcript_id == record_id))
+        session.commit()
+    assert [f"{p}.json" for p in paths] + [f"{p}.txt" for p in paths] == Client.uploaded
+    assert uploader.process_job(uploader.delete_job(record_id, f"f{record_id}.wav", None, paths)) is True
+    assert Client.deleted == Client.uploaded
@@ -0,0 +1,94 @@
+from sqlalchemy import delete
+
+import outbox
+from metrics import outbox_depth, outbox_parked
+from persistence import SessionLocal, outbox_append, outbox_stats, publish_outbox
+from rabbitmq_utils import BATCH_ENVELOPE_TYPE
+
+
+def _clear_outbox():
+    with SessionLocal() as session:
+        session.execute(delete(publish_outbox))
+        session.commit()
+
+
+def test_relay_drains_outbox_in_batch_envelopes():
+    _clear_outbox()
+    for i in range(3):
+        assert outbox_append("transcriptions", {"filename": f"f{i}.wav", "text": f"text {i}"}) > 0
+    assert outbox.update_outbox_metrics() == 3
+    assert outbox_depth._value.get() == 3  # type: ignore[attr-defined]
+
+    published = []
+    relayed = outbox.relay_once(batch_size=10, publish=lambda queue, message: published.append((queue, message)))
+    assert relayed == 3
+    assert len(published) == 1
+    queue, envelope = published[0]
+    assert queue == "transcriptions"
+    assert envelope["type"] == BATCH_ENVELOPE_TYPE
+    assert [m["filename"] for m in envelope["messages"]] == ["f0.wav", "f1.wav", "f2.wav"]
+    assert outbox_stats() == (0, None, 0)
+
+
+def test_relay_keeps_rows_when_broker_unavailable():
+    _clear_outbox()
+    outbox_append("transcriptions", {"filename": "a.wav", "text": "kept"})
+
+    def fail(queue, message):
+        raise ConnectionError("broker down")
+
+    assert outbox.relay_once(publish=fail) == 0
+    depth, oldest, _parked = outbox_stats()
+    assert depth == 1 and oldest is not None
+
+    published = []
+    assert outbox.relay_once(publish=lambda q, m: published.append(m)) == 1
+    assert published == [{"filename": "a.wav", "text": "kept"}]
+
+
+def test_relay_parks_undecodable_rows():
+    _clear_outbox()
+    with SessionLocal() as session:
+        session.execute(publish_outbox.insert().values(queue="transcriptions", payload="not-json", kid=None))
+        session.commit()
+    outbox_append("transcriptions", {"filename": "b.wav", "text": "ok"})
+    published = []
+    assert outbox.relay_once(publish=lambda q, m: published.append(m)) == 1
+    assert published == [{"filename": "b.wav", "text": "ok"}]
+    # parked row is not retried and is reported apart from the pending depth/age
+    assert outbox_stats() == (0, None, 1)
+    outbox.update_outbox_metrics()
+    assert outbox_parked._value.get() == 1  # type: ignore[attr-defined]
+    assert outbox.relay_once(publish=lambda q, m: published.append(m)) == 0
+    _clear_outbox()
+
+
+def test_relay_closes_half_open_breaker_without_api_traffic(monkeypatch):
+    import time
+
+    from circuit_breaker import BreakerState, CircuitBreaker
+
+    _clear_outbox()
+    monkeypatch.setattr(outbox.get_settings(), "outbox_relay_interval_seconds", 0.05)
+    breaker = CircuitBreaker("outbox-test", threshold=1, reset_seconds=0.2)
+    breaker.trip()
+    outbox_append("transcriptions", {"filename": "c.wav", "text": "after outage"})
+
+    published = []
+    stopped = []
+    outbox.start_relay_thread(
+        can_publish=breaker.allow_request,
+        stop=lambda: bool(stopped),
+        on_success=breaker.record_success,
+        on_failure=breaker.record_failure,
+        publish=lambda q, m: published.append(m),
+    )
+    try:
+        deadline = time.time() + 5
+        while time.time() < deadline and outbox_stats()[0]:
+            time.sleep(0.05)
+    finally:
+        stopped.append(True)
+    assert published == [{"filename": "c.wav", "text": "after outage"}]
+    assert outbox_stats()[0] == 0
+    assert breaker.state is BreakerState.CLOSED
@@ -0,0 +1,74 @@
+from datetime import datetime, UTC, timedelta
+
+import partitions
+
+
+def test_partition_definitions_cover_months_then_overflow():
+    sql = partitions.partition_definitions(datetime(2026, 11, 15, tzinfo=UTC), datetime(2027, 1, 2, tzinfo=UTC))
+    assert sql == (
+        "PARTITION p202611 VALUES LESS THAN ('2026-12-01 00:00:00'), "
+        "PARTITION p202612 VALUES LESS THAN ('2027-01-01 00:00:00'), "
+        "PARTITION p202701 VALUES LESS THAN ('2027-02-01 00:00:00'), "
+        "PARTITION pmax VALUES LESS THAN (MAXVALUE)"
+    )
+
+
+def test_missing_months_extend_to_horizon():
+    now = datetime(2026, 10, 19, tzinfo=UTC)
+    assert partitions.missing_months(["p202609", "p202610", "p202611", "pmax"], now, 3) == [
+        datetime(2026, 12, 1, tzinfo=UTC), datetime(2027, 1, 1, tzinfo=UTC),
+    ]
+    assert partitions.missing_months(["p202609", "p202701", "pmax"], now, 3) == []
+
+
+def test_expired_partitions_stop_at_cutoff_month():
+    bounds = [("p202607", datetime(2026, 8, 1, tzinfo=UTC)), ("p202608", datetime(2026, 9, 1, tzinfo=UTC)),
+              ("p202609", datetime(2026, 10, 1, tzinfo=UTC)), ("pmax", None)]
+    expired = partitions.expired_partitions(bounds, datetime(2026, 9, 15, tzinfo=UTC))
+    assert [(name, lower) for name, lower, _ in expired] == [("p202607", None), ("p202608", datetime(2026, 8, 1, tzinfo=UTC))]
+
+
+def test_sqlite_is_not_partitioned():
+    assert not partitions.is_partitioned()
+    assert partitions.maintain_partitions() == []
+
+
+def test_retention_drops_expired_partitions_then_purges_boundary_rows(monkeypatch):
+    import retention
+    from persistence import SessionLocal, transcripts
+    from sqlalchemy import select
+
+    monkeypatch.setattr(retention.get_settings(), "retention_days", 30)
+    now = datetime.now(UTC)
+    cutoff = now - timedelta(days=30)
+    boundary = partitions.month_start(cutoff)
+    with SessionLocal() as session:
+        session.execute(transcripts.delete())
+        for created in (boundary - timedelta(days=40), boundary - timedelta(days=5), boundary + (cutoff - boundary) / 2, now):
+            session.execute(transcripts.insert().values(
+                filename="p.wav", text="x", source="test", created_at=created,
+            ))
+        session.commit()
+    layout = [
+        (partitions.partition_name(partitions.add_months(boundary, -2)), partitions.add_months(boundary, -1)),
+        (partitions.partition_name(partitions.add_months(boundary, -1)), boundary),
+        (partitions.partition_name(boundary), partitions.add_months(boundary, 1)),
+        ("pmax", None),
+    ]
+    dropped = []
+
+    def drop(name):  # stand-in for ALTER TABLE ... DROP PARTITION
+        upper = dict(layout)[name]
+        with SessionLocal() as session:
+            session.execute(transcripts.delete().where(transcripts.c.created_at < upper))
+            session.commit()
+        dropped.append(name)
+
+    monkeypatch.setattr(partitions, "is_partitioned", lambda: True)
+    monkeypatch.setattr(partitions, "list_partitions", lambda: layout)
+    monkeypatch.setattr(partitions, "drop_partition", drop)
+    assert retention.purge_once(now=now) == 3
+    assert dropped == [layout[0][0], layout[1][0]]
+    with SessionLocal() as session:
+        left = session.execute(select(transcripts.c.created_at)).scalars().all()
+    assert len(left) == 1
@@ -9,4 +9,48 @@ def test_store_transcript_sqlite_fallback():
         enrichment={"entities": []},
         source="test",
     )
-    assert rec_id == 1 or rec_id > 0
\ No newline at end of file
+    assert rec_id == 1 or rec_id > 0
+
+def test_store_transcripts_masks_like_single_row(monkeypatch):
+    import audit
+    from persistence import get_transcript, store_transcripts
+
+    monkeypatch.setattr(audit._settings, "store_phi", False)
+    events = []
+    monkeypatch.setattr("persistence.audit", lambda event, **fields: events.append((event, fields)))
+    text = "Call John Smith at 555-123-4567"
+    ids = store_transcripts([
+        {"filename": "m1.wav", "text": text, "source": "test"},
+        {"filename": "m2.wav", "text": "no phi here", "source": "test"},
+    ])
+    assert get_transcript(ids[0])["text"] == audit.mask_phi(text)
+    assert get_transcript(ids[1])["text"] == "no phi here"
+    assert len(events) == 1 and events[0][1]["count"] == 2
+
+
+def test_claim_idempotency_key_is_atomic_and_reclaims_expired():
+    import uuid
+    from datetime import datetime, UTC, timedelta
+
+    from persistence import SessionLocal, claim_idempotency_key, idempotency_keys, purge_expired_idempotency_keys
+
+    key = uuid.uuid4().hex
+    assert claim_idempotency_key(key, 60) is True
+    assert claim_idempotency_key(key, 60) is False
+    stale = uuid.uuid4().hex
+    with SessionLocal() as session:
+        past = datetime.now(UTC) - timedelta(seconds=1)
+        session.execute(idempotency_keys.insert().values(key=stale, created_at=past, expires_at=past))
+        session.commit()
+    assert claim_idempotency_key(stale, 60) is True  # expired but not yet swept
+    with SessionLocal() as session:
+        past = datetime.now(UTC) - timedelta(seconds=1)
+        session.execute(idempotency_keys.insert(), [
+            {"key": uuid.uuid4().hex, "created_at": past, "expires_at": past} for _ in range(5)
+        ])
+        session.commit()
+    assert purge_expired_idempotency_keys(batch_size=2) >= 5
+    assert claim_idempotency_key(key, 60) is False  # live keys survive the sweep
+    with SessionLocal() as session:
+        session.execute(idempotency_keys.delete().where(idempotency_keys.c.key.in_([key, stale])))
+        session.commit()
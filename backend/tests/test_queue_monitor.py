@@ -0,0 +1,40 @@
+import math
+
+import pytest
+
+from metrics import transcription_queue_depth, transcription_queue_drain_seconds
+from queue_monitor import QueueMonitor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_drain_time_is_backlog_over_smoothed_rate():
+    clock = FakeClock()
+    depths = iter([500, 400, 0])
+    monitor = QueueMonitor(lambda: next(depths), smoothing=0.5, clock=clock)
+    assert monitor.sample() is None  # no rate yet
+    assert transcription_queue_depth._value.get() == 500  # type: ignore[attr-defined]
+
+    monitor.record_processed(100)
+    clock.now += 10  # 10 msg/s
+    assert monitor.sample() == pytest.approx(40.0)
+    assert transcription_queue_drain_seconds._value.get() == pytest.approx(40.0)  # type: ignore[attr-defined]
+
+    monitor.record_processed(300)
+    clock.now += 10  # 30 msg/s, smoothed to 20
+    assert monitor.sample() == 0.0  # empty queue drains immediately
+    assert monitor.rate == pytest.approx(20.0)
+
+
+def test_stalled_consumer_reports_infinite_drain():
+    clock = FakeClock()
+    monitor = QueueMonitor(lambda: 10, clock=clock)
+    monitor.sample()
+    clock.now += 5
+    assert math.isinf(monitor.sample())
@@ -0,0 +1,129 @@
+import json
+import threading
+
+import pika
+import pytest
+
+import rabbitmq_utils
+from rabbitmq_utils import RabbitPublisher
+
+
+class FakeChannel:
+    def __init__(self, conn):
+        self.conn = conn
+        self.is_open = True
+        self.confirms = False
+        self.declared = []
+        self.published = []
+
+    def confirm_delivery(self):
+        self.confirms = True
+
+    def queue_declare(self, queue, durable=True, arguments=None):
+        self.declared.append(queue)
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        if self.conn.fail_next:
+            self.conn.fail_next = False
+            self.conn.is_closed = True
+            raise pika.exceptions.StreamLostError("lost")
+        self.published.append((routing_key, body))
+
+
+class FakeConnection:
+    instances = []
+
+    def __init__(self, params):
+        self.is_closed = False
+        self.fail_next = False
+        self._channel = FakeChannel(self)
+        FakeConnection.instances.append(self)
+
+    def channel(self):
+        return self._channel
+
+    def process_data_events(self, time_limit=0):
+        pass
+
+    def close(self):
+        self.is_closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_pika(monkeypatch):
+    FakeConnection.instances = []
+    monkeypatch.setattr(pika, "BlockingConnection", FakeConnection)
+    monkeypatch.setattr(pika, "URLParameters", lambda url: url)
+    yield
+    rabbitmq_utils.close_publishers()
+
+
+def test_connection_reused_and_declare_cached():
+    pub = RabbitPublisher("amqp://x", pool_size=2)
+    for i in range(5):
+        pub.publish("q1", f"m{i}")
+    assert len(FakeConnection.instances) == 1
+    ch = FakeConnection.instances[0]._channel
+    assert ch.confirms is True
+    assert ch.declared == ["q1"]
+    assert len(ch.published) == 5
+
+
+def test_reconnects_after_connection_loss():
+    pub = RabbitPublisher("amqp://x", pool_size=1)
+    pub.publish("q1", "first")
+    FakeConnection.instances[0].fail_next = True
+    pub.publish("q1", "second")
+    assert len(FakeConnection.instances) == 2
+    # declaration cache is dropped with the broken channel
+    assert FakeConnection.instances[1]._channel.declared == ["q1"]
+    assert FakeConnection.instances[1]._channel.published == [("q1", "second")]
+
+
+def test_pool_bounded_across_threads():
+    pub = RabbitPublisher("amqp://x", pool_size=3)
+    threads = [threading.Thread(target=lambda: [pub.publish("q", "b") for _ in range(20)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert 1 <= len(FakeConnection.instances) <= 3
+    assert sum(len(c._channel.published) for c in FakeConnection.instances) == 160
+
+
+def test_send_to_rabbitmq_uses_process_pool():
+    rabbitmq_utils.send_to_rabbitmq("q2", {"a": 1}, rabbitmq_url="amqp://pooled")
+    rabbitmq_utils.send_to_rabbitmq("q2", {"a": 2}, rabbitmq_url="amqp://pooled")
+    assert len(FakeConnection.instances) == 1
+    assert rabbitmq_utils.get_publisher("amqp://pooled") is rabbitmq_utils.get_publisher("amqp://pooled")
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_large_payloads_compressed_and_decoded(monkeypatch, codec):
+    monkeypatch.setenv("RABBITMQ_COMPRESSION", codec)
+    monkeypatch.setenv("RABBITMQ_COMPRESSION_MIN_BYTES", "1024")
+    small, small_encoding = rabbitmq_utils.encode_body({"text": "short"})
+    assert small_encoding is None
+    assert rabbitmq_utils.decode_body(small, None) == small
+
+    message = {"filename": "long.wav", "text": "patient reports intermittent chest pain " * 200}
+    body, encoding = rabbitmq_utils.encode_body(message)
+    assert encoding == (codec if codec == "gzip" or rabbitmq_utils.zstandard else "gzip")
+    assert len(body) < len(json.dumps(message))
+    assert json.loads(rabbitmq_utils.decode_body(body, encoding)) == message
+
+
+def test_corrupt_compressed_body_raises_value_error():
+    with pytest.raises(ValueError):
+        rabbitmq_utils.decode_body(b"not gzip", "gzip")
+
+
+def test_gzip_body_inflating_past_limit_is_rejected(monkeypatch):
+    import gzip
+
+    monkeypatch.setattr(rabbitmq_utils, "MAX_DECOMPRESSED_BYTES", 1024)
+    assert rabbitmq_utils.decode_body(gzip.compress(b"a" * 1024), "gzip") == b"a" * 1024
+    with pytest.raises(ValueError):
+        rabbitmq_utils.decode_body(gzip.compress(b"a" * 1025), "gzip")
+    with pytest.raises(ValueError):
+        rabbitmq_utils.decode_body(gzip.compress(b"a" * 100)[:-4], "gzip")
@@ -1,5 +1,12 @@
+import uuid
 from datetime import datetime, UTC, timedelta
-from persistence import store_transcript, SessionLocal, transcripts
+
+import pytest
+from sqlalchemy import func, select
+
+from persistence import (
+    store_transcript, SessionLocal, transcripts, idempotency_keys, outbox_decode, publish_outbox, retention_checkpoints,
+)
 from retention import purge_once
 from config import get_settings
 
@@ -21,4 +28,163 @@ def test_retention_purge(monkeypatch):
         ))
         session.commit()
     deleted = purge_once()
-    assert deleted == 1
\ No newline at end of file
+    assert deleted == 1
+
+def _seed(count, days_old, filename="old.wav"):
+    with SessionLocal() as session:
+        for _ in range(count):
+            session.execute(transcripts.insert().values(
+                filename=filename, text="x", summary=None, enrichment=None, source="test", fhir_document_id=None,
+                created_at=datetime.now(UTC) - timedelta(days=days_old),
+            ))
+        session.commit()
+
+
+def _remaining():
+    with SessionLocal() as session:
+        return session.execute(select(func.count()).select_from(transcripts)).scalar()
+
+
+def test_retention_purge_batches_and_resumes_after_crash(monkeypatch):
+    import retention
+    monkeypatch.setattr(retention.get_settings(), "retention_days", 1)
+    with SessionLocal() as session:
+        session.execute(transcripts.delete())
+        session.commit()
+    _seed(7, days_old=3)
+    _seed(1, days_old=0)
+    assert purge_once(batch_size=2, max_batches=1) == 2
+    with SessionLocal() as session:
+        cp = session.execute(select(retention_checkpoints)).mappings().one()
+    assert cp["high_water_mark"] < cp["range_end"] and cp["lease_until"] is None
+
+    real_batch, calls = retention._purge_batch, []
+
+    def crash_on_second(*args):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+        return real_batch(*args)
+
+    monkeypatch.setattr(retention, "_purge_batch", crash_on_second)
+    with pytest.raises(RuntimeError):
+        purge_once(batch_size=2)
+    monkeypatch.setattr(retention, "_purge_batch", real_batch)
+    assert _remaining() == 4
+    # the next run resumes the interrupted one instead of starting over
+    assert purge_once(batch_size=2) == 3
+    assert _remaining() == 1
+
+
+def test_retention_purge_journals_artifact_deletes_and_drops_idempotency_keys(monkeypatch):
+    import retention
+    settings = retention.get_settings()
+    monkeypatch.setattr(settings, "retention_days", 1)
+    monkeypatch.setattr(settings, "storage_provider", "nextcloud")
+    monkeypatch.setattr(settings, "nextcloud_upload_mode", "queue")
+    name = f"purge-{uuid.uuid4().hex[:8]}.wav"
+    key = uuid.uuid4().hex
+    _seed(2, days_old=5, filename=name)
+    with SessionLocal() as session:
+        session.execute(idempotency_keys.insert().values(
+            key=key, created_at=datetime.now(UTC) - timedelta(days=5), expires_at=datetime.now(UTC) + timedelta(days=1)
+        ))
+        session.commit()
+    assert purge_once() >= 2
+    with SessionLocal() as session:
+        rows = session.execute(
+            select(publish_outbox).where(publish_outbox.c.queue == settings.nextcloud_upload_queue)
+        ).all()
+        ours = {r.id: outbox_decode(r.payload, r.kid) for r in rows}
+        ours = {i: job for i, job in ours.items() if job.get("filename") == name}
+        session.execute(publish_outbox.delete().where(publish_outbox.c.id.in_(list(ours))))
+        assert session.execute(select(idempotency_keys).where(idempotency_keys.c.key == key)).first() is None
+        session.commit()
+    assert len(ours) == 2 and all(job["op"] == "delete" and job["created_at"] for job in ours.values())
+
+
+def test_retention_purge_deletes_recorded_artifacts_inline(monkeypatch):
+    import nextcloud_storage
+    import retention
+    from persistence import record_transcript_artifacts, transcript_artifacts
+
+    settings = retention.get_settings()
+    monkeypatch.setattr(settings, "retention_days", 1)
+    monkeypatch.setattr(settings, "storage_provider", "nextcloud")
+    monkeypatch.setattr(settings, "nextcloud_upload_mode", "inline")
+    with SessionLocal() as session:
+        session.execute(transcripts.delete())
+        session.commit()
+    _seed(1, days_old=5, filename="late.wav")
+    with SessionLocal() as session:
+        record_id = session.execute(select(transcripts.c.id)).scalar()
+    # uploaded days after the transcript was stored, e.g. after a Nextcloud outage
+    record_transcript_artifacts(record_id, f"2026/03/09/101010-{record_id}-late")
+
+    class Client:
+        deleted = []
+
+        def delete_document(self, rel_path):
+            self.deleted.append(rel_path)
+            return True
+
+    def journaled():
+        with SessionLocal() as session:
+            return session.execute(select(func.count()).select_from(publish_outbox).where(
+                publish_outbox.c.queue == settings.nextcloud_upload_queue
+            )).scalar()
+
+    monkeypatch.setattr(nextcloud_storage, "_select_client", Client)
+    before = journaled()
+    assert purge_once() == 1
+    assert Client.deleted == [f"2026/03/09/101010-{record_id}-late.json", f"2026/03/09/101010-{record_id}-late.txt"]
+    with SessionLocal() as session:
+        assert session.execute(select(transcript_artifacts).where(transcript_artifacts.c.transcript_id == record_id)).first() is None
+    assert journaled() == before
+
+
+def test_retention_inline_artifact_deletes_run_after_commit_and_retry(monkeypatch):
+    import nextcloud_storage
+    import retention
+    from persistence import record_transcript_artifacts, transcript_artifacts
+
+    settings = retention.get_settings()
+    monkeypatch.setattr(settings, "retention_days", 1)
+    monkeypatch.setattr(settings, "storage_provider", "nextcloud")
+    monkeypatch.setattr(settings, "nextcloud_upload_mode", "inline")
+    with SessionLocal() as session:
+        session.execute(transcripts.delete())
+        session.execute(transcript_artifacts.delete())
+        session.commit()
+    _seed(1, days_old=5, filename="down.wav")
+    with SessionLocal() as session:
+        record_id = session.execute(select(transcripts.c.id)).scalar()
+    record_transcript_artifacts(record_id, f"2026/03/09/101010-{record_id}-down")
+
+    def recorded():
+        with SessionLocal() as session:
+            return session.execute(
+                select(func.count()).select_from(transcript_artifacts).where(transcript_artifacts.c.transcript_id == record_id)
+            ).scalar()
+
+    class Client:
+        deleted = []
+        down = True
+
+        def delete_document(self, rel_path):
+            # the transcript row is already committed away when Nextcloud is called
+            with SessionLocal() as session:
+                assert session.execute(select(transcripts.c.id).where(transcripts.c.id == record_id)).first() is None
+            if Client.down:
+                raise ConnectionError("nextcloud down")
+            self.deleted.append(rel_path)
+            return True
+
+    monkeypatch.setattr(nextcloud_storage, "_select_client", Client)
+    assert purge_once() == 1
+    assert Client.deleted == [] and recorded() == 1
+
+    Client.down = False
+    assert purge_once() == 0
+    assert Client.deleted == [f"2026/03/09/101010-{record_id}-down.json", f"2026/03/09/101010-{record_id}-down.txt"]
+    assert recorded() == 0
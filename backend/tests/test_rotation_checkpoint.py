@@ -0,0 +1,107 @@
+import base64
+import os
+import uuid
+
+import config
+
+
+def _use_keys(monkeypatch, primary, **keys):
+    monkeypatch.setenv('ENABLE_FIELD_ENCRYPTION', 'true')
+    monkeypatch.setenv('ENCRYPTION_KEYS', ','.join(f'{kid}:{key}' for kid, key in keys.items()))
+    monkeypatch.setenv('PRIMARY_ENCRYPTION_KEY_ID', primary)
+    config.get_settings.cache_clear()
+    import persistence
+    persistence.reload_encryption_keys()
+    return persistence
+
+
+def _key():
+    return base64.b64encode(os.urandom(32)).decode()
+
+
+def test_rotation_resumes_from_checkpoint_and_reports_progress(monkeypatch):
+    old, new, lost = (f'r{uuid.uuid4().hex[:8]}' for _ in range(3))
+    keys = {old: _key(), new: _key(), lost: _key()}
+    persistence = _use_keys(monkeypatch, lost, **{lost: keys[lost]})
+    orphan = persistence.store_transcript('lost.wav', 'unreadable', None, None, 'api')
+    persistence = _use_keys(monkeypatch, old, **{old: keys[old]})
+    ids = [persistence.store_transcript(f'r{i}.wav', f'text {i}', f'sum {i}', {'e': str(i)}, 'api') for i in range(5)]
+
+    persistence = _use_keys(monkeypatch, new, **{old: keys[old], new: keys[new]})
+    before = persistence.encryption_rotation_progress(exact=True)
+    assert before['rows_remaining'][old] == 5 and not before['complete']
+    # the default report comes from the checkpoints alone
+    cheap = persistence.encryption_rotation_progress()
+    assert cheap['rows_remaining'] is None and cheap['ids_remaining'] == before['ids_remaining']
+
+    updated, runs, marks = 0, 0, []
+    while not persistence.encryption_rotation_progress()['complete']:
+        updated += persistence.rotate_encryption_keys(batch_size=2, max_batches=1)
+        marks.append(sum(r['high_water_mark'] for r in persistence.encryption_rotation_progress()['ranges']))
+        runs += 1
+    assert updated == 5 and runs > 1
+    assert marks == sorted(marks)  # every run continued from the previous high-water mark
+
+    after = persistence.encryption_rotation_progress(exact=True)
+    assert after['rows_remaining'][old] == 0 and after['ids_remaining'] == 0
+    for i, tid in enumerate(ids):
+        rec = persistence.get_transcript(tid)
+        assert (rec['text'], rec['summary'], rec['enrichment']['e']) == (f'text {i}', f'sum {i}', str(i))
+    # a row under a key that is no longer configured is left untouched, not re-encrypted as plaintext
+    with persistence.SessionLocal() as session:
+        raw = session.execute(
+            persistence.transcripts.select().where(persistence.transcripts.c.id == orphan)
+        ).mappings().first()
+    assert f'"kid":"{lost}"' in raw['text']
+    assert persistence.rotate_encryption_keys() == 0
+
+
+def test_throttle_spaces_batches_to_the_row_rate():
+    import persistence
+
+    now, slept = [0.0], []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+
+    throttle = persistence.Throttle(100, clock=lambda: now[0], sleep=sleep)
+    for _ in range(3):
+        throttle.wait(50)
+    assert slept == [0.5, 0.5]
+    persistence.Throttle(0, clock=lambda: now[0], sleep=sleep).wait(1000)
+    assert len(slept) == 2
+
+
+def test_periodic_rotation_thread_passes_batch_cap(monkeypatch):
+    import main
+
+    class Stop(BaseException):
+        pass
+
+    calls = []
+
+    def fake_rotate(**kwargs):
+        calls.append(kwargs)
+        raise Stop
+
+    class Thread:
+        def __init__(self, target, **kwargs):
+            self.target = target
+
+        def start(self):
+            self.target()
+
+    monkeypatch.setenv('ENABLE_FIELD_ENCRYPTION', 'true')
+    monkeypatch.setenv('ENCRYPTION_ROTATE_HOURS', '6')
+    monkeypatch.setenv('ENCRYPTION_ROTATE_PERIODIC_MAX_BATCHES', '3')
+    config.get_settings.cache_clear()
+    monkeypatch.setattr(main, 'rotate_encryption_keys', fake_rotate)
+    monkeypatch.setattr(main.threading, 'Thread', Thread)
+    try:
+        main._start_rotation_thread()
+    except Stop:
+        pass
+    finally:
+        config.get_settings.cache_clear()
+    assert calls == [{'max_batches': 3}]
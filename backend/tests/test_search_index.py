@@ -0,0 +1,110 @@
+import base64
+import os
+import uuid
+
+import pytest
+
+import config
+from blind_index import BlindIndex, query_terms, transcript_terms
+
+
+@pytest.fixture
+def search_env(encryption_env, monkeypatch):
+    """Enable the blind index with a fresh key; returns a function that switches keys."""
+    import persistence
+
+    keys = {}
+
+    def use(primary):
+        keys.setdefault(primary, base64.b64encode(os.urandom(32)).decode())
+        monkeypatch.setenv('ENABLE_SEARCH_INDEX', 'true')
+        monkeypatch.setenv('SEARCH_INDEX_KEYS', ','.join(f'{k}:{v}' for k, v in keys.items()))
+        monkeypatch.setenv('PRIMARY_SEARCH_INDEX_KEY_ID', primary)
+        config.get_settings.cache_clear()
+        return persistence.reload_search_index_keys()
+
+    use(f's{uuid.uuid4().hex[:8]}')
+    yield use
+    monkeypatch.undo()
+    config.get_settings.cache_clear()
+    persistence.reload_search_index_keys()
+
+
+def test_terms_are_normalized_and_tokens_are_keyed():
+    terms = transcript_terms('The Patient takes METFORMIN; the patient is well.', None, {'medications': ['metformin']})
+    assert {'patient', 'takes', 'metformin', 'well', 'medications:metformin'} == terms
+    assert query_terms('Metformin  medications:Metformin') == ['metformin', 'medications:metformin']
+    with pytest.raises(ValueError):
+        query_terms('the and')
+    a = BlindIndex({'a': b'a' * 32, 'b': b'b' * 32}, 'a')
+    assert a.token('metformin') == a.token('metformin') != a.token('metformin', 'b')
+    assert len(a.query_tokens('metformin')) == 2
+
+
+def test_search_matches_all_terms_with_keyset_pages(search_env):
+    import persistence
+
+    tag = f'zq{uuid.uuid4().hex[:10]}'
+    ids = [
+        persistence.store_transcript(f'{tag}-{i}.wav', f'{tag} follow up visit number {i}', None,
+            {'medications': ['metformin'] if i % 2 else ['lisinopril']}, 'api')
+        for i in range(5)
+    ]
+    ids += persistence.store_transcripts([
+        {'filename': f'{tag}-b.wav', 'text': f'{tag} batch visit', 'enrichment': {'medications': ['metformin']}, 'source': 'api'},
+    ])
+    page, cursor = persistence.search_transcripts(tag, limit=4)
+    assert [r['id'] for r in page] == ids[::-1][:4] and cursor == ids[2]
+    rest, cursor = persistence.search_transcripts(tag, limit=4, cursor=cursor)
+    assert [r['id'] for r in rest] == ids[1::-1] and cursor is None
+    assert page[0]['text'] == f'{tag} batch visit'  # decrypted
+
+    hits, _ = persistence.search_transcripts(f'{tag} medications:metformin')
+    assert [r['id'] for r in hits] == [ids[5], ids[3], ids[1]]
+
+    with persistence.SessionLocal() as session:
+        tokens = session.execute(persistence.search_tokens.select().where(
+            persistence.search_tokens.c.transcript_id == ids[0])).mappings().all()
+    assert tokens and all(tag not in t['token'] and len(t['token']) == 32 for t in tokens)
+
+
+def test_key_rotation_rebuilds_and_search_stays_complete(search_env):
+    import persistence
+
+    tag = f'zq{uuid.uuid4().hex[:10]}'
+    tid = persistence.store_transcript(f'{tag}.wav', f'{tag} rotated note', None, None, 'api')
+    old_kid = persistence._search_index().primary
+    persistence.rebuild_search_index()  # first build under the old key
+
+    new_kid = f's{uuid.uuid4().hex[:8]}'
+    search_env(new_kid)
+    assert not persistence.search_index_complete()
+    assert [r['id'] for r in persistence.search_transcripts(tag)[0]] == [tid]  # old tokens still match
+
+    while not persistence.search_index_complete():
+        persistence.rebuild_search_index(batch_size=200, max_batches=2)
+    assert [r['id'] for r in persistence.search_transcripts(tag)[0]] == [tid]
+    with persistence.SessionLocal() as session:
+        kids = set(session.execute(persistence.sql_text(
+            'SELECT key_id FROM transcript_search_tokens WHERE transcript_id = :t'), {'t': tid}).scalars())
+    assert kids == {new_kid} != {old_kid}
+
+
+def test_search_endpoint_is_declared_before_transcript_by_id(search_env):
+    from fastapi.testclient import TestClient
+    import main as app_module
+    import persistence
+
+    tag = f'zq{uuid.uuid4().hex[:10]}'
+    tid = persistence.store_transcript(f'{tag}.wav', f'{tag} endpoint note', None, None, 'api')
+    app_module.app.dependency_overrides[app_module.get_current_user] = lambda: {
+        'sub': 'reader', 'role': 'clinician', 'scope': 'user/DocumentReference.read',
+    }
+    try:
+        c = TestClient(app_module.app)
+        r = c.get('/transcripts/search', params={'q': tag})
+        assert r.status_code == 200, r.text
+        assert [i['id'] for i in r.json()['items']] == [tid] and r.json()['next_cursor'] is None
+        assert c.get('/transcripts/search', params={'q': 'the'}).status_code == 400
+    finally:
+        app_module.app.dependency_overrides.clear()
@@ -0,0 +1,45 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import openemr_consumer as consumer
+from metrics import consumer_stage_seconds
+from worker_http import ThreadingHTTPServer, _handler, start_worker_server
+
+
+def _get(server, path):
+    url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+    try:
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_serves_metrics_and_readiness():
+    state = {"connection_open": True}
+    # port 0 means "disabled" for start_worker_server, so bind an ephemeral port directly
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler("test_worker", lambda: dict(state)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        status, body = _get(server, "/metrics")
+        assert status == 200 and b"consumer_stage_seconds" in body
+        assert _get(server, "/health/live")[0] == 200
+        assert _get(server, "/health/ready")[0] == 200
+        state["connection_open"] = False
+        status, body = _get(server, "/health/ready")
+        assert status == 503 and json.loads(body)["checks"] == {"connection_open": False}
+    finally:
+        server.shutdown()
+
+
+def test_port_zero_disables_listener():
+    assert start_worker_server(0, "disabled") is None
+
+
+def test_stage_timer_records_latency_per_stage():
+    before = consumer_stage_seconds.labels("parse")._sum.get()  # type: ignore[attr-defined]
+    with consumer._stage("parse"):
+        sum(range(1000))
+    assert consumer_stage_seconds.labels("parse")._sum.get() > before  # type: ignore[attr-defined]
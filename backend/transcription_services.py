@@ -4,10 +4,14 @@ Contains pluggable backends for cloud (OpenAI) and local Whisper inference.
 """
 from __future__ import annotations
 
-from typing import Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
 import os
 import tempfile
 import subprocess
+import threading
 
 import requests
 
@@ -89,8 +93,86 @@ def downsample(input_path: str, output_path: str, sample_rate: int = 16000) -> N
     subprocess.run(cmd, check=True)
 
 
+class TranscriptionCancelled(RuntimeError):
+    """Raised between segments when the caller cancelled the transcription."""
+
+
+@dataclass
+class _ProgressScope:
+    on_progress: Callable[[float, float | None], bool | None] | None
+    cancel_event: threading.Event | None
+
+    def check_cancelled(self) -> None:
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise TranscriptionCancelled("transcription cancelled")
+
+    def report(self, processed_seconds: float, total_seconds: float | None) -> None:
+        if self.on_progress is None:
+            return
+        # A callback returning False signals the task was cancelled elsewhere
+        if self.on_progress(processed_seconds, total_seconds) is False and self.cancel_event is not None:
+            self.cancel_event.set()
+
+
+_progress_scope: ContextVar[_ProgressScope | None] = ContextVar("transcription_progress", default=None)
+
+
+@contextmanager
+def transcription_progress(
+    on_progress: Callable[[float, float | None], bool | None] | None = None,
+    cancel_event: threading.Event | None = None,
+) -> Iterator[None]:
+    """Enable segment-granular progress + cooperative cancellation for local transcription.
+
+    Within the scope ``transcribe_local`` splits audio into ``LOCAL_SEGMENT_SECONDS``
+    windows, calls ``on_progress(processed_seconds, total_seconds)`` after each one
+    and raises ``TranscriptionCancelled`` once ``cancel_event`` is set.
+    """
+    token = _progress_scope.set(_ProgressScope(on_progress, cancel_event))
+    try:
+        yield
+    finally:
+        _progress_scope.reset(token)
+
+
+_PROMPT_CHARS = 200  # tail of the transcript so far fed to the next window as initial_prompt
+
+
+def _transcribe_segmented(model, path: str, scope: _ProgressScope) -> str:
+    """Transcribe ``path`` window by window, reporting progress and checking for cancels.
+
+    Each window is decoded with the text so far as ``initial_prompt`` so
+    vocabulary and punctuation carry across boundaries. The last segment of a
+    window may be cut mid-word, so it is dropped and the next window starts at
+    that segment's beginning instead of the fixed window edge.
+    """
+    audio = whisper.load_audio(path)  # float32 mono at whisper.audio.SAMPLE_RATE
+    sample_rate = whisper.audio.SAMPLE_RATE
+    total_seconds = len(audio) / sample_rate
+    window = max(1, get_settings().local_segment_seconds) * sample_rate
+    parts: list[str] = []
+    start = 0
+    while start < len(audio):
+        scope.check_cancelled()
+        end = start + window
+        prompt = " ".join(parts)[-_PROMPT_CHARS:] or None
+        result = model.transcribe(audio[start:end], initial_prompt=prompt)
+        segments = result.get("segments") or []
+        if end < len(audio) and len(segments) > 1 and segments[-1]["start"] >= 1:
+            parts.append(" ".join(seg["text"].strip() for seg in segments[:-1]).strip())
+            end = start + int(segments[-1]["start"] * sample_rate)
+        else:
+            parts.append(result.get("text", "").strip())
+        scope.report(min(total_seconds, end / sample_rate), total_seconds)
+        start = end
+    return " ".join(p for p in parts if p)
+
+
 def transcribe_local(data: bytes, filename: str, mime_type: str | None) -> str:
     validate_audio_mime(mime_type)
+    scope = _progress_scope.get()
+    if scope is not None:
+        scope.check_cancelled()
     model = _load_whisper_model()
     with tempfile.TemporaryDirectory() as td:
         raw = os.path.join(td, filename)
@@ -98,6 +180,8 @@ def transcribe_local(data: bytes, filename: str, mime_type: str | None) -> str:
             f.write(data)
         downsampled = os.path.join(td, f"ds_{filename}")
         downsample(raw, downsampled)
+        if scope is not None and whisper is not None and os.environ.get("FAST_TEST_MODE") != "1":
+            return _transcribe_segmented(model, downsampled, scope)
         result = model.transcribe(downsampled)
     return result.get("text", "")
 
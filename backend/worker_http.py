@@ -0,0 +1,71 @@
+"""Embedded metrics/health HTTP listener for the background workers.
+
+The API exposes ``/metrics`` through FastAPI; the consumer, DLQ reprocessor
+and Nextcloud uploader are plain pika loops, so they start this small
+threaded server instead::
+
+    GET /metrics        Prometheus exposition of the process registry
+    GET /health/live    200 while the process is running
+    GET /health/ready   200 when ``ready()`` reports healthy, else 503
+
+``ready`` returns a dict of checks; the worker is ready when every value is
+truthy.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict
+
+import structlog
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+_log = structlog.get_logger(__name__)
+
+ReadyCheck = Callable[[], Dict[str, Any]]
+
+
+def _handler(component: str, ready: ReadyCheck | None):
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if path == "/metrics":
+                self._send(200, generate_latest(), CONTENT_TYPE_LATEST)
+            elif path in ("/health", "/health/live"):
+                self._json(200, {"status": "ok", "component": component})
+            elif path == "/health/ready":
+                try:
+                    checks = ready() if ready else {}
+                    ok = all(bool(v) for v in checks.values())
+                except Exception as e:  # noqa: BLE001
+                    checks, ok = {"error": str(e)}, False
+                self._json(200 if ok else 503, {"status": "ok" if ok else "unavailable", "component": component, "checks": checks})
+            else:
+                self._send(404, b"not found", "text/plain")
+
+        def _json(self, status: int, body: Dict[str, Any]) -> None:
+            self._send(status, json.dumps(body, default=str).encode(), "application/json")
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # noqa: A002 - scrapes would flood the worker log
+            pass
+
+    return _Handler
+
+
+def start_worker_server(port: int, component: str, ready: ReadyCheck | None = None, host: str = "0.0.0.0") -> ThreadingHTTPServer | None:
+    """Serve metrics and health on ``port`` from a daemon thread; ``port`` 0 disables it."""
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _handler(component, ready))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name=f"{component}-http").start()
+    _log.info("worker_http/started", component=component, port=server.server_address[1])
+    return server